@@ -1,9 +1,11 @@
 """Configuración de la base de datos y gestión de sesiones."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import String, cast, create_engine, event, inspect, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,11 +13,164 @@ load_dotenv()
 # URl de la Base de Datos
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./featureflags.db")
 
+# Drivers asíncronos equivalentes a cada driver síncrono de DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Traduce una URL síncrona de SQLAlchemy a su driver asíncrono.
+
+    Args:
+        url: URL de base de datos (p. ej. ``sqlite:///./featureflags.db``)
+
+    Returns:
+        str: URL con driver asíncrono (``sqlite+aiosqlite://``, ``postgresql+asyncpg://``)
+    """
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        return url
+    return f"{ASYNC_DRIVERS[dialect]}{separator}{rest}"
+
+
+# Usar el stack asíncrono (aiosqlite/asyncpg) para los endpoints de flags
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Segundos tras los cuales se recicla una conexión (-1 desactiva el reciclado)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# PRAGMAs aplicados a cada conexión SQLite nueva; un valor vacío omite el PRAGMA.
+# WAL permite que los lectores no se bloqueen mientras hay un escritor, lo que
+# importa cuando varios workers de uvicorn comparten el mismo archivo.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    # Negativo: tamaño en KiB (64 MiB)
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-64000"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
+
+def _is_sqlite(url: str) -> bool:
+    """Indica si la URL apunta a SQLite."""
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    """Indica si la URL apunta a una base SQLite en memoria."""
+    return _is_sqlite(url) and (
+        url.split("://", 1)[1] in ("", "/") or ":memory:" in url
+    )
+
+
+def engine_options(url: str) -> dict:
+    """
+    Construye los argumentos de ``create_engine`` para una URL.
+
+    Las bases SQLite en memoria usan un pool de una sola conexión que no
+    admite las opciones de tamaño, así que solo reciben ``connect_args``.
+
+    Args:
+        url: URL de base de datos
+
+    Returns:
+        dict: Argumentos para ``create_engine``/``create_async_engine``
+    """
+    options = {}
+    if _is_sqlite(url) and "aiosqlite" not in url:
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_sqlite_memory(url):
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(sync_engine, pragmas: Optional[dict] = None) -> None:
+    """
+    Registra un listener que ejecuta los PRAGMAs en cada conexión nueva.
+
+    Args:
+        sync_engine: Engine síncrono (para uno asíncrono, su ``sync_engine``)
+        pragmas: PRAGMAs a aplicar; por defecto ``SQLITE_PRAGMAS``
+    """
+    statements = [
+        f"PRAGMA {name}={value}"
+        for name, value in (SQLITE_PRAGMAS if pragmas is None else pragmas).items()
+        if value
+    ]
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def enable_sqlite_savepoints(sync_engine) -> None:
+    """
+    Delega en SQLAlchemy el inicio de las transacciones de pysqlite.
+
+    pysqlite no abre la transacción hasta la primera escritura, así que un
+    ``SAVEPOINT`` emitido tras una lectura se convierte en la transacción
+    externa y su ``RELEASE`` la confirma. Desactivando el manejo del driver y
+    emitiendo ``BEGIN`` al comenzar cada transacción, ``Session.begin_nested``
+    funciona como en el resto de bases.
+
+    Args:
+        sync_engine: Engine síncrono de pysqlite
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def create_db_engine(url: str = DATABASE_URL, pragmas: Optional[dict] = None):
+    """
+    Crea un engine síncrono con el pool y los PRAGMAs configurados.
+
+    Args:
+        url: URL de base de datos
+        pragmas: PRAGMAs de SQLite; por defecto ``SQLITE_PRAGMAS``
+
+    Returns:
+        Engine: Engine de SQLAlchemy
+    """
+    db_engine = create_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        apply_sqlite_pragmas(db_engine, pragmas)
+        enable_sqlite_savepoints(db_engine)
+    return db_engine
+
+
 # Crear engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-)
+engine = create_db_engine(DATABASE_URL)
 
 # Crear la clase SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -38,6 +193,120 @@ def get_db():
         db.close()
 
 
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_sessionmaker():
+    """
+    Crea bajo demanda el engine y la fábrica de sesiones asíncronas.
+
+    Se construyen de forma perezosa para que el driver asíncrono solo sea
+    necesario cuando ``USE_ASYNC_DB`` está activo.
+
+    Returns:
+        async_sessionmaker: Fábrica de ``AsyncSession``
+    """
+    global _async_engine, _AsyncSessionLocal
+
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL)
+        )
+        if _is_sqlite(ASYNC_DATABASE_URL):
+            apply_sqlite_pragmas(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    """
+    Dependencia para obtener una sesión asíncrona de base de datos.
+
+    Yields:
+        AsyncSession: Sesión asíncrona de SQLAlchemy
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def add_missing_columns(bind=None):
+    """
+    Agrega a las tablas existentes las columnas nuevas de los modelos.
+
+    ``create_all`` no altera tablas ya creadas; esta migración mínima cubre
+    el caso de columnas añadidas con ``server_default`` (o nulables), que
+    pueden agregarse sin reescribir los datos existentes.
+
+    Args:
+        bind: Engine sobre el que migrar; por defecto el de la aplicación
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {
+                col["name"] for col in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+
+
+def migrate_allowed_users(bind=None):
+    """
+    Traslada las listas JSON ``flags.allowed_users`` a ``flag_allowed_users``.
+
+    Cada flag con una lista no vacía recibe una fila por usuario (sin
+    duplicados y en el orden original) y su columna JSON queda como ``[]`` en
+    la misma transacción, por lo que la migración es idempotente.
+
+    Args:
+        bind: Engine sobre el que migrar; por defecto el de la aplicación
+    """
+    bind = bind or engine
+    flags = Base.metadata.tables.get("flags")
+    allowed_users = Base.metadata.tables.get("flag_allowed_users")
+    if flags is None or allowed_users is None:
+        return
+
+    with bind.begin() as conn:
+        # Tras la primera migración todas las listas son "[]": se descartan en
+        # la consulta para no decodificar el JSON de cada flag en cada arranque
+        pending = [
+            (flag_id, user_ids)
+            for flag_id, user_ids in conn.execute(
+                select(flags.c.id, flags.c.allowed_users).where(
+                    cast(flags.c.allowed_users, String) != "[]"
+                )
+            )
+            if user_ids
+        ]
+        for flag_id, user_ids in pending:
+            conn.execute(
+                allowed_users.insert(),
+                [
+                    {"flag_id": flag_id, "user_id": user_id}
+                    for user_id in dict.fromkeys(user_ids)
+                ],
+            )
+            conn.execute(
+                flags.update().where(flags.c.id == flag_id).values(allowed_users=[])
+            )
+
+
 def init_db():
     """Inicializa la base de datos y crea todas las tablas."""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    migrate_allowed_users()
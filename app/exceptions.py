@@ -36,6 +36,37 @@ class InvalidRolloutPercentageException(FlagException):
         super().__init__(self.message)
 
 
+class InvalidHashAlgorithmException(FlagException):
+    """Excepción lanzada cuando el algoritmo de hash no está disponible."""
+
+    def __init__(self, algorithm: str, available: tuple[str, ...]):
+        self.algorithm = algorithm
+        self.available = available
+        self.message = (
+            f"Algoritmo de hash inválido: '{algorithm}'. "
+            f"Disponibles: {', '.join(available)}"
+        )
+        super().__init__(self.message)
+
+
+class InvalidVariantsException(FlagException):
+    """Excepción lanzada cuando las variantes de una bandera no son válidas."""
+
+    def __init__(self, detail: str):
+        self.detail = detail
+        self.message = f"Variantes inválidas: {detail}"
+        super().__init__(self.message)
+
+
+class InvalidRulesException(FlagException):
+    """Excepción lanzada cuando las reglas de segmentación no son válidas."""
+
+    def __init__(self, detail: str):
+        self.detail = detail
+        self.message = f"Reglas inválidas: {detail}"
+        super().__init__(self.message)
+
+
 class InvalidFlagNameException(FlagException):
     """Excepción lanzada cuando el formato del nombre de la bandera no es válido."""
 
@@ -43,3 +74,15 @@ class InvalidFlagNameException(FlagException):
         self.name = name
         self.message = f"Nombre de bandera inválido: '{name}'. Use solo caracteres alfanuméricos, guiones y guiones bajos. No se permiten espacios."
         super().__init__(self.message)
+
+
+class BulkImportTooLargeException(FlagException):
+    """Excepción lanzada cuando una importación masiva supera el máximo de líneas."""
+
+    def __init__(self, rows: int, limit: int):
+        self.rows = rows
+        self.limit = limit
+        self.message = (
+            f"La importación tiene {rows} líneas; el máximo por solicitud es {limit}"
+        )
+        super().__init__(self.message)
@@ -1,31 +1,96 @@
 """Main FastAPI application."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.database import init_db
+from fastapi.responses import PlainTextResponse
+from app.database import USE_ASYNC_DB, SessionLocal, init_db
+from app.services.evaluation_log import evaluation_log
+from app.services.exposure_counters import exposure_counters
+from app.services.flag_cache import flag_cache
 from app.routers.flags import router as flags_router
 from app.middleware.error_handler import add_exception_handlers
+from app.services.shared_flag_table import shared_flag_table
+from app.middleware.metrics import (
+    METRICS_ENABLED,
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    install_query_listeners,
+    metrics,
+)
 import os
 
 # Obtener el entorno actual
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
 DEFAULT_FLAG_STRATEGY = os.getenv("DEFAULT_FLAG_STRATEGY", "permissive")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Crear tablas y aplicar las migraciones mínimas al arrancar; desactivar si el
+# esquema se gestiona fuera del servicio (p. ej. un Job previo al despliegue)
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Cargar el snapshot de evaluación antes de aceptar solicitudes
+FLAG_CACHE_WARMUP = os.getenv("FLAG_CACHE_WARMUP", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicializa la base de datos y los cachés antes de servir solicitudes.
+
+    Importar el módulo no toca la base de datos; el trabajo de arranque
+    ocurre aquí, una vez por worker, cuando el servidor inicia la aplicación.
+    """
+    if DB_INIT_ON_STARTUP:
+        init_db()
+
+    if FLAG_CACHE_WARMUP or shared_flag_table.enabled:
+        with SessionLocal() as session:
+            if FLAG_CACHE_WARMUP:
+                flag_cache.load(session)
+            # Publicar la tabla compartida si ningún otro worker lo hizo aún
+            shared_flag_table.refresh_if_stale(session)
+
+    # Hilos que escriben el registro de evaluaciones (si EVALUATION_LOG_PATH)
+    # y los contadores de exposición
+    evaluation_log.start()
+    exposure_counters.start(SessionLocal)
+    try:
+        yield
+    finally:
+        exposure_counters.stop()
+        evaluation_log.stop()
+
 
 # Crear FastAPI app
 app = FastAPI(
     title="Feature Flag Hub",
     description="Sistema de gestión de feature flags con despliegue controlado",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Inicializar base de datos
-init_db()
-
 # Agregar manejadores de excepciones
 add_exception_handlers(app)
 
+# Medir latencia y consultas por solicitud
+if METRICS_ENABLED:
+    install_query_listeners()
+    app.add_middleware(MetricsMiddleware)
+
 # Incluir routers
-app.include_router(flags_router)
+if USE_ASYNC_DB:
+    from app.routers.flags_async import overlay_routes
+
+    app.include_router(overlay_routes(flags_router))
+else:
+    app.include_router(flags_router)
 
 
 @app.get("/")
@@ -48,6 +113,12 @@ def health():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
 
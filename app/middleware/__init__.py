@@ -1,5 +1,6 @@
 """Middleware components."""
 
 from app.middleware.error_handler import add_exception_handlers
+from app.middleware.metrics import MetricsMiddleware, metrics
 
-__all__ = ["add_exception_handlers"]
+__all__ = ["MetricsMiddleware", "add_exception_handlers", "metrics"]
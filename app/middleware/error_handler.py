@@ -9,6 +9,10 @@ from app.exceptions import (
     DuplicateFlagException,
     InvalidRolloutPercentageException,
     InvalidFlagNameException,
+    InvalidHashAlgorithmException,
+    InvalidVariantsException,
+    InvalidRulesException,
+    BulkImportTooLargeException,
     FlagException,
 )
 import logging
@@ -75,6 +79,52 @@ def add_exception_handlers(app):
             },
         )
 
+    @app.exception_handler(InvalidHashAlgorithmException)
+    async def invalid_hash_algorithm_handler(
+        request: Request, exc: InvalidHashAlgorithmException
+    ):
+        """Maneja la excepción InvalidHashAlgorithmException."""
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": "Algoritmo de hash no válido",
+                "message": exc.message,
+                "hash_algorithm": exc.algorithm,
+                "available": list(exc.available),
+            },
+        )
+
+    @app.exception_handler(InvalidVariantsException)
+    async def invalid_variants_handler(request: Request, exc: InvalidVariantsException):
+        """Maneja la excepción InvalidVariantsException."""
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"error": "Variantes no válidas", "message": exc.message},
+        )
+
+    @app.exception_handler(InvalidRulesException)
+    async def invalid_rules_handler(request: Request, exc: InvalidRulesException):
+        """Maneja la excepción InvalidRulesException."""
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"error": "Reglas no válidas", "message": exc.message},
+        )
+
+    @app.exception_handler(BulkImportTooLargeException)
+    async def bulk_import_too_large_handler(
+        request: Request, exc: BulkImportTooLargeException
+    ):
+        """Maneja la excepción BulkImportTooLargeException."""
+        return JSONResponse(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            content={
+                "error": "Importación demasiado grande",
+                "message": exc.message,
+                "rows": exc.rows,
+                "limit": exc.limit,
+            },
+        )
+
     @app.exception_handler(FlagException)
     async def flag_exception_handler(request: Request, exc: FlagException):
         """Maneja excepciones genéricas de FlagException."""
@@ -0,0 +1,386 @@
+"""
+Métricas de latencia, consultas a la base de datos y evaluaciones.
+
+``MetricsMiddleware`` es un middleware ASGI puro (sin ``BaseHTTPMiddleware``,
+que añade una tarea y una copia del cuerpo por solicitud): mide cada
+solicitud HTTP y la etiqueta con la plantilla de la ruta, no con la URL, para
+que la cardinalidad no dependa de los nombres de flag. Las consultas a la base
+de datos se atribuyen a la solicitud en curso mediante una ``ContextVar`` que
+los listeners de SQLAlchemy consultan; también se propaga a los handlers
+síncronos que Starlette ejecuta en el threadpool. Las evaluaciones, que se
+cuentan en el camino caliente, usan contadores por hilo sin lock que se
+suman al generar la exposición.
+
+Las métricas se exponen en ``/metrics`` con el formato de texto de
+Prometheus. Son locales al proceso: con varios workers de uvicorn cada uno
+lleva sus propios contadores.
+"""
+
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.evaluation_service import EVALUATION_REASONS
+
+# Permite desactivar el middleware y los listeners de consultas
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Límites superiores (segundos) de los buckets de latencia
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Límites superiores de los buckets de consultas por solicitud
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Etiqueta de las solicitudes que no coinciden con ninguna ruta
+UNMATCHED_ROUTE = "unmatched"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_QUERY_START_KEY = "metrics_query_start"
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos."""
+
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # Un contador por bucket más el de +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Registra una observación (el llamador sostiene el lock)."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Consultas a la base de datos acumuladas durante una solicitud."""
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class _EvaluationCounts:
+    """Evaluaciones por razón contadas por un hilo."""
+
+    __slots__ = ("counts", "owner")
+
+    def __init__(self):
+        # Solo el hilo dueño incrementa ``counts``
+        self.counts: dict[str, int] = {}
+        self.owner = weakref.ref(threading.current_thread())
+
+    def is_finished(self) -> bool:
+        """Indica si el hilo dueño terminó (``counts`` ya no cambia)."""
+        owner = self.owner()
+        return owner is None or not owner.is_alive()
+
+
+# Estadísticas de la solicitud en curso; None fuera de una solicitud
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas del proceso.
+
+    Los histogramas de solicitudes se protegen con un lock. Las evaluaciones
+    se cuentan en un diccionario por hilo, sin lock; ``render`` los suma y
+    acumula aparte los de hilos terminados, cuyo reparto descarta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Pone todas las métricas a cero."""
+        with self._lock:
+            self._latency: dict[tuple[str, str, str], Histogram] = {}
+            self._db_queries: dict[tuple[str, str], Histogram] = {}
+            self._db_seconds: dict[tuple[str, str], Histogram] = {}
+            # Un threading.local nuevo hace que cada hilo registre otro reparto
+            self._local = threading.local()
+            self._evaluation_shards: list[_EvaluationCounts] = []
+            # Evaluaciones de los hilos terminados
+            self._retired_evaluations: dict[str, int] = dict.fromkeys(
+                EVALUATION_REASONS, 0
+            )
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        seconds: float,
+        stats: RequestStats,
+    ) -> None:
+        """
+        Registra una solicitud HTTP terminada.
+
+        Args:
+            method: Método HTTP
+            route: Plantilla de la ruta (p. ej. ``/api/flags/{flag_name}``)
+            status_code: Código de estado de la respuesta
+            seconds: Duración total, incluido el envío del cuerpo
+            stats: Consultas a la base de datos de la solicitud
+        """
+        key = (method, route)
+        latency_key = (method, route, str(status_code))
+        with self._lock:
+            latency = self._latency.get(latency_key)
+            if latency is None:
+                latency = self._latency[latency_key] = Histogram(LATENCY_BUCKETS)
+            latency.observe(seconds)
+
+            db_queries = self._db_queries.get(key)
+            if db_queries is None:
+                db_queries = self._db_queries[key] = Histogram(DB_QUERY_BUCKETS)
+                self._db_seconds[key] = Histogram(LATENCY_BUCKETS)
+            db_queries.observe(stats.queries)
+            self._db_seconds[key].observe(stats.query_seconds)
+
+    def count_evaluation(self, reason: str) -> None:
+        """Cuenta una evaluación de flag por su razón, sin tomar locks."""
+        try:
+            counts = self._local.evaluations
+        except AttributeError:
+            counts = self._register_evaluations()
+        counts[reason] = counts.get(reason, 0) + 1
+
+    def count_evaluations(self, counts: Mapping[str, int]) -> None:
+        """Cuenta varias evaluaciones de una vez (evaluación en lote)."""
+        try:
+            own = self._local.evaluations
+        except AttributeError:
+            own = self._register_evaluations()
+        for reason, count in counts.items():
+            own[reason] = own.get(reason, 0) + count
+
+    def evaluation_counts(self) -> dict[str, int]:
+        """
+        Suma las evaluaciones contadas por todos los hilos.
+
+        Returns:
+            dict[str, int]: Evaluaciones por razón, con todas las razones conocidas
+        """
+        with self._lock:
+            totals = dict(self._retired_evaluations)
+            active = []
+            for shard in self._evaluation_shards:
+                finished = shard.is_finished()
+                # dict.copy es atómico con el GIL aunque el dueño siga contando
+                for reason, count in shard.counts.copy().items():
+                    totals[reason] = totals.get(reason, 0) + count
+                    if finished:
+                        self._retired_evaluations[reason] = (
+                            self._retired_evaluations.get(reason, 0) + count
+                        )
+                if not finished:
+                    active.append(shard)
+            self._evaluation_shards = active
+        return totals
+
+    def _register_evaluations(self) -> dict[str, int]:
+        """Crea el reparto de contadores de evaluación del hilo actual."""
+        shard = _EvaluationCounts()
+        with self._lock:
+            self._evaluation_shards.append(shard)
+            self._local.evaluations = shard.counts
+        return shard.counts
+
+    def render(self) -> str:
+        """
+        Serializa las métricas en el formato de texto de Prometheus.
+
+        Returns:
+            str: Exposición completa, terminada en salto de línea
+        """
+        with self._lock:
+            latency = {key: _copy(hist) for key, hist in self._latency.items()}
+            db_queries = {key: _copy(hist) for key, hist in self._db_queries.items()}
+            db_seconds = {key: _copy(hist) for key, hist in self._db_seconds.items()}
+        evaluations = self.evaluation_counts()
+
+        lines: list[str] = []
+        _render_histogram(
+            lines,
+            "featureflags_http_request_duration_seconds",
+            "Latencia de las solicitudes HTTP por ruta",
+            ("method", "route", "status"),
+            latency,
+        )
+        _render_histogram(
+            lines,
+            "featureflags_db_queries_per_request",
+            "Consultas a la base de datos por solicitud",
+            ("method", "route"),
+            db_queries,
+        )
+        _render_histogram(
+            lines,
+            "featureflags_db_query_duration_seconds_per_request",
+            "Tiempo total en consultas a la base de datos por solicitud",
+            ("method", "route"),
+            db_seconds,
+        )
+        lines.append(
+            "# HELP featureflags_evaluations_total Evaluaciones de flags por razón"
+        )
+        lines.append("# TYPE featureflags_evaluations_total counter")
+        for reason, count in sorted(evaluations.items()):
+            labels = _labels(("reason",), (reason,))
+            lines.append(f"featureflags_evaluations_total{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _copy(hist: Histogram) -> Histogram:
+    """Copia un histograma para serializarlo fuera del lock."""
+    copy = Histogram(hist.buckets)
+    copy.counts = list(hist.counts)
+    copy.sum = hist.sum
+    copy.count = hist.count
+    return copy
+
+
+def _escape(value: str) -> str:
+    """Escapa el valor de una etiqueta de Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Formatea un conjunto de etiquetas ``{name="value",...}``."""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+def _render_histogram(
+    lines: list[str],
+    name: str,
+    help_text: str,
+    label_names: tuple[str, ...],
+    series: dict[tuple, Histogram],
+) -> None:
+    """Agrega al listado las líneas de un histograma con todas sus series."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    bucket_labels = (*label_names, "le")
+    for key in sorted(series):
+        hist = series[key]
+        cumulative = 0
+        bounds = [repr(float(bound)) for bound in hist.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, hist.counts, strict=True):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_labels(bucket_labels, (*key, bound))} {cumulative}"
+            )
+        labels = _labels(label_names, key)
+        lines.append(f"{name}_sum{labels} {hist.sum!r}")
+        lines.append(f"{name}_count{labels} {hist.count}")
+
+
+# Registro compartido por el proceso
+metrics = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Marca el inicio de una consulta emitida durante una solicitud."""
+    if _request_stats.get() is not None:
+        conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Atribuye la consulta terminada a la solicitud en curso."""
+    stats = _request_stats.get()
+    starts = conn.info.get(_QUERY_START_KEY)
+    if stats is None or not starts:
+        return
+    stats.queries += 1
+    stats.query_seconds += time.perf_counter() - starts.pop()
+
+
+def install_query_listeners() -> None:
+    """
+    Registra los listeners de consultas en todos los engines de SQLAlchemy.
+
+    Se registran sobre la clase ``Engine``, por lo que cubren el engine
+    síncrono, el ``sync_engine`` del asíncrono y cualquier engine creado
+    después. Llamarla más de una vez no duplica los listeners.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia y las consultas de cada solicitud.
+
+    Args:
+        app: Aplicación ASGI envuelta
+        registry: Registro donde acumular las métricas
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        # Si la aplicación falla antes de responder, ServerErrorMiddleware
+        # enviará un 500 por fuera de este middleware
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.registry.observe_request(
+                scope["method"], route, status_code, elapsed, stats
+            )
@@ -1,5 +1,7 @@
 """Modelos de la base de datos"""
 
 from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.models.flag_exposure import FlagExposure
 
-__all__ = ["Flag"]
+__all__ = ["Flag", "FlagAllowedUser", "FlagExposure"]
@@ -1,8 +1,12 @@
 """Definición del modelo Flag"""
 
+from typing import Iterable, List, Optional
+
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.flag_allowed_user import FlagAllowedUser
 
 
 class Flag(Base):
@@ -16,6 +20,13 @@ class Flag(Base):
         enabled: Indica si la bandera está habilitada
         rollout_percentage: Porcentaje de usuarios que recibirán la característica (0-100)
         allowed_users: Lista de IDs de usuarios que siempre obtienen la característica
+            (respaldada por la tabla ``flag_allowed_users``)
+        hash_algorithm: Algoritmo de hash usado para asignar usuarios al rollout
+        variants: Variantes A/B/n con sus pesos (``[{"name", "weight"}]``);
+            vacía o nula en las flags booleanas
+        rules: Reglas de segmentación por atributos
+            (``[{"attribute", "operator", "value"}]``); vacía o nula si no hay
+        version: Versión de la bandera; se incrementa con cada actualización
         created_at: Marca de tiempo de creación de la bandera
     """
 
@@ -26,10 +37,55 @@ class Flag(Base):
     description = Column(String, nullable=True)
     enabled = Column(Boolean, default=True, nullable=False)
     rollout_percentage = Column(Integer, default=0, nullable=False)
-    allowed_users = Column(JSON, default=list, nullable=False)
+    # Columna JSON histórica de allowed_users; init_db migra su contenido a
+    # flag_allowed_users y la deja vacía. Se mantiene mapeada porque las bases
+    # existentes la tienen como NOT NULL sin valor por defecto.
+    legacy_allowed_users = Column("allowed_users", JSON, default=list, nullable=False)
+    # Las filas existentes quedan fijadas al hash histórico para no mover usuarios
+    hash_algorithm = Column(
+        String, default="sha256", server_default="sha256", nullable=False
+    )
+    # Nulable para que add_missing_columns pueda agregarla a bases existentes
+    variants = Column(JSON, default=list, nullable=True)
+    rules = Column(JSON, default=list, nullable=True)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
+    allowed_user_rows = relationship(
+        FlagAllowedUser,
+        order_by=FlagAllowedUser.id,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        # Nunca se cargan de forma implícita: una allowlist puede tener miles de
+        # filas, así que quien lea ``allowed_users`` debe pedirlas con
+        # ``selectinload(Flag.allowed_user_rows)``
+        lazy="raise",
+    )
+
+    @property
+    def allowed_users(self) -> List[str]:
+        """IDs de los usuarios permitidos, en orden de inserción."""
+        return [row.user_id for row in self.allowed_user_rows]
+
+    @allowed_users.setter
+    def allowed_users(self, user_ids: Optional[Iterable[str]]) -> None:
+        """
+        Reemplaza la lista de usuarios permitidos.
+
+        Solo se insertan los usuarios nuevos y se eliminan los que ya no están;
+        las filas de los usuarios que se mantienen no se modifican.
+        """
+        wanted = dict.fromkeys(user_ids or ())
+        kept = [row for row in self.allowed_user_rows if row.user_id in wanted]
+        current = {row.user_id for row in kept}
+        kept.extend(
+            FlagAllowedUser(user_id=user_id)
+            for user_id in wanted
+            if user_id not in current
+        )
+        self.allowed_user_rows = kept
+
     def __repr__(self):
         return f"<Flag(name='{self.name}', enabled={self.enabled}, rollout={self.rollout_percentage}%)>"
@@ -0,0 +1,34 @@
+"""Definición del modelo FlagAllowedUser"""
+
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+
+from app.database import Base
+
+
+class FlagAllowedUser(Base):
+    """
+    Usuario de la lista de permitidos de una flag.
+
+    Una fila por par (flag, usuario): el índice único compuesto convierte la
+    comprobación de pertenencia en una búsqueda indexada y permite agregar o
+    quitar usuarios sin reescribir la lista completa.
+
+    Atributos:
+        id: Clave primaria; conserva el orden de inserción de la lista
+        flag_id: Flag a la que pertenece la entrada
+        user_id: ID del usuario que siempre obtiene la característica
+    """
+
+    __tablename__ = "flag_allowed_users"
+    __table_args__ = (
+        Index("ix_flag_allowed_users_flag_user", "flag_id", "user_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    flag_id = Column(
+        Integer, ForeignKey("flags.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<FlagAllowedUser(flag_id={self.flag_id}, user_id='{self.user_id}')>"
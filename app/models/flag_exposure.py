@@ -0,0 +1,45 @@
+"""Definición del modelo FlagExposure"""
+
+from sqlalchemy import Column, Index, Integer, String
+
+from app.database import Base
+
+
+class FlagExposure(Base):
+    """
+    Evaluaciones de una flag agregadas por minuto y razón.
+
+    Una fila por (flag, minuto, razón). Cada worker suma sus contadores a la
+    fila con un upsert aditivo, de modo que la tabla acumula el total de
+    todos los procesos sin escribir una fila por evaluación.
+
+    Atributos:
+        id: Clave primaria
+        flag_name: Nombre de la flag evaluada
+        minute: Minuto de la evaluación, en minutos desde la época Unix (UTC)
+        reason: Razón de la evaluación (p. ej. ``rollout_percentage``)
+        count: Evaluaciones registradas en ese minuto con esa razón
+    """
+
+    __tablename__ = "flag_exposures"
+    __table_args__ = (
+        Index(
+            "ix_flag_exposures_flag_minute_reason",
+            "flag_name",
+            "minute",
+            "reason",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    flag_name = Column(String, nullable=False)
+    minute = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<FlagExposure(flag_name='{self.flag_name}', minute={self.minute}, "
+            f"reason='{self.reason}', count={self.count})>"
+        )
@@ -0,0 +1,45 @@
+"""Utilidades para respuestas condicionales (ETag / If-None-Match)."""
+
+from typing import Optional
+
+from fastapi import Response, status
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si la cabecera If-None-Match coincide con el ETag actual.
+
+    Acepta listas separadas por comas, el comodín ``*`` y ETags débiles
+    (``W/"..."``), que según RFC 9110 se comparan de forma débil.
+
+    Args:
+        if_none_match: Valor de la cabecera If-None-Match (o None)
+        etag: ETag actual del recurso
+
+    Returns:
+        bool: True si el cliente ya tiene la representación actual
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Construye una respuesta 304 sin cuerpo.
+
+    Args:
+        etag: ETag actual del recurso
+
+    Returns:
+        Response: Respuesta 304 con la cabecera ETag
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
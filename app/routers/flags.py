@@ -1,8 +1,13 @@
 """Router para operaciones CRUD de flags."""
 
+import json
 import os
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional, Sequence
+from fastapi import APIRouter, Body, Depends, Header, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 
 from app.database import get_db
 from app.models.flag import Flag
@@ -12,14 +17,78 @@ from app.schemas.flag import (
     FlagResponse,
     FlagListResponse,
     EvaluateResponse,
+    BatchEvaluateRequest,
+    FlagChangesResponse,
+    FlagCacheStatsResponse,
+    DecisionCacheStatsResponse,
+    AllowedUsersRequest,
+    AllowlistChangeResponse,
+    AllowlistMembershipResponse,
+    FlagImportResponse,
+    ExposurePoint,
+    FlagExposuresResponse,
 )
 from app.validators.flag_validator import FlagValidator
-from app.exceptions import FlagNotFoundException
-from app.services.evaluation_service import EvaluationService
+from app.exceptions import (
+    BulkImportTooLargeException,
+    FlagException,
+    FlagNotFoundException,
+)
+from app.middleware.metrics import metrics
+from app.services.allowlist_service import AllowlistService
+from app.services.bucketing import DEFAULT_HASH_ALGORITHM
+from app.services.flag_import import MAX_IMPORT_ROWS, FlagImportService
+from app.services.decision_cache import decision_cache
+from app.services.evaluation_log import evaluation_log
+from app.services.exposure_counters import (
+    ExposureCounters,
+    current_minute,
+    datetime_to_minute,
+    exposure_counters,
+    minute_to_datetime,
+)
+from app.services.flag_update_pipeline import flag_update_pipeline
+from app.services.shared_flag_table import shared_flag_table
+from app.services.targeting import attributes_from_query
+from app.services.flag_snapshot import (
+    BINARY_SNAPSHOT_MEDIA_TYPE,
+    SNAPSHOT_FORMAT_BINARY,
+    SNAPSHOT_FORMAT_JSON,
+    encode_snapshot,
+)
+from app.services.flag_cache import (
+    build_flag_rows,
+    FlagSnapshot,
+    compute_flag_etag,
+    compute_flag_set_etag,
+    flag_cache,
+)
+from app.services.flag_events import (
+    FLAG_CREATED,
+    flag_change_broker,
+    notify_allowlist_committed,
+    notify_flag_committed,
+)
+from app.routers.conditional import etag_matches, not_modified
+from app.routers.responses import evaluate_response, flag_list_response
+from app.routers.listing import (
+    LIST_FORMAT_NDJSON,
+    FlagListParams,
+    stream_flags_ndjson,
+)
 
 # Obtener el entorno actual
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
 
+# Filas NDJSON agrupadas por cada fragmento enviado en respuestas en streaming
+STREAM_CHUNK_ROWS = 100
+
+# Minutos que cubre la serie de exposiciones si no se indica ``since``
+EXPOSURE_DEFAULT_WINDOW_MINUTES = 60
+
+# Segundos entre comentarios keep-alive en el stream SSE de cambios
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
 router = APIRouter(prefix="/api/flags", tags=["flags"])
 
 
@@ -27,6 +96,7 @@ router = APIRouter(prefix="/api/flags", tags=["flags"])
     "/evaluate", response_model=EvaluateResponse, status_code=status.HTTP_200_OK
 )
 def evaluate_flag(
+    request: Request,
     user_id: str = Query(..., description="ID del usuario para evaluar la flag"),
     flag: str = Query(..., description="Nombre de la flag a evaluar"),
     db: Session = Depends(get_db),
@@ -36,47 +106,468 @@ def evaluate_flag(
 
     Implementa reglas de segmentación:
     - Por usuario: usuarios en allowed_users siempre reciben la feature
+    - Por atributos: el usuario debe cumplir las reglas de la flag; los
+      atributos son el resto de los parámetros de la query
     - Por rollout: distribución basada en porcentaje de rollout_percentage
     - Por estrategia predeterminada: basada en el estado enabled de la flag
 
     Args:
         user_id: ID del usuario a evaluar
         flag: Nombre de la flag a evaluar
+        request: Solicitud; el resto de la query son los atributos del usuario
         db: Sesión de base de datos
 
     Returns:
-        EvaluateResponse: Resultado de la evaluación con razón
+        OrjsonResponse: Resultado de la evaluación con razón (``EvaluateResponse``)
 
     Raises:
         FlagNotFoundException: Si la flag no existe
     """
-    # Buscar la flag en la base de datos
-    db_flag = db.query(Flag).filter(Flag.name == flag.lower()).first()
-
-    if not db_flag:
+    flag_name = flag.lower()
+
+    # Con la tabla compartida entre workers se evalúa sobre ella, sin la BD
+    # (salvo para reconstruirla si falta o expiró)
+    if shared_flag_table.needs_refresh():
+        shared_flag_table.refresh_if_stale(db)
+    shared_table = shared_flag_table.current()
+    if shared_table is not None:
+        if shared_table.has_rules(flag_name):
+            # La decisión depende de los atributos: no pasa por el caché
+            result = shared_table.evaluate(
+                flag_name, user_id, attributes_from_query(request.query_params)
+            )
+        else:
+            # La versión de las decisiones es el ETag del conjunto publicado
+            result = decision_cache.evaluate(
+                flag_name,
+                shared_table.etag,
+                user_id,
+                lambda user: shared_table.evaluate(flag_name, user),
+            )
+        if result is None:
+            raise FlagNotFoundException(flag)
+        enabled, reason = result
+        variant = shared_table.variant(flag_name, user_id) if enabled else None
+        metrics.count_evaluation(reason)
+        evaluation_log.record(flag_name, user_id, enabled, reason, variant)
+        exposure_counters.count(flag_name, reason)
+        return evaluate_response(flag_name, enabled, reason, variant)
+
+    # Buscar la flag en el snapshot en memoria (solo consulta la BD si falla)
+    cached_flag = flag_cache.get(db, flag_name)
+
+    if not cached_flag:
         raise FlagNotFoundException(flag)
 
-    # Evaluar usando el servicio de evaluación
-    enabled, reason = EvaluationService.evaluate_flag(db_flag, user_id)
+    # Los atributos (el resto de la query) solo se leen si la flag tiene reglas
+    attributes = (
+        attributes_from_query(request.query_params)
+        if cached_flag.evaluator.rules is not None
+        else None
+    )
+    # Evaluar con el evaluador precompilado de la flag, pasando por el caché
+    # de decisiones si está activado
+    enabled, reason = decision_cache.evaluate_snapshot(cached_flag, user_id, attributes)
+    # La variante solo se asigna a quienes tienen la flag habilitada
+    variant = cached_flag.evaluator.variant(user_id) if enabled else None
+    metrics.count_evaluation(reason)
+    evaluation_log.record(cached_flag.name, user_id, enabled, reason, variant)
+    exposure_counters.count(cached_flag.name, reason)
+
+    # Se responde sin revalidar contra EvaluateResponse (ver OrjsonResponse)
+    return evaluate_response(cached_flag.name, enabled, reason, variant)
+
+
+def _stream_batch_results(
+    flags: list[FlagSnapshot],
+    user_ids: list[str],
+    attributes: Optional[dict[str, dict[str, str]]] = None,
+) -> Iterator[str]:
+    """
+    Genera la matriz de evaluación como NDJSON, una línea por usuario.
+
+    Los fragmentos JSON de cada resultado posible se construyen una sola vez,
+    de modo que el bucle solo llama a los evaluadores precompilados y
+    concatena cadenas. En las flags con variantes, los usuarios habilitados
+    llevan además ``"variant"``. Las reglas de segmentación se evalúan con
+    los atributos de cada usuario. Cada decisión se anota en el registro de
+    evaluaciones, con el mismo muestreo que las evaluaciones individuales.
+
+    Args:
+        flags: Flags a evaluar
+        user_ids: IDs de los usuarios
+        attributes: Atributos por ID de usuario (opcional)
+
+    Yields:
+        str: Bloques de hasta STREAM_CHUNK_ROWS líneas NDJSON
+    """
+    # Evaluador, asignador de variante, nombre, clave JSON y conteo por razón
+    # de cada flag
+    flag_keys = [
+        (
+            flag.evaluator.evaluate,
+            flag.evaluator.variant if flag.variants else None,
+            flag.name,
+            json.dumps(flag.name),
+            {},
+        )
+        for flag in flags
+    ]
+    fragments: dict[tuple, str] = {}
+    chunk: list[str] = []
+    attributes = attributes or {}
+    # Sin registro activo el bucle no paga ni la llamada
+    record = evaluation_log.record if evaluation_log.active else None
+
+    try:
+        for user_id in user_ids:
+            user_attributes = attributes.get(user_id)
+            parts = []
+            for evaluate, variant, name, key, reason_counts in flag_keys:
+                result = evaluate(user_id, user_attributes)
+                if variant is not None and result[0]:
+                    result = (*result, variant(user_id))
+                if record is not None:
+                    record(name, user_id, *result)
+                fragment = fragments.get(result)
+                if fragment is None:
+                    payload = {"enabled": result[0], "reason": result[1]}
+                    if len(result) > 2:
+                        payload["variant"] = result[2]
+                    fragment = fragments[result] = json.dumps(
+                        payload, separators=(",", ":")
+                    )
+                reason_counts[result[1]] = reason_counts.get(result[1], 0) + 1
+                parts.append(f"{key}:{fragment}")
+            chunk.append(
+                f'{{"user_id":{json.dumps(user_id)},"results":{{{",".join(parts)}}}}}\n'
+            )
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield "".join(chunk)
+                chunk = []
+
+        if chunk:
+            yield "".join(chunk)
+    finally:
+        totals: dict[str, int] = {}
+        for _, _, name, _, reason_counts in flag_keys:
+            exposure_counters.count_many(name, reason_counts)
+            for reason, count in reason_counts.items():
+                totals[reason] = totals.get(reason, 0) + count
+        metrics.count_evaluations(totals)
+
+
+@router.post("/evaluate/batch", status_code=status.HTTP_200_OK)
+def evaluate_flags_batch(request: BatchEvaluateRequest, db: Session = Depends(get_db)):
+    """
+    Evalúa varias flags para varios usuarios en una sola solicitud.
+
+    Cada flag se resuelve una sola vez desde el snapshot en memoria y la
+    matriz de resultados se envía en streaming como NDJSON: una línea por
+    usuario con el resultado de cada flag.
+
+    Args:
+        request: IDs de usuarios, nombres de flags (todas si se omite) y
+            atributos por usuario para las reglas de segmentación
+        db: Sesión de base de datos
+
+    Returns:
+        StreamingResponse: Líneas ``{"user_id": ..., "results": {flag: {...}}}``
+
+    Raises:
+        FlagNotFoundException: Si alguna de las flags solicitadas no existe
+    """
+    names = None
+    if request.flags is not None:
+        names = list(dict.fromkeys(name.lower() for name in request.flags))
+    flags = flag_cache.get_many(db, names)
+
+    return StreamingResponse(
+        _stream_batch_results(flags, request.user_ids, request.attributes),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get(
+    "/cache/stats",
+    response_model=FlagCacheStatsResponse,
+    status_code=status.HTTP_200_OK,
+)
+def get_cache_stats():
+    """
+    Obtiene los contadores del caché de evaluación.
+
+    Returns:
+        FlagCacheStatsResponse: Aciertos, fallos, recargas y tamaño del snapshot
+    """
+    return flag_cache.stats()
+
+
+@router.get(
+    "/cache/decisions",
+    response_model=DecisionCacheStatsResponse,
+    status_code=status.HTTP_200_OK,
+)
+def get_decision_cache_stats():
+    """
+    Obtiene los contadores del caché de decisiones de evaluación.
+
+    Returns:
+        DecisionCacheStatsResponse: Aciertos, fallos, desalojos y tasa de aciertos
+    """
+    return decision_cache.stats()
+
+
+@router.get(
+    "/changes", response_model=FlagChangesResponse, status_code=status.HTTP_200_OK
+)
+async def poll_flag_changes(
+    since_version: int = Query(
+        0, ge=0, description="Última versión de cambios que el cliente conoce"
+    ),
+    timeout: float = Query(
+        30, ge=0, le=60, description="Segundos máximos de espera si no hay cambios"
+    ),
+):
+    """
+    Long-poll de cambios de flags.
+
+    Responde en cuanto hay cambios posteriores a ``since_version`` o al
+    vencer ``timeout``. La espera no ocupa hilos del threadpool.
+
+    Args:
+        since_version: Cursor devuelto por la consulta anterior (o por la
+            cabecera X-Flag-Events-Version del listado)
+        timeout: Segundos máximos de espera
+
+    Returns:
+        FlagChangesResponse: Cambios, nuevo cursor y marca de reset
+    """
+    events, reset = await flag_change_broker.wait(since_version, timeout)
+    if reset:
+        version = flag_change_broker.version
+    else:
+        version = events[-1]["version"] if events else since_version
+    return FlagChangesResponse(version=version, reset=reset, events=events)
+
+
+async def _stream_flag_changes(request: Request, since: int) -> AsyncIterator[str]:
+    """
+    Genera el stream SSE de cambios de flags a partir de una versión.
+
+    Args:
+        request: Solicitud HTTP, para detectar la desconexión del cliente
+        since: Última versión que el cliente conoce
+
+    Yields:
+        str: Eventos SSE (``flag.created``, ``flag.updated``,
+            ``flag.allowlist``, ``reset``) y comentarios keep-alive
+    """
+    cursor = since
+    while not await request.is_disconnected():
+        events, reset = await flag_change_broker.wait(cursor, SSE_HEARTBEAT_SECONDS)
+        if reset:
+            cursor = flag_change_broker.version
+            yield f"event: reset\ndata: {json.dumps({'version': cursor})}\n\n"
+            continue
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield (
+                f"id: {event['version']}\n"
+                f"event: flag.{event['type']}\n"
+                f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+            )
+        cursor = events[-1]["version"]
+
+
+@router.get("/changes/stream", status_code=status.HTTP_200_OK)
+async def stream_flag_changes(
+    request: Request,
+    since_version: Optional[int] = Query(
+        None, ge=0, description="Última versión de cambios que el cliente conoce"
+    ),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream Server-Sent Events de cambios de flags.
+
+    Al reconectar, el navegador envía Last-Event-ID y el stream continúa desde
+    ahí. Sin cursor, solo se envían los cambios posteriores a la conexión.
+
+    Args:
+        request: Solicitud HTTP
+        since_version: Cursor inicial opcional
+        last_event_id: Cabecera Last-Event-ID enviada al reconectar
+
+    Returns:
+        StreamingResponse: Stream ``text/event-stream``
+    """
+    if since_version is None:
+        since_version = (
+            int(last_event_id)
+            if last_event_id and last_event_id.isdigit()
+            else flag_change_broker.version
+        )
+
+    return StreamingResponse(
+        _stream_flag_changes(request, since_version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/snapshot", status_code=status.HTTP_200_OK)
+def get_flag_snapshot(
+    snapshot_format: str = Query(
+        SNAPSHOT_FORMAT_JSON,
+        alias="format",
+        pattern=f"^({SNAPSHOT_FORMAT_JSON}|{SNAPSHOT_FORMAT_BINARY})$",
+        description="json (por defecto) o binary para el formato compacto",
+    ),
+    compress: bool = Query(False, description="Comprimir con zlib (solo binary)"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Snapshot compacto de todas las flags para evaluarlas en el cliente.
+
+    Se sirve desde el caché de evaluación y lo consume ``featureflags_client``;
+    con If-None-Match responde 304 mientras las flags no cambien. El formato
+    binario está descrito en ``app.services.flag_snapshot``.
+
+    Args:
+        snapshot_format: Codificación del snapshot (json o binary)
+        compress: Si el cuerpo binario se comprime con zlib
+        if_none_match: ETag del snapshot que el cliente ya tiene
+        db: Sesión de base de datos, usada solo si el caché expiró
+
+    Returns:
+        Response: Snapshot serializado con su ETag
+    """
+    etag, flags = flag_cache.snapshot(db)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    binary = snapshot_format == SNAPSHOT_FORMAT_BINARY
+    return Response(
+        content=encode_snapshot(etag, flags, snapshot_format, compress),
+        media_type=BINARY_SNAPSHOT_MEDIA_TYPE if binary else "application/json",
+        headers={"ETag": etag},
+    )
+
+
+@router.post(
+    "/import", response_model=FlagImportResponse, status_code=status.HTTP_200_OK
+)
+def import_flags(
+    body: bytes = Body(
+        ...,
+        media_type="application/x-ndjson",
+        description="Una flag por línea, con el formato de POST /api/flags",
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Crea o actualiza muchas flags a partir de NDJSON.
+
+    Las flags que no existen se crean; las existentes se actualizan solo con
+    los campos presentes en su línea. Todas las escrituras se confirman en
+    una sola transacción y las líneas inválidas se devuelven en ``errors``
+    sin impedir que se aplique el resto.
+
+    Args:
+        body: Contenido NDJSON
+        db: Sesión de base de datos
+
+    Returns:
+        FlagImportResponse: Conteos de altas y actualizaciones y errores por línea
+
+    Raises:
+        BulkImportTooLargeException: Si hay más de MAX_IMPORT_ROWS líneas
+    """
+    rows, errors = FlagImportService.parse(body)
+    if len(rows) + len(errors) > MAX_IMPORT_ROWS:
+        raise BulkImportTooLargeException(len(rows) + len(errors), MAX_IMPORT_ROWS)
 
-    return EvaluateResponse(flag_name=db_flag.name, enabled=enabled, reason=reason)
+    counts = FlagImportService.import_flags(db, rows) if rows else {}
+    return FlagImportResponse(**counts, errors=errors)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_flags(params: FlagListParams = Depends(), db: Session = Depends(get_db)):
+    """
+    Exporta las flags como NDJSON, en el formato que acepta ``/import``.
+
+    Admite los mismos filtros que el listado y siempre responde en streaming.
+
+    Args:
+        params: Filtros del listado
+        db: Sesión de base de datos
+
+    Returns:
+        StreamingResponse: Una flag por línea
+    """
+    params.output_format = LIST_FORMAT_NDJSON
+    partitions = db.execute(params.query()).scalars().partitions()
+    return StreamingResponse(
+        stream_flags_ndjson(partitions),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="flags.ndjson"'},
+    )
 
 
 @router.get("", response_model=FlagListResponse, status_code=status.HTTP_200_OK)
-def list_flags(db: Session = Depends(get_db)):
+def list_flags(
+    params: FlagListParams = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
-    Lista todas las flags.
+    Lista las flags, con filtros y paginación opcionales.
+
+    Sin parámetros devuelve todas las flags y responde 304 sin consultar la
+    base de datos si el ETag enviado en If-None-Match coincide con la versión
+    actual del conjunto de flags. Con ``limit`` devuelve una página y el
+    ``next_cursor`` para pedir la siguiente. Con ``format=ndjson`` las flags se
+    envían en streaming, una por línea, leyendo la tabla por lotes.
+
+    Args:
+        params: Filtros, paginación y formato de salida
+        db: Sesión de base de datos
 
     Returns:
-        FlagListResponse: Lista de todas las flags con el conteo total
+        OrjsonResponse | StreamingResponse: Flags solicitadas (``FlagListResponse``)
     """
-    flags = db.query(Flag).all()
+    # Cursor de cambios a partir del cual este listado está al día
+    events_version = str(flag_change_broker.version)
+
+    if params.streaming:
+        partitions = db.execute(params.query()).scalars().partitions()
+        return StreamingResponse(
+            stream_flags_ndjson(partitions),
+            media_type="application/x-ndjson",
+            headers={"X-Flag-Events-Version": events_version},
+        )
+
+    if params.is_full_listing:
+        current_etag = flag_cache.flag_set_etag(db)
+        if etag_matches(if_none_match, current_etag):
+            return not_modified(current_etag)
+
+    headers = {"X-Flag-Events-Version": events_version}
+    # Solo columnas, sin instanciar Flag: el listado no modifica las flags
+    flags_stmt, allowed_stmt = params.row_queries()
+    flags, next_cursor = params.paginate(
+        build_flag_rows(db.execute(flags_stmt), db.execute(allowed_stmt))
+    )
+    if params.is_full_listing:
+        headers["ETag"] = compute_flag_set_etag(flags)
 
-    return FlagListResponse(
-        flags=flags,
-        total=len(flags),
-        # /flags refleja el entorno
-        environment=ENVIRONMENT,
+    # /flags refleja el entorno
+    return flag_list_response(
+        flags, params.total(flags), next_cursor, ENVIRONMENT, headers
     )
 
 
@@ -96,14 +587,23 @@ def create_flag(flag_data: FlagCreate, db: Session = Depends(get_db)):
         DuplicateFlagException: Si ya existe una bandera con ese nombre
         InvalidRolloutPercentageException: Si el porcentaje de despliegue no es válido
         InvalidFlagNameException: Si el formato del nombre no es válido
+        InvalidHashAlgorithmException: Si el algoritmo de hash no está disponible
+        InvalidVariantsException: Si las variantes no son válidas
+        InvalidRulesException: Si las reglas no son válidas
     """
+    # Las flags nuevas usan el hash configurado salvo que pidan otro
+    hash_algorithm = flag_data.hash_algorithm or DEFAULT_HASH_ALGORITHM
+
     # Validate flag data
     FlagValidator.validate_flag_data(
         db=db,
         name=flag_data.name,
         rollout_percentage=flag_data.rollout_percentage,
         allowed_users=flag_data.allowed_users,
+        hash_algorithm=hash_algorithm,
     )
+    FlagValidator.validate_variants(flag_data.variants)
+    FlagValidator.validate_rules(flag_data.rules)
 
     # Create flag
     db_flag = Flag(
@@ -112,20 +612,37 @@ def create_flag(flag_data: FlagCreate, db: Session = Depends(get_db)):
         enabled=flag_data.enabled,
         rollout_percentage=flag_data.rollout_percentage,
         allowed_users=flag_data.allowed_users,
+        hash_algorithm=hash_algorithm,
+        variants=[variant.model_dump() for variant in flag_data.variants],
+        rules=[rule.model_dump() for rule in flag_data.rules],
     )
 
     db.add(db_flag)
     db.commit()
     db.refresh(db_flag)
+    # La allowlist no se carga con la flag; la respuesta y el snapshot la usan
+    db.refresh(db_flag, ["allowed_user_rows"])
+
+    # Publicar la flag en el snapshot de evaluación y a los suscriptores
+    notify_flag_committed(db_flag, FLAG_CREATED)
+    shared_flag_table.publish(db)
 
     return db_flag
 
 
 @router.get("/{flag_name}", response_model=FlagResponse, status_code=status.HTTP_200_OK)
-def get_flag(flag_name: str, db: Session = Depends(get_db)):
+def get_flag(
+    flag_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
     Obtiene una bandera específica por su nombre.
 
+    Responde 304 sin consultar la base de datos si el ETag enviado en
+    If-None-Match coincide con la versión actual de la bandera.
+
     Args:
         flag_name: Nombre de la bandera
         db: Sesión de base de datos
@@ -136,11 +653,22 @@ def get_flag(flag_name: str, db: Session = Depends(get_db)):
     Raises:
         FlagNotFoundException: Si la bandera no existe
     """
-    db_flag = db.query(Flag).filter(Flag.name == flag_name.lower()).first()
+    if if_none_match:
+        cached_flag = flag_cache.get(db, flag_name.lower())
+        if cached_flag and etag_matches(if_none_match, compute_flag_etag(cached_flag)):
+            return not_modified(compute_flag_etag(cached_flag))
+
+    db_flag = (
+        db.query(Flag)
+        .options(selectinload(Flag.allowed_user_rows))
+        .filter(Flag.name == flag_name.lower())
+        .first()
+    )
 
     if not db_flag:
         raise FlagNotFoundException(flag_name)
 
+    response.headers["ETag"] = compute_flag_etag(db_flag)
     return db_flag
 
 
@@ -160,26 +688,208 @@ def update_flag(flag_name: str, flag_data: FlagUpdate, db: Session = Depends(get
     Raises:
         FlagNotFoundException: Si la bandera no existe
         InvalidRolloutPercentageException: Si el porcentaje de despliegue no es válido
+        InvalidHashAlgorithmException: Si el algoritmo de hash no está disponible
+        InvalidVariantsException: Si las variantes no son válidas
+        InvalidRulesException: Si las reglas no son válidas
+    """
+    # La existencia de la flag se comprueba en el lote del pipeline; si el
+    # cuerpo no es válido se comprueba antes, para responder 404 y no 400
+    try:
+        # Validar el porcentaje de despliegue si se proporciona
+        if flag_data.rollout_percentage is not None:
+            FlagValidator.validate_rollout_percentage(flag_data.rollout_percentage)
+
+        # Validar los usuarios permitidos si se proporcionan
+        if flag_data.allowed_users is not None:
+            FlagValidator.validate_allowed_users(flag_data.allowed_users)
+
+        # Validar el algoritmo de hash si se proporciona
+        if flag_data.hash_algorithm is not None:
+            FlagValidator.validate_hash_algorithm(flag_data.hash_algorithm)
+
+        # Validar las variantes si se proporcionan
+        if flag_data.variants is not None:
+            FlagValidator.validate_variants(flag_data.variants)
+
+        # Validar las reglas de segmentación si se proporcionan
+        if flag_data.rules is not None:
+            FlagValidator.validate_rules(flag_data.rules)
+    except (FlagException, ValueError):
+        AllowlistService.get_flag_id(db, flag_name)
+        raise
+
+    # Las actualizaciones concurrentes se confirman en grupo; la respuesta
+    # llega cuando el commit del lote termina
+    return flag_update_pipeline.update(
+        db, flag_name, flag_data.model_dump(exclude_unset=True)
+    )
+
+
+def _commit_allowlist_change(
+    db: Session,
+    flag_id: int,
+    added: Sequence[str] = (),
+    removed: Sequence[str] = (),
+) -> AllowlistChangeResponse:
     """
-    db_flag = db.query(Flag).filter(Flag.name == flag_name.lower()).first()
+    Confirma un cambio incremental de la lista y lo publica si hubo cambios.
 
-    if not db_flag:
-        raise FlagNotFoundException(flag_name)
+    Solo lee el nombre y la versión de la flag: ni la lista de permitidos ni
+    la flag completa se cargan para responder o publicar el cambio.
+    """
+    db.commit()
+    flag_name, version = db.execute(
+        select(Flag.name, Flag.version).where(Flag.id == flag_id)
+    ).one()
+    if added or removed:
+        # El snapshot aplica el delta y los suscriptores reciben solo el delta
+        notify_allowlist_committed(db, flag_id, flag_name, version, added, removed)
+        shared_flag_table.publish(db)
+    return AllowlistChangeResponse(
+        flag_name=flag_name, version=version, changed=len(added) + len(removed)
+    )
 
-    # Validar el porcentaje de despliegue si se proporciona
-    if flag_data.rollout_percentage is not None:
-        FlagValidator.validate_rollout_percentage(flag_data.rollout_percentage)
 
-    # Validar los usuarios permitidos si se proporcionan
-    if flag_data.allowed_users is not None:
-        FlagValidator.validate_allowed_users(flag_data.allowed_users)
+@router.post(
+    "/{flag_name}/users",
+    response_model=AllowlistChangeResponse,
+    status_code=status.HTTP_200_OK,
+)
+def add_allowed_users(
+    flag_name: str, request: AllowedUsersRequest, db: Session = Depends(get_db)
+):
+    """
+    Agrega usuarios a la lista de permitidos sin reescribirla.
 
-    # Actualizar campos
-    update_data = flag_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_flag, field, value)
+    Solo se insertan los usuarios que no estaban; la versión de la bandera
+    se incrementa si hubo alguno nuevo.
 
-    db.commit()
-    db.refresh(db_flag)
+    Args:
+        flag_name: Nombre de la bandera
+        request: IDs de los usuarios a agregar
+        db: Sesión de base de datos
 
-    return db_flag
+    Returns:
+        AllowlistChangeResponse: Usuarios agregados y versión resultante
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+    """
+    FlagValidator.validate_allowed_users(request.user_ids)
+    flag_id = AllowlistService.get_flag_id(db, flag_name)
+    added = AllowlistService.add_users(db, flag_id, request.user_ids)
+    return _commit_allowlist_change(db, flag_id, added=added)
+
+
+@router.delete(
+    "/{flag_name}/users/{user_id}",
+    response_model=AllowlistChangeResponse,
+    status_code=status.HTTP_200_OK,
+)
+def remove_allowed_user(flag_name: str, user_id: str, db: Session = Depends(get_db)):
+    """
+    Quita un usuario de la lista de permitidos.
+
+    Args:
+        flag_name: Nombre de la bandera
+        user_id: ID del usuario a quitar
+        db: Sesión de base de datos
+
+    Returns:
+        AllowlistChangeResponse: 1 si el usuario estaba en la lista, 0 si no
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+    """
+    flag_id = AllowlistService.get_flag_id(db, flag_name)
+    removed = AllowlistService.remove_user(db, flag_id, user_id)
+    return _commit_allowlist_change(db, flag_id, removed=[user_id] if removed else [])
+
+
+@router.get(
+    "/{flag_name}/users/{user_id}",
+    response_model=AllowlistMembershipResponse,
+    status_code=status.HTTP_200_OK,
+)
+def check_allowed_user(flag_name: str, user_id: str, db: Session = Depends(get_db)):
+    """
+    Indica si un usuario está en la lista de permitidos de una bandera.
+
+    Args:
+        flag_name: Nombre de la bandera
+        user_id: ID del usuario
+        db: Sesión de base de datos
+
+    Returns:
+        AllowlistMembershipResponse: Resultado de la búsqueda indexada
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+    """
+    flag_id = AllowlistService.get_flag_id(db, flag_name)
+    return AllowlistMembershipResponse(
+        flag_name=flag_name.lower(),
+        user_id=user_id,
+        allowed=AllowlistService.is_allowed(db, flag_id, user_id),
+    )
+
+
+@router.get(
+    "/{flag_name}/exposures",
+    response_model=FlagExposuresResponse,
+    status_code=status.HTTP_200_OK,
+)
+def get_flag_exposures(
+    flag_name: str,
+    since: Optional[datetime] = Query(
+        None, description="Inicio del intervalo (por defecto, una hora antes de until)"
+    ),
+    until: Optional[datetime] = Query(
+        None, description="Fin del intervalo (por defecto, ahora)"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Obtiene la serie temporal de exposiciones de una bandera por minuto.
+
+    Las exposiciones son las evaluaciones agregadas por razón; cada worker
+    las persiste cada ``EXPOSURE_FLUSH_INTERVAL_SECONDS``, por lo que los
+    últimos segundos pueden no estar incluidos todavía.
+
+    Args:
+        flag_name: Nombre de la bandera
+        since: Inicio del intervalo (UTC si no tiene zona horaria)
+        until: Fin del intervalo (UTC si no tiene zona horaria)
+        db: Sesión de base de datos
+
+    Returns:
+        FlagExposuresResponse: Minutos con evaluaciones y su conteo por razón
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+    """
+    name = flag_name.lower()
+    if not flag_cache.get(db, name):
+        raise FlagNotFoundException(flag_name)
+
+    until_minute = current_minute() if until is None else datetime_to_minute(until)
+    since_minute = (
+        until_minute - EXPOSURE_DEFAULT_WINDOW_MINUTES + 1
+        if since is None
+        else datetime_to_minute(since)
+    )
+    return FlagExposuresResponse(
+        flag_name=name,
+        since=minute_to_datetime(since_minute),
+        until=minute_to_datetime(until_minute),
+        points=[
+            ExposurePoint(
+                minute=minute_to_datetime(minute),
+                total=sum(reasons.values()),
+                reasons=reasons,
+            )
+            for minute, reasons in ExposureCounters.series(
+                db, name, since_minute, until_minute
+            )
+        ],
+    )
@@ -0,0 +1,370 @@
+"""
+Router asíncrono para operaciones CRUD y evaluación de flags.
+
+Expone las mismas rutas que ``app.routers.flags`` pero con handlers
+``async def`` sobre ``AsyncSession`` (aiosqlite o asyncpg según
+``DATABASE_URL``), de modo que las solicitudes no ocupan hilos del
+threadpool de Starlette mientras esperan a la base de datos. Cuando
+``USE_ASYNC_DB`` está activo, ``overlay_routes`` sustituye las rutas
+síncronas equivalentes; las que no redefine siguen atendidas por el router
+síncrono.
+"""
+
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.database import get_async_db
+from app.exceptions import FlagNotFoundException
+from app.middleware.metrics import metrics
+from app.models.flag import Flag
+from app.routers.conditional import etag_matches, not_modified
+from app.routers.listing import FlagListParams, astream_flags_ndjson
+from app.routers.responses import evaluate_response, flag_list_response
+from app.schemas.flag import (
+    EvaluateResponse,
+    FlagCreate,
+    FlagListResponse,
+    FlagResponse,
+    FlagUpdate,
+)
+from app.services.bucketing import DEFAULT_HASH_ALGORITHM
+from app.services.decision_cache import decision_cache
+from app.services.evaluation_log import evaluation_log
+from app.services.exposure_counters import exposure_counters
+from app.services.flag_cache import (
+    build_flag_rows,
+    compute_flag_etag,
+    compute_flag_set_etag,
+    flag_cache,
+)
+from app.services.flag_events import (
+    FLAG_CREATED,
+    FLAG_UPDATED,
+    flag_change_broker,
+    notify_flag_committed,
+)
+from app.services.shared_flag_table import shared_flag_table
+from app.services.targeting import attributes_from_query
+from app.validators.flag_validator import FlagValidator
+
+# Obtener el entorno actual
+ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
+
+router = APIRouter(prefix="/api/flags", tags=["flags"])
+
+
+def overlay_routes(sync_router: APIRouter) -> APIRouter:
+    """
+    Combina el router síncrono con las versiones asíncronas de sus rutas.
+
+    Conserva el orden de registro del router síncrono (relevante porque
+    ``/{flag_name}`` debe quedar después de las rutas fijas) y reemplaza cada
+    ruta por su equivalente asíncrona cuando existe.
+
+    Args:
+        sync_router: Router síncrono de flags
+
+    Returns:
+        APIRouter: Router con las rutas asíncronas en lugar de las síncronas
+    """
+    async_routes = {
+        (route.path, frozenset(route.methods)): route for route in router.routes
+    }
+    combined = APIRouter()
+    combined.routes.extend(
+        async_routes.get((route.path, frozenset(route.methods)), route)
+        for route in sync_router.routes
+    )
+    return combined
+
+
+async def _get_flag_or_404(db: AsyncSession, flag_name: str) -> Flag:
+    """Busca una flag por nombre, con su allowlist, o lanza FlagNotFoundException."""
+    result = await db.execute(
+        select(Flag)
+        .options(selectinload(Flag.allowed_user_rows))
+        .where(Flag.name == flag_name.lower())
+    )
+    db_flag = result.scalars().first()
+
+    if not db_flag:
+        raise FlagNotFoundException(flag_name)
+
+    return db_flag
+
+
+@router.get(
+    "/evaluate", response_model=EvaluateResponse, status_code=status.HTTP_200_OK
+)
+async def evaluate_flag(
+    request: Request,
+    user_id: str = Query(..., description="ID del usuario para evaluar la flag"),
+    flag: str = Query(..., description="Nombre de la flag a evaluar"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Evalúa si un usuario debe recibir una feature flag.
+
+    Args:
+        user_id: ID del usuario a evaluar
+        flag: Nombre de la flag a evaluar
+        request: Solicitud; el resto de la query son los atributos del usuario
+        db: Sesión asíncrona de base de datos
+
+    Returns:
+        OrjsonResponse: Resultado de la evaluación con razón (``EvaluateResponse``)
+
+    Raises:
+        FlagNotFoundException: Si la flag no existe
+    """
+    flag_name = flag.lower()
+
+    # Con la tabla compartida entre workers se evalúa sobre ella, sin la BD
+    # (salvo para reconstruirla si falta o expiró)
+    if shared_flag_table.needs_refresh():
+        await db.run_sync(shared_flag_table.refresh_if_stale)
+    shared_table = shared_flag_table.current()
+    if shared_table is not None:
+        if shared_table.has_rules(flag_name):
+            # La decisión depende de los atributos: no pasa por el caché
+            result = shared_table.evaluate(
+                flag_name, user_id, attributes_from_query(request.query_params)
+            )
+        else:
+            # La versión de las decisiones es el ETag del conjunto publicado
+            result = decision_cache.evaluate(
+                flag_name,
+                shared_table.etag,
+                user_id,
+                lambda user: shared_table.evaluate(flag_name, user),
+            )
+        if result is None:
+            raise FlagNotFoundException(flag)
+        enabled, reason = result
+        variant = shared_table.variant(flag_name, user_id) if enabled else None
+        metrics.count_evaluation(reason)
+        evaluation_log.record(flag_name, user_id, enabled, reason, variant)
+        exposure_counters.count(flag_name, reason)
+        return evaluate_response(flag_name, enabled, reason, variant)
+
+    # Buscar la flag en el snapshot en memoria (solo consulta la BD si falla)
+    cached_flag = await flag_cache.aget(db, flag_name)
+
+    if not cached_flag:
+        raise FlagNotFoundException(flag)
+
+    # Los atributos (el resto de la query) solo se leen si la flag tiene reglas
+    attributes = (
+        attributes_from_query(request.query_params)
+        if cached_flag.evaluator.rules is not None
+        else None
+    )
+    # Evaluar con el evaluador precompilado de la flag, pasando por el caché
+    # de decisiones si está activado
+    enabled, reason = decision_cache.evaluate_snapshot(cached_flag, user_id, attributes)
+    # La variante solo se asigna a quienes tienen la flag habilitada
+    variant = cached_flag.evaluator.variant(user_id) if enabled else None
+    metrics.count_evaluation(reason)
+    evaluation_log.record(cached_flag.name, user_id, enabled, reason, variant)
+    exposure_counters.count(cached_flag.name, reason)
+
+    # Se responde sin revalidar contra EvaluateResponse (ver OrjsonResponse)
+    return evaluate_response(cached_flag.name, enabled, reason, variant)
+
+
+@router.get("", response_model=FlagListResponse, status_code=status.HTTP_200_OK)
+async def list_flags(
+    params: FlagListParams = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Lista las flags, con filtros y paginación opcionales.
+
+    Args:
+        params: Filtros, paginación y formato de salida
+        db: Sesión asíncrona de base de datos
+
+    Returns:
+        OrjsonResponse | StreamingResponse: Flags solicitadas (``FlagListResponse``)
+    """
+    # Cursor de cambios a partir del cual este listado está al día
+    events_version = str(flag_change_broker.version)
+
+    if params.streaming:
+        result = await db.stream(params.query())
+        return StreamingResponse(
+            astream_flags_ndjson(result.scalars().partitions()),
+            media_type="application/x-ndjson",
+            headers={"X-Flag-Events-Version": events_version},
+        )
+
+    if params.is_full_listing:
+        current_etag = await flag_cache.aflag_set_etag(db)
+        if etag_matches(if_none_match, current_etag):
+            return not_modified(current_etag)
+
+    headers = {"X-Flag-Events-Version": events_version}
+    flags_stmt, allowed_stmt = params.row_queries()
+    flag_rows = (await db.execute(flags_stmt)).all()
+    allowed_rows = (await db.execute(allowed_stmt)).all()
+    flags, next_cursor = params.paginate(build_flag_rows(flag_rows, allowed_rows))
+    if params.is_full_listing:
+        headers["ETag"] = compute_flag_set_etag(flags)
+
+    # /flags refleja el entorno
+    return flag_list_response(
+        flags, params.total(flags), next_cursor, ENVIRONMENT, headers
+    )
+
+
+@router.post("", response_model=FlagResponse, status_code=status.HTTP_201_CREATED)
+async def create_flag(flag_data: FlagCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Crea una nueva flag.
+
+    Args:
+        flag_data: Datos para la creación de la flag
+        db: Sesión asíncrona de base de datos
+
+    Returns:
+        FlagResponse: Flag creada
+
+    Raises:
+        DuplicateFlagException: Si ya existe una bandera con ese nombre
+        InvalidRolloutPercentageException: Si el porcentaje de despliegue no es válido
+        InvalidFlagNameException: Si el formato del nombre no es válido
+        InvalidHashAlgorithmException: Si el algoritmo de hash no está disponible
+        InvalidVariantsException: Si las variantes no son válidas
+        InvalidRulesException: Si las reglas no son válidas
+    """
+    # Las flags nuevas usan el hash configurado salvo que pidan otro
+    hash_algorithm = flag_data.hash_algorithm or DEFAULT_HASH_ALGORITHM
+
+    await FlagValidator.validate_flag_data_async(
+        db=db,
+        name=flag_data.name,
+        rollout_percentage=flag_data.rollout_percentage,
+        allowed_users=flag_data.allowed_users,
+        hash_algorithm=hash_algorithm,
+    )
+    FlagValidator.validate_variants(flag_data.variants)
+    FlagValidator.validate_rules(flag_data.rules)
+
+    db_flag = Flag(
+        name=flag_data.name.lower(),
+        description=flag_data.description,
+        enabled=flag_data.enabled,
+        rollout_percentage=flag_data.rollout_percentage,
+        allowed_users=flag_data.allowed_users,
+        hash_algorithm=hash_algorithm,
+        variants=[variant.model_dump() for variant in flag_data.variants],
+        rules=[rule.model_dump() for rule in flag_data.rules],
+    )
+
+    db.add(db_flag)
+    await db.commit()
+    await db.refresh(db_flag)
+    # La allowlist no se carga con la flag; la respuesta y el snapshot la usan
+    await db.refresh(db_flag, ["allowed_user_rows"])
+
+    # Publicar la flag en el snapshot de evaluación y a los suscriptores
+    notify_flag_committed(db_flag, FLAG_CREATED)
+    await db.run_sync(shared_flag_table.publish)
+
+    return db_flag
+
+
+@router.get("/{flag_name}", response_model=FlagResponse, status_code=status.HTTP_200_OK)
+async def get_flag(
+    flag_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una bandera específica por su nombre.
+
+    Args:
+        flag_name: Nombre de la bandera
+        db: Sesión asíncrona de base de datos
+
+    Returns:
+        FlagResponse: Detalles de la bandera
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+    """
+    if if_none_match:
+        cached_flag = await flag_cache.aget(db, flag_name.lower())
+        if cached_flag and etag_matches(if_none_match, compute_flag_etag(cached_flag)):
+            return not_modified(compute_flag_etag(cached_flag))
+
+    db_flag = await _get_flag_or_404(db, flag_name)
+    response.headers["ETag"] = compute_flag_etag(db_flag)
+    return db_flag
+
+
+@router.put("/{flag_name}", response_model=FlagResponse, status_code=status.HTTP_200_OK)
+async def update_flag(
+    flag_name: str, flag_data: FlagUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Actualiza una bandera existente.
+
+    Args:
+        flag_name: Nombre de la flag a actualizar
+        flag_data: Datos actualizados de la bandera
+        db: Sesión asíncrona de base de datos
+
+    Returns:
+        FlagResponse: Flag actualizada
+
+    Raises:
+        FlagNotFoundException: Si la bandera no existe
+        InvalidRolloutPercentageException: Si el porcentaje de despliegue no es válido
+        InvalidHashAlgorithmException: Si el algoritmo de hash no está disponible
+        InvalidVariantsException: Si las variantes no son válidas
+        InvalidRulesException: Si las reglas no son válidas
+    """
+    db_flag = await _get_flag_or_404(db, flag_name)
+
+    if flag_data.rollout_percentage is not None:
+        FlagValidator.validate_rollout_percentage(flag_data.rollout_percentage)
+
+    if flag_data.allowed_users is not None:
+        FlagValidator.validate_allowed_users(flag_data.allowed_users)
+
+    if flag_data.hash_algorithm is not None:
+        FlagValidator.validate_hash_algorithm(flag_data.hash_algorithm)
+
+    if flag_data.variants is not None:
+        FlagValidator.validate_variants(flag_data.variants)
+
+    # Validar las reglas de segmentación si se proporcionan
+    if flag_data.rules is not None:
+        FlagValidator.validate_rules(flag_data.rules)
+
+    update_data = flag_data.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_flag, field, value)
+
+    # Incrementar la versión en la propia sentencia UPDATE
+    db_flag.version = Flag.version + 1
+
+    await db.commit()
+    await db.refresh(db_flag)
+    # La allowlist no se carga con la flag; la respuesta y el snapshot la usan
+    await db.refresh(db_flag, ["allowed_user_rows"])
+
+    # Publicar los cambios en el snapshot de evaluación y a los suscriptores
+    notify_flag_committed(db_flag, FLAG_UPDATED)
+    await db.run_sync(shared_flag_table.publish)
+
+    return db_flag
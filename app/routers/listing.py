@@ -0,0 +1,208 @@
+"""Parámetros de paginación, filtros y streaming del listado de flags."""
+
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+import orjson
+from fastapi import Query
+from sqlalchemy import Select, select
+from sqlalchemy.orm import selectinload
+
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.routers.responses import flag_payload
+from app.services.flag_cache import ALLOWED_USERS_QUERY, FLAG_ROW_COLUMNS
+
+# Máximo de flags por página en el listado paginado
+MAX_PAGE_SIZE = 1000
+
+# Filas que el cursor de la base de datos entrega por cada lote en streaming
+STREAM_BATCH_ROWS = 500
+
+LIST_FORMAT_JSON = "json"
+LIST_FORMAT_NDJSON = "ndjson"
+
+
+class FlagListParams:
+    """
+    Parámetros de consulta del listado de flags.
+
+    La paginación es por keyset sobre ``name`` (único e indexado): ``cursor``
+    es el último nombre recibido y cada página continúa desde ahí con una
+    búsqueda en el índice, sin ``OFFSET``. Se usa como dependencia de FastAPI
+    en los routers síncrono y asíncrono.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(
+            None,
+            ge=1,
+            le=MAX_PAGE_SIZE,
+            description="Tamaño de página; sin él se devuelven todas las flags",
+        ),
+        cursor: Optional[str] = Query(
+            None, description="Valor de next_cursor de la página anterior"
+        ),
+        enabled: Optional[bool] = Query(None, description="Filtrar por estado"),
+        prefix: Optional[str] = Query(
+            None, max_length=100, description="Filtrar por prefijo del nombre"
+        ),
+        min_rollout: Optional[int] = Query(
+            None, ge=0, le=100, description="Porcentaje de despliegue mínimo"
+        ),
+        max_rollout: Optional[int] = Query(
+            None, ge=0, le=100, description="Porcentaje de despliegue máximo"
+        ),
+        output_format: str = Query(
+            LIST_FORMAT_JSON,
+            alias="format",
+            pattern=f"^({LIST_FORMAT_JSON}|{LIST_FORMAT_NDJSON})$",
+            description=(
+                "json (por defecto) o ndjson para recibir las flags en streaming"
+            ),
+        ),
+    ):
+        self.limit = limit
+        self.cursor = cursor.lower() if cursor else None
+        self.enabled = enabled
+        self.prefix = prefix.lower() if prefix else None
+        self.min_rollout = min_rollout
+        self.max_rollout = max_rollout
+        self.output_format = output_format
+
+    @property
+    def is_full_listing(self) -> bool:
+        """Indica si se pide el listado completo, sin filtros ni paginación."""
+        return (
+            self.limit is None
+            and self.cursor is None
+            and self.enabled is None
+            and self.prefix is None
+            and self.min_rollout is None
+            and self.max_rollout is None
+        )
+
+    @property
+    def streaming(self) -> bool:
+        """Indica si la respuesta debe enviarse como NDJSON en streaming."""
+        return self.output_format == LIST_FORMAT_NDJSON
+
+    def query(self) -> Select:
+        """
+        Construye la consulta filtrada y ordenada por nombre.
+
+        Cuando hay ``limit`` en formato JSON se pide una fila de más para saber
+        si existe una página siguiente sin contar toda la tabla; en NDJSON el
+        cliente continúa desde el nombre de la última línea recibida.
+
+        Returns:
+            Select: Consulta de SQLAlchemy sobre Flag
+        """
+        stmt = self._filter(select(Flag).options(selectinload(Flag.allowed_user_rows)))
+        if self.streaming:
+            # Recorrer el cursor por lotes en lugar de materializar todo
+            stmt = stmt.execution_options(yield_per=STREAM_BATCH_ROWS)
+        return stmt
+
+    def row_queries(self) -> tuple[Select, Select]:
+        """
+        Construye las consultas de columnas equivalentes a ``query``.
+
+        Devuelven las filas de ``FLAG_ROW_COLUMNS`` y los usuarios permitidos de
+        esas mismas flags, para combinarlas con ``build_flag_rows`` y responder
+        el listado JSON sin instanciar ``Flag``.
+
+        Returns:
+            tuple[Select, Select]: (consulta de flags, consulta de usuarios permitidos)
+        """
+        flags_stmt = self._filter(select(*FLAG_ROW_COLUMNS))
+        allowed_stmt = ALLOWED_USERS_QUERY.where(
+            FlagAllowedUser.flag_id.in_(flags_stmt.with_only_columns(Flag.id))
+        )
+        return flags_stmt, allowed_stmt
+
+    def _filter(self, stmt: Select) -> Select:
+        """Aplica a ``stmt`` los filtros, el orden por nombre y el límite."""
+        stmt = stmt.order_by(Flag.name)
+        if self.cursor is not None:
+            stmt = stmt.where(Flag.name > self.cursor)
+        if self.enabled is not None:
+            stmt = stmt.where(Flag.enabled == self.enabled)
+        if self.prefix:
+            stmt = stmt.where(Flag.name.startswith(self.prefix, autoescape=True))
+        if self.min_rollout is not None:
+            stmt = stmt.where(Flag.rollout_percentage >= self.min_rollout)
+        if self.max_rollout is not None:
+            stmt = stmt.where(Flag.rollout_percentage <= self.max_rollout)
+        if self.limit is not None:
+            stmt = stmt.limit(self.limit if self.streaming else self.limit + 1)
+        return stmt
+
+    def total(self, flags: list) -> Optional[int]:
+        """
+        Devuelve el total de flags que cumplen los filtros.
+
+        Sin ``limit`` la respuesta las incluye todas; con ``limit`` se omite,
+        porque contarlas costaría una consulta sobre todas las páginas.
+
+        Args:
+            flags: Flags de la respuesta, ya paginadas
+
+        Returns:
+            Optional[int]: Total de flags o None en el listado paginado
+        """
+        return len(flags) if self.limit is None else None
+
+    def paginate(self, flags: list) -> tuple[list, Optional[str]]:
+        """
+        Recorta el resultado de ``query`` a la página solicitada.
+
+        Args:
+            flags: Filas devueltas por la consulta (``Flag`` o ``FlagRow``)
+
+        Returns:
+            tuple[list, Optional[str]]: (flags de la página, cursor de la
+                siguiente página o None si es la última)
+        """
+        if self.limit is None or len(flags) <= self.limit:
+            return flags, None
+        page = flags[: self.limit]
+        return page, page[-1].name
+
+
+def _ndjson_chunk(flags: Iterable[Flag]) -> bytes:
+    """Serializa un lote de flags como líneas NDJSON con la forma de FlagResponse."""
+    return b"".join(
+        orjson.dumps(flag_payload(flag), option=orjson.OPT_UTC_Z) + b"\n"
+        for flag in flags
+    )
+
+
+def stream_flags_ndjson(partitions: Iterable[list[Flag]]) -> Iterator[bytes]:
+    """
+    Convierte los lotes de un cursor de la base de datos en NDJSON.
+
+    Args:
+        partitions: Lotes de flags (``result.scalars().partitions()``)
+
+    Yields:
+        bytes: Un bloque de líneas NDJSON por lote
+    """
+    for partition in partitions:
+        yield _ndjson_chunk(partition)
+
+
+async def astream_flags_ndjson(
+    partitions: AsyncIterator[list[Flag]],
+) -> AsyncIterator[bytes]:
+    """
+    Versión asíncrona de ``stream_flags_ndjson``.
+
+    Args:
+        partitions: Lotes de flags de un ``AsyncResult``
+
+    Yields:
+        bytes: Un bloque de líneas NDJSON por lote
+    """
+    async for partition in partitions:
+        yield _ndjson_chunk(partition)
@@ -0,0 +1,113 @@
+"""Respuestas JSON de los endpoints calientes, serializadas con orjson."""
+
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Response
+
+from app.services.evaluation_service import parse_variants
+from app.services.targeting import parse_rules
+
+
+class OrjsonResponse(Response):
+    """
+    Respuesta JSON serializada con orjson.
+
+    Cuando un endpoint devuelve un ``Response``, FastAPI lo envía tal cual: no
+    valida el contenido contra ``response_model`` (que se conserva para la
+    documentación OpenAPI) ni lo serializa con su encoder, y en los endpoints
+    síncronos se ahorra además el salto al threadpool de esa validación. Solo
+    debe usarse con contenido construido a partir de objetos internos ya
+    validados, con la misma forma que el esquema declarado.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        # Z para UTC, igual que el serializador de Pydantic
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def evaluate_response(
+    flag_name: str, enabled: bool, reason: str, variant: Optional[str] = None
+) -> OrjsonResponse:
+    """
+    Construye la respuesta de ``GET /api/flags/evaluate``.
+
+    Args:
+        flag_name: Nombre normalizado de la flag
+        enabled: Resultado de la evaluación
+        reason: Razón del resultado
+        variant: Variante asignada, o None si la flag no tiene o está deshabilitada
+
+    Returns:
+        OrjsonResponse: Cuerpo con la forma de ``EvaluateResponse``
+    """
+    return OrjsonResponse(
+        {
+            "flag_name": flag_name,
+            "enabled": enabled,
+            "reason": reason,
+            "variant": variant,
+        }
+    )
+
+
+def flag_payload(flag) -> dict:
+    """
+    Convierte una flag en un dict con la forma de ``FlagResponse``.
+
+    Args:
+        flag: Flag persistida o snapshot con los mismos atributos
+
+    Returns:
+        dict: Campos de ``FlagResponse`` en el mismo orden
+    """
+    return {
+        "name": flag.name,
+        "description": flag.description,
+        "enabled": flag.enabled,
+        "rollout_percentage": flag.rollout_percentage,
+        "allowed_users": list(flag.allowed_users),
+        "hash_algorithm": flag.hash_algorithm,
+        "variants": [
+            {"name": variant.name, "weight": variant.weight}
+            for variant in parse_variants(flag.variants)
+        ],
+        "rules": [rule.to_dict() for rule in parse_rules(flag.rules)],
+        "id": flag.id,
+        "version": flag.version,
+        "created_at": flag.created_at,
+    }
+
+
+def flag_list_response(
+    flags: list,
+    total: Optional[int],
+    next_cursor: Optional[str],
+    environment: str,
+    headers: Optional[Mapping[str, str]] = None,
+) -> OrjsonResponse:
+    """
+    Construye la respuesta del listado de flags.
+
+    Args:
+        flags: Flags de la página
+        total: Total de flags que cumplen los filtros, o None si se paginó
+        next_cursor: Cursor de la página siguiente o None
+        environment: Entorno actual
+        headers: Cabeceras adicionales (ETag, versión de eventos)
+
+    Returns:
+        OrjsonResponse: Cuerpo con la forma de ``FlagListResponse``
+    """
+    return OrjsonResponse(
+        {
+            "flags": [flag_payload(flag) for flag in flags],
+            "total": total,
+            "count": len(flags),
+            "next_cursor": next_cursor,
+            "environment": environment,
+        },
+        headers=headers,
+    )
@@ -1,19 +1,51 @@
 """Pydantic schemas for request/response validation."""
 
 from app.schemas.flag import (
+    Variant,
+    TargetingRule,
     FlagBase,
     FlagCreate,
     FlagUpdate,
     FlagResponse,
     FlagListResponse,
     EvaluateResponse,
+    BatchEvaluateRequest,
+    AllowlistDelta,
+    FlagEventState,
+    FlagChangeEvent,
+    FlagChangesResponse,
+    FlagCacheStatsResponse,
+    DecisionCacheStatsResponse,
+    AllowedUsersRequest,
+    AllowlistChangeResponse,
+    AllowlistMembershipResponse,
+    FlagImportError,
+    FlagImportResponse,
+    ExposurePoint,
+    FlagExposuresResponse,
 )
 
 __all__ = [
+    "Variant",
+    "TargetingRule",
     "FlagBase",
     "FlagCreate",
     "FlagUpdate",
     "FlagResponse",
     "FlagListResponse",
     "EvaluateResponse",
+    "BatchEvaluateRequest",
+    "AllowlistDelta",
+    "FlagEventState",
+    "FlagChangeEvent",
+    "FlagChangesResponse",
+    "FlagCacheStatsResponse",
+    "DecisionCacheStatsResponse",
+    "AllowedUsersRequest",
+    "AllowlistChangeResponse",
+    "AllowlistMembershipResponse",
+    "FlagImportError",
+    "FlagImportResponse",
+    "ExposurePoint",
+    "FlagExposuresResponse",
 ]
@@ -1,10 +1,43 @@
 """Esquema de flags para validación de solicitudes/respuestas."""
 
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
+class Variant(BaseModel):
+    """Esquema de una variante A/B/n de una bandera."""
+
+    name: str = Field(
+        ..., min_length=1, max_length=100, description="Nombre de la variante"
+    )
+    weight: int = Field(
+        ..., ge=0, description="Peso relativo de la variante en el reparto"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+# Valor de una regla: escalar, o lista en los operadores in / not_in
+RuleScalar = Union[bool, int, float, str]
+
+
+class TargetingRule(BaseModel):
+    """Esquema de una regla de segmentación por atributo."""
+
+    attribute: str = Field(
+        ..., min_length=1, max_length=100, description="Atributo de la solicitud"
+    )
+    operator: str = Field(..., description="eq, neq, in, not_in, gt, gte, lt o lte")
+    value: Union[RuleScalar, List[RuleScalar]] = Field(
+        ..., description="Valor a comparar; una lista en in y not_in"
+    )
+
+    class Config:
+        from_attributes = True
+
+
 class FlagBase(BaseModel):
     """Esquema base para Flag con atributos comunes."""
 
@@ -23,6 +56,27 @@ class FlagBase(BaseModel):
     allowed_users: List[str] = Field(
         default_factory=list, description="Lista de IDs de usuarios permitidos"
     )
+    hash_algorithm: Optional[str] = Field(
+        None,
+        description=(
+            "Algoritmo de hash del rollout; por defecto el configurado en el servidor"
+        ),
+    )
+    variants: List[Variant] = Field(
+        default_factory=list,
+        description="Variantes A/B/n con sus pesos; vacía en las banderas booleanas",
+    )
+
+    rules: List[TargetingRule] = Field(
+        default_factory=list,
+        description="Reglas por atributo que el usuario debe cumplir todas",
+    )
+
+    @field_validator("variants", "rules", mode="before")
+    @classmethod
+    def default_variants(cls, v):
+        """Trata las listas nulas (filas anteriores a la columna) como vacías."""
+        return [] if v is None else v
 
     @field_validator("name")
     @classmethod
@@ -56,12 +110,33 @@ class FlagUpdate(BaseModel):
     allowed_users: Optional[List[str]] = Field(
         None, description="Nueva lista de IDs de usuarios permitidos"
     )
+    hash_algorithm: Optional[str] = Field(
+        None,
+        description=(
+            "Nuevo algoritmo de hash; cambiarlo reasigna a los usuarios del rollout"
+        ),
+    )
+    variants: Optional[List[Variant]] = Field(
+        None, description="Nuevas variantes; una lista vacía vuelve la bandera booleana"
+    )
+    rules: Optional[List[TargetingRule]] = Field(
+        None, description="Nuevas reglas de segmentación; una lista vacía las quita"
+    )
+
+    @field_validator("enabled", "rollout_percentage", "allowed_users", "hash_algorithm")
+    @classmethod
+    def reject_null(cls, v):
+        """Rechaza ``null`` explícito en campos que la tabla no admite nulos."""
+        if v is None:
+            raise ValueError("El campo no admite null; omítelo para no cambiarlo")
+        return v
 
 
 class FlagResponse(FlagBase):
     """Esquema para la respuesta de una bandera."""
 
     id: int = Field(..., description="ID único de la bandera")
+    version: int = Field(..., description="Versión de la bandera")
     created_at: datetime = Field(..., description="Fecha y hora de creación")
 
     class Config:
@@ -72,7 +147,18 @@ class FlagListResponse(BaseModel):
     """Esquema para la respuesta de lista de banderas."""
 
     flags: List[FlagResponse] = Field(..., description="Lista de banderas")
-    total: int = Field(..., description="Número total de banderas")
+    total: Optional[int] = Field(
+        ...,
+        description=(
+            "Número total de banderas que cumplen los filtros; null con ``limit``,"
+            " donde contarlas exigiría recorrer todas las páginas"
+        ),
+    )
+    count: int = Field(..., description="Número de banderas en la respuesta")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor para pedir la página siguiente; null en la última",
+    )
     # /flags refleja el entorno
     environment: str = Field(..., description="Entorno actual")
 
@@ -87,6 +173,169 @@ class EvaluateResponse(BaseModel):
     reason: str = Field(
         ..., description="Razón por la cual se otorgó o denegó el acceso"
     )
+    variant: Optional[str] = Field(
+        None,
+        description=(
+            "Variante asignada; null si la bandera no tiene variantes o no está "
+            "habilitada"
+        ),
+    )
 
     class Config:
         from_attributes = True
+
+
+class BatchEvaluateRequest(BaseModel):
+    """Esquema para evaluar varias flags para varios usuarios en una solicitud."""
+
+    user_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="IDs de los usuarios a evaluar",
+    )
+    flags: Optional[List[str]] = Field(
+        None,
+        description="Nombres de las flags a evaluar; si se omite se evalúan todas",
+    )
+    attributes: Dict[str, Dict[str, str]] = Field(
+        default_factory=dict,
+        description="Atributos de cada usuario para las reglas de segmentación",
+    )
+
+
+class AllowlistDelta(BaseModel):
+    """Esquema de un cambio incremental de la lista de permitidos."""
+
+    flag_name: str = Field(..., description="Nombre de la bandera")
+    version: int = Field(..., description="Versión de la bandera tras el cambio")
+    added: List[str] = Field(..., description="Usuarios agregados")
+    removed: List[str] = Field(..., description="Usuarios quitados")
+
+
+class FlagEventState(FlagResponse):
+    """Esquema del estado de una bandera dentro de un evento de cambio."""
+
+    allowed_users: Optional[List[str]] = Field(
+        None,
+        description=(
+            "Usuarios permitidos; null si son más de FLAG_EVENTS_MAX_ALLOWED_USERS"
+            " y hay que leerlos con GET /api/flags/{name}"
+        ),
+    )
+
+
+class FlagChangeEvent(BaseModel):
+    """Esquema de un cambio de flag difundido a los suscriptores."""
+
+    version: int = Field(..., description="Versión del cambio en este proceso")
+    type: str = Field(..., description="Tipo de cambio: created, updated o allowlist")
+    flag: Optional[FlagEventState] = Field(
+        None, description="Estado de la flag tras el cambio (created y updated)"
+    )
+    allowlist: Optional[AllowlistDelta] = Field(
+        None, description="Usuarios agregados y quitados (allowlist)"
+    )
+
+
+class FlagChangesResponse(BaseModel):
+    """Esquema para la respuesta de long-poll de cambios de flags."""
+
+    version: int = Field(..., description="Cursor a usar en la siguiente consulta")
+    reset: bool = Field(
+        ...,
+        description="Si es true, el cursor no es válido y hay que releer el listado",
+    )
+    events: List[FlagChangeEvent] = Field(..., description="Cambios posteriores")
+
+
+class FlagCacheStatsResponse(BaseModel):
+    """Esquema para las estadísticas del caché de flags."""
+
+    hits: int = Field(..., description="Lecturas servidas desde el caché")
+    misses: int = Field(..., description="Lecturas que requirieron consultar la BD")
+    refreshes: int = Field(..., description="Veces que se publicó un snapshot nuevo")
+    size: int = Field(..., description="Número de flags en el snapshot")
+    ttl_seconds: float = Field(
+        ..., description="Segundos antes de recargar el snapshot completo"
+    )
+
+
+class DecisionCacheStatsResponse(BaseModel):
+    """Esquema para las estadísticas del caché de decisiones."""
+
+    hits: int = Field(..., description="Evaluaciones servidas desde el caché")
+    misses: int = Field(..., description="Evaluaciones calculadas")
+    evictions: int = Field(..., description="Decisiones desalojadas por capacidad")
+    size: int = Field(..., description="Decisiones guardadas")
+    max_size: int = Field(..., description="Capacidad máxima (0: desactivado)")
+    hit_ratio: float = Field(..., description="Aciertos sobre el total de consultas")
+
+
+class AllowedUsersRequest(BaseModel):
+    """Esquema para agregar usuarios a la lista de permitidos de una bandera."""
+
+    user_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="IDs de los usuarios a agregar",
+    )
+
+
+class AllowlistChangeResponse(BaseModel):
+    """Esquema para la respuesta de un cambio incremental de la lista de permitidos."""
+
+    flag_name: str = Field(..., description="Nombre de la bandera")
+    version: int = Field(..., description="Versión de la bandera tras el cambio")
+    changed: int = Field(..., description="Usuarios agregados o quitados")
+
+
+class AllowlistMembershipResponse(BaseModel):
+    """Esquema para la respuesta de pertenencia a la lista de permitidos."""
+
+    flag_name: str = Field(..., description="Nombre de la bandera")
+    user_id: str = Field(..., description="ID del usuario consultado")
+    allowed: bool = Field(
+        ..., description="Si el usuario está en la lista de permitidos"
+    )
+
+
+class FlagImportError(BaseModel):
+    """Esquema de un error de una línea de la importación masiva."""
+
+    line: int = Field(..., description="Número de línea (desde 1)")
+    name: Optional[str] = Field(
+        None, description="Nombre de la bandera, si se pudo leer"
+    )
+    error: str = Field(..., description="Motivo por el que la línea no se aplicó")
+
+
+class FlagImportResponse(BaseModel):
+    """Esquema para la respuesta de la importación masiva de banderas."""
+
+    created: int = Field(0, description="Banderas creadas")
+    updated: int = Field(0, description="Banderas actualizadas")
+    unchanged: int = Field(0, description="Banderas existentes sin cambios")
+    errors: List[FlagImportError] = Field(
+        default_factory=list, description="Líneas que no se aplicaron"
+    )
+
+
+class ExposurePoint(BaseModel):
+    """Esquema de las exposiciones de una flag en un minuto."""
+
+    minute: datetime = Field(..., description="Inicio del minuto (UTC)")
+    total: int = Field(..., description="Evaluaciones en el minuto")
+    reasons: Dict[str, int] = Field(..., description="Evaluaciones por razón")
+
+
+class FlagExposuresResponse(BaseModel):
+    """Esquema para la serie temporal de exposiciones de una bandera."""
+
+    flag_name: str = Field(..., description="Nombre de la bandera")
+    since: datetime = Field(..., description="Inicio del intervalo consultado (UTC)")
+    until: datetime = Field(..., description="Fin del intervalo consultado (UTC)")
+    points: List[ExposurePoint] = Field(
+        ..., description="Minutos con evaluaciones, en orden cronológico"
+    )
@@ -1,5 +1,15 @@
 """Services for business logic."""
 
-from app.services.evaluation_service import EvaluationService
+from app.services.decision_cache import DecisionCache, decision_cache
+from app.services.evaluation_service import CompiledFlag, EvaluationService
+from app.services.flag_cache import FlagCache, FlagSnapshot, flag_cache
 
-__all__ = ["EvaluationService"]
+__all__ = [
+    "CompiledFlag",
+    "DecisionCache",
+    "EvaluationService",
+    "FlagCache",
+    "FlagSnapshot",
+    "decision_cache",
+    "flag_cache",
+]
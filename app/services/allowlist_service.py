@@ -0,0 +1,132 @@
+"""Operaciones incrementales sobre la lista de usuarios permitidos de una flag."""
+
+from typing import Iterable, List
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.exceptions import FlagNotFoundException
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+
+# Usuarios por consulta IN al comprobar cuáles ya están en la lista
+MEMBERSHIP_CHUNK_SIZE = 500
+
+
+class AllowlistService:
+    """
+    Servicio para modificar y consultar la lista de permitidos sin cargarla.
+
+    Las operaciones trabajan directamente sobre ``flag_allowed_users`` y el
+    índice ``(flag_id, user_id)``; ninguna lee ni reescribe la lista completa.
+    El commit queda a cargo de quien llama.
+    """
+
+    @staticmethod
+    def get_flag_id(db: Session, flag_name: str) -> int:
+        """
+        Obtiene el ID de una flag sin cargar su lista de permitidos.
+
+        Args:
+            db: Sesión de base de datos
+            flag_name: Nombre de la flag
+
+        Returns:
+            int: ID de la flag
+
+        Raises:
+            FlagNotFoundException: Si la flag no existe
+        """
+        flag_id = db.scalar(select(Flag.id).where(Flag.name == flag_name.lower()))
+        if flag_id is None:
+            raise FlagNotFoundException(flag_name)
+        return flag_id
+
+    @staticmethod
+    def add_users(db: Session, flag_id: int, user_ids: Iterable[str]) -> List[str]:
+        """
+        Agrega usuarios a la lista; los que ya estaban se ignoran.
+
+        Args:
+            db: Sesión de base de datos
+            flag_id: ID de la flag
+            user_ids: IDs de usuario a agregar
+
+        Returns:
+            List[str]: Usuarios agregados, en el orden recibido
+        """
+        candidates = list(dict.fromkeys(user_ids))
+        existing = set()
+        for start in range(0, len(candidates), MEMBERSHIP_CHUNK_SIZE):
+            chunk = candidates[start : start + MEMBERSHIP_CHUNK_SIZE]
+            existing.update(
+                db.scalars(
+                    select(FlagAllowedUser.user_id).where(
+                        FlagAllowedUser.flag_id == flag_id,
+                        FlagAllowedUser.user_id.in_(chunk),
+                    )
+                )
+            )
+
+        new_users = [user_id for user_id in candidates if user_id not in existing]
+        if new_users:
+            db.execute(
+                insert(FlagAllowedUser),
+                [{"flag_id": flag_id, "user_id": user_id} for user_id in new_users],
+            )
+            AllowlistService._bump_version(db, flag_id)
+        return new_users
+
+    @staticmethod
+    def remove_user(db: Session, flag_id: int, user_id: str) -> bool:
+        """
+        Quita un usuario de la lista.
+
+        Args:
+            db: Sesión de base de datos
+            flag_id: ID de la flag
+            user_id: ID del usuario a quitar
+
+        Returns:
+            bool: True si el usuario estaba en la lista
+        """
+        result = db.execute(
+            delete(FlagAllowedUser).where(
+                FlagAllowedUser.flag_id == flag_id,
+                FlagAllowedUser.user_id == user_id,
+            )
+        )
+        if not result.rowcount:
+            return False
+        AllowlistService._bump_version(db, flag_id)
+        return True
+
+    @staticmethod
+    def is_allowed(db: Session, flag_id: int, user_id: str) -> bool:
+        """
+        Comprueba si un usuario está en la lista mediante el índice compuesto.
+
+        Args:
+            db: Sesión de base de datos
+            flag_id: ID de la flag
+            user_id: ID del usuario
+
+        Returns:
+            bool: True si el usuario está en la lista de permitidos
+        """
+        row = db.scalar(
+            select(FlagAllowedUser.id)
+            .where(
+                FlagAllowedUser.flag_id == flag_id,
+                FlagAllowedUser.user_id == user_id,
+            )
+            .limit(1)
+        )
+        return row is not None
+
+    @staticmethod
+    def _bump_version(db: Session, flag_id: int) -> None:
+        """Incrementa la versión de la flag para invalidar ETags y cachés."""
+        db.execute(
+            update(Flag).where(Flag.id == flag_id).values(version=Flag.version + 1)
+        )
@@ -0,0 +1,251 @@
+"""Funciones hash intercambiables para el bucketing de rollout."""
+
+import hashlib
+import os
+from bisect import bisect_right
+from typing import Callable, Iterable, Optional, Sequence
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - dependencia opcional
+    xxhash = None
+
+# Hash 64 bits de un user_id para una flag concreta
+UserHasher = Callable[[str], int]
+# Hashes de muchos user_ids ya codificados en UTF-8, concatenados como
+# enteros de 8 bytes big-endian (listos para ``np.frombuffer(..., ">u8")``)
+BatchHasher = Callable[[Iterable[bytes]], bytes]
+
+# Algoritmo histórico: los primeros 8 bytes de SHA-256("{user_id}:{flag_name}").
+# Las flags creadas antes de que existiera esta capa quedan fijadas a él.
+SHA256 = "sha256"
+# BLAKE2b con digest de 8 bytes sobre "{flag_name}:{user_id}" (solo stdlib)
+BLAKE2B64 = "blake2b64"
+# XXH3 de 64 bits sobre "{flag_name}:{user_id}" (requiere el paquete xxhash)
+XXH3_64 = "xxh3_64"
+
+LEGACY_HASH_ALGORITHM = SHA256
+
+# Algoritmo asignado a las flags nuevas que no indican uno explícitamente
+DEFAULT_HASH_ALGORITHM = os.getenv("DEFAULT_HASH_ALGORITHM", BLAKE2B64)
+
+# Buckets del reparto de variantes: los pesos se resuelven al 0,01 %
+VARIANT_BUCKETS = 10_000
+
+
+def _sha256_hasher(flag_name: str) -> UserHasher:
+    """Hash histórico; el nombre de la flag va después del user_id."""
+    suffix = f":{flag_name}".encode()
+    sha256 = hashlib.sha256
+    from_bytes = int.from_bytes
+
+    def hash_user(user_id: str) -> int:
+        return from_bytes(sha256(user_id.encode() + suffix).digest()[:8], "big")
+
+    return hash_user
+
+
+def _blake2b64_hasher(flag_name: str) -> UserHasher:
+    """BLAKE2b de 64 bits; el prefijo de la flag se absorbe una sola vez."""
+    prefix_state = hashlib.blake2b(f"{flag_name}:".encode(), digest_size=8)
+    from_bytes = int.from_bytes
+
+    def hash_user(user_id: str) -> int:
+        state = prefix_state.copy()
+        state.update(user_id.encode())
+        return from_bytes(state.digest(), "big")
+
+    return hash_user
+
+
+def _xxh3_64_hasher(flag_name: str) -> UserHasher:
+    """XXH3 de 64 bits, no criptográfico."""
+    prefix = f"{flag_name}:".encode()
+    intdigest = xxhash.xxh3_64_intdigest
+
+    def hash_user(user_id: str) -> int:
+        return intdigest(prefix + user_id.encode())
+
+    return hash_user
+
+
+def _sha256_batch_hasher(flag_name: str) -> BatchHasher:
+    """Versión por lotes de ``_sha256_hasher``."""
+    suffix = f":{flag_name}".encode()
+    sha256 = hashlib.sha256
+
+    def hash_batch(user_ids: Iterable[bytes]) -> bytes:
+        return b"".join([sha256(user_id + suffix).digest()[:8] for user_id in user_ids])
+
+    return hash_batch
+
+
+def _blake2b64_batch_hasher(flag_name: str) -> BatchHasher:
+    """Versión por lotes de ``_blake2b64_hasher``."""
+    copy_prefix = hashlib.blake2b(f"{flag_name}:".encode(), digest_size=8).copy
+
+    def digest(user_id: bytes) -> bytes:
+        state = copy_prefix()
+        state.update(user_id)
+        return state.digest()
+
+    def hash_batch(user_ids: Iterable[bytes]) -> bytes:
+        return b"".join(map(digest, user_ids))
+
+    return hash_batch
+
+
+def _xxh3_64_batch_hasher(flag_name: str) -> BatchHasher:
+    """Versión por lotes de ``_xxh3_64_hasher``."""
+    prefix = f"{flag_name}:".encode()
+    # El digest canónico de xxhash ya es big-endian
+    digest = xxhash.xxh3_64_digest
+
+    def hash_batch(user_ids: Iterable[bytes]) -> bytes:
+        return b"".join([digest(prefix + user_id) for user_id in user_ids])
+
+    return hash_batch
+
+
+_HASHER_FACTORIES: dict[str, Callable[[str], UserHasher]] = {
+    SHA256: _sha256_hasher,
+    BLAKE2B64: _blake2b64_hasher,
+}
+_BATCH_HASHER_FACTORIES: dict[str, Callable[[str], BatchHasher]] = {
+    SHA256: _sha256_batch_hasher,
+    BLAKE2B64: _blake2b64_batch_hasher,
+}
+if xxhash is not None:
+    _HASHER_FACTORIES[XXH3_64] = _xxh3_64_hasher
+    _BATCH_HASHER_FACTORIES[XXH3_64] = _xxh3_64_batch_hasher
+
+
+def available_algorithms() -> tuple[str, ...]:
+    """Devuelve los algoritmos disponibles en este proceso."""
+    return tuple(_HASHER_FACTORIES)
+
+
+def make_user_hasher(algorithm: str, flag_name: str) -> UserHasher:
+    """
+    Construye la función hash de usuarios para una flag.
+
+    Args:
+        algorithm: Nombre del algoritmo registrado en la flag
+        flag_name: Nombre de la flag
+
+    Returns:
+        UserHasher: Función que devuelve el hash de 64 bits de un user_id
+
+    Raises:
+        ValueError: Si el algoritmo no está disponible
+    """
+    try:
+        factory = _HASHER_FACTORIES[algorithm]
+    except KeyError:
+        raise ValueError(f"Algoritmo de hash no disponible: '{algorithm}'") from None
+    return factory(flag_name)
+
+
+def make_batch_hasher(algorithm: str, flag_name: str) -> BatchHasher:
+    """
+    Construye la función hash por lotes de una flag.
+
+    Da los mismos valores que ``make_user_hasher``, pero recibe los user_ids
+    ya codificados y devuelve los digests concatenados: no crea un entero de
+    Python por usuario y el resultado se convierte a un arreglo de una vez.
+
+    Args:
+        algorithm: Nombre del algoritmo registrado en la flag
+        flag_name: Nombre de la flag
+
+    Returns:
+        BatchHasher: Función de user_ids (bytes) a digests de 8 bytes
+
+    Raises:
+        ValueError: Si el algoritmo no está disponible
+    """
+    try:
+        factory = _BATCH_HASHER_FACTORIES[algorithm]
+    except KeyError:
+        raise ValueError(f"Algoritmo de hash no disponible: '{algorithm}'") from None
+    return factory(flag_name)
+
+
+def hash_user_flag(
+    user_id: str, flag_name: str, algorithm: str = LEGACY_HASH_ALGORITHM
+) -> int:
+    """
+    Calcula el hash de 64 bits de un usuario para una flag.
+
+    Args:
+        user_id: ID del usuario
+        flag_name: Nombre de la flag
+        algorithm: Algoritmo de hash de la flag
+
+    Returns:
+        int: Valor hash como entero
+    """
+    if algorithm == SHA256:
+        # Camino directo del hash histórico, sin construir el hasher de la flag
+        digest = hashlib.sha256(f"{user_id}:{flag_name}".encode()).digest()
+        return int.from_bytes(digest[:8], byteorder="big")
+    return make_user_hasher(algorithm, flag_name)(user_id)
+
+
+def variant_bucket(user_hash: int) -> int:
+    """
+    Calcula el bucket de variante (0-9999) a partir del hash del usuario.
+
+    Usa los dígitos siguientes a los del bucket de rollout (``hash % 100``),
+    de modo que el reparto entre variantes es independiente de quién entra
+    en el rollout.
+
+    Args:
+        user_hash: Hash de 64 bits del usuario para la flag
+
+    Returns:
+        int: Bucket de variante
+    """
+    return user_hash // 100 % VARIANT_BUCKETS
+
+
+def variant_boundaries(weights: Sequence[int]) -> tuple[int, ...]:
+    """
+    Precalcula los límites superiores acumulados de cada variante.
+
+    Los pesos son relativos: la variante ``i`` ocupa los buckets
+    ``[límite[i - 1], límite[i])`` de ``VARIANT_BUCKETS``. Una variante con
+    peso 0 ocupa un tramo vacío y nunca se asigna.
+
+    Args:
+        weights: Pesos de las variantes, en orden; deben sumar más de 0
+
+    Returns:
+        tuple[int, ...]: Límites crecientes; el último es ``VARIANT_BUCKETS``
+    """
+    total = sum(weights)
+    cumulative = 0
+    boundaries = []
+    for weight in weights:
+        cumulative += weight
+        boundaries.append(cumulative * VARIANT_BUCKETS // total)
+    return tuple(boundaries)
+
+
+def pick_variant(
+    names: Sequence[str], boundaries: Sequence[int], user_hash: int
+) -> Optional[str]:
+    """
+    Elige la variante de un usuario con búsqueda binaria sobre los límites.
+
+    Args:
+        names: Nombres de las variantes, en el orden de ``boundaries``
+        boundaries: Límites de ``variant_boundaries``
+        user_hash: Hash de 64 bits del usuario para la flag
+
+    Returns:
+        Optional[str]: Variante asignada, o None si la flag no tiene variantes
+    """
+    if not names:
+        return None
+    return names[bisect_right(boundaries, variant_bucket(user_hash))]
@@ -0,0 +1,288 @@
+"""
+Evaluación masiva de flags para análisis offline de rollouts.
+
+Responde preguntas como "¿cuáles de estos 10M usuarios caen en la flag X
+al 35%?" sin pasar por ``EvaluationService.evaluate_flag`` usuario a usuario:
+las reglas se aplican con máscaras de NumPy. Los hashes del rollout se
+calculan por lotes (``make_batch_hasher``) en un único buffer que se
+convierte a ``uint64`` de una vez, y con ellos la lista de permitidos se
+resuelve con ``np.isin``. Los resultados son idénticos a los del evaluador
+por usuario.
+
+Offline no hay atributos de solicitud: en las flags con reglas de
+segmentación solo los usuarios de la lista de permitidos quedan habilitados
+y el resto recibe ``rule_not_matched``.
+
+Uso desde la línea de comandos:
+
+    python -m app.services.bulk_evaluation --flag new-feature --users ids.txt
+"""
+
+import argparse
+import os
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Union
+
+import numpy as np
+
+from app.services.bucketing import make_batch_hasher
+from app.services.evaluation_service import (
+    DEFAULT_DENY,
+    EVALUATION_REASONS,
+    FLAG_DISABLED,
+    IN_ROLLOUT,
+    NOT_IN_ROLLOUT,
+    RULE_NOT_MATCHED,
+    USER_IN_ALLOWLIST,
+    CompiledFlag,
+    EvaluationService,
+)
+
+if TYPE_CHECKING:
+    from app.models.flag import Flag
+
+# Códigos de razón: el índice en esta tupla es el valor del arreglo ``reasons``
+REASONS = EVALUATION_REASONS
+REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+
+UserIdSource = Union[str, os.PathLike, Iterable[str], "np.ndarray"]
+
+
+class BulkEvaluationResult(NamedTuple):
+    """Resultado de evaluar una flag para un arreglo de usuarios."""
+
+    flag_name: str
+    enabled: "np.ndarray"  # bool, uno por usuario
+    reasons: "np.ndarray"  # uint8, índices en REASONS
+
+    def reason_counts(self) -> dict[str, int]:
+        """Cuenta cuántos usuarios obtuvieron cada razón."""
+        counts = np.bincount(self.reasons, minlength=len(REASONS))
+        return {
+            reason: int(count) for reason, count in zip(REASONS, counts, strict=True)
+        }
+
+
+def load_user_ids(source: UserIdSource) -> "np.ndarray":
+    """
+    Normaliza los IDs de usuario a un arreglo de NumPy de cadenas.
+
+    Args:
+        source: Ruta a un archivo con un ID por línea, arreglo de NumPy o
+            cualquier iterable de cadenas
+
+    Returns:
+        np.ndarray: Arreglo unidimensional (dtype object) de IDs
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as handle:
+            user_ids = [line.rstrip("\r\n") for line in handle]
+        user_ids = [user_id for user_id in user_ids if user_id]
+    elif isinstance(source, np.ndarray):
+        return source.astype(object, copy=False).ravel()
+    else:
+        user_ids = list(source)
+
+    array = np.empty(len(user_ids), dtype=object)
+    array[:] = user_ids
+    return array
+
+
+def _encode(ids: "np.ndarray") -> list[bytes]:
+    """Codifica los IDs en UTF-8, la entrada de las funciones hash."""
+    return [user_id.encode() for user_id in ids.tolist()]
+
+
+def _uses_rollout_hash(compiled: CompiledFlag) -> bool:
+    """Indica si la evaluación de la flag depende del hash de los usuarios."""
+    return (
+        compiled.enabled
+        and compiled.rules is None
+        and 0 < compiled.rollout_percentage < 100
+    )
+
+
+def _hash_ids(compiled: CompiledFlag, encoded: Iterable[bytes]) -> "np.ndarray":
+    """Hashes de rollout de los usuarios como arreglo ``uint64``."""
+    hash_batch = make_batch_hasher(compiled.hash_algorithm, compiled.name)
+    return np.frombuffer(hash_batch(encoded), dtype=">u8").astype(np.uint64)
+
+
+def _allowlist_mask(
+    compiled: CompiledFlag, ids: "np.ndarray", hashes: Optional["np.ndarray"]
+) -> "np.ndarray":
+    """
+    Marca los usuarios de la lista de permitidos.
+
+    Con los hashes de rollout ya calculados, la pertenencia se resuelve con
+    ``np.isin`` sobre enteros y solo se confirman las coincidencias (un hash
+    de 64 bits puede colisionar). Sin hashes se consulta el frozenset: sobre
+    cadenas ``np.isin`` ordena el arreglo completo y es más lento.
+
+    Args:
+        compiled: Evaluador de la flag
+        ids: IDs de usuario
+        hashes: Hashes de rollout de ``ids``, o None
+
+    Returns:
+        np.ndarray: Máscara booleana, una posición por usuario
+    """
+    allowed = compiled.allowed_users
+    if not allowed:
+        return np.zeros(len(ids), dtype=bool)
+    if hashes is None:
+        return np.fromiter(
+            map(allowed.__contains__, ids.tolist()), dtype=bool, count=len(ids)
+        )
+
+    allowed_hashes = _hash_ids(compiled, [user_id.encode() for user_id in allowed])
+    mask = np.isin(hashes, allowed_hashes)
+    hits = np.flatnonzero(mask)
+    mask[hits] = np.fromiter(
+        map(allowed.__contains__, ids[hits].tolist()), dtype=bool, count=len(hits)
+    )
+    return mask
+
+
+def _evaluate_ids(
+    compiled: CompiledFlag, ids: "np.ndarray", encoded: Optional[list[bytes]]
+) -> BulkEvaluationResult:
+    """Evalúa una flag compilada; ``encoded`` son los IDs ya codificados."""
+    total = len(ids)
+
+    if not compiled.enabled:
+        reasons = np.full(total, REASON_CODES[FLAG_DISABLED[1]], dtype=np.uint8)
+        return BulkEvaluationResult(compiled.name, np.zeros(total, dtype=bool), reasons)
+
+    hashes = None
+    if _uses_rollout_hash(compiled):
+        # Se calcula el hash de todos, incluidos los permitidos: así la lista
+        # de permitidos también se resuelve sobre enteros
+        hashes = _hash_ids(compiled, encoded if encoded is not None else _encode(ids))
+
+    reasons = np.full(total, REASON_CODES[DEFAULT_DENY[1]], dtype=np.uint8)
+    in_allowlist = _allowlist_mask(compiled, ids, hashes)
+    reasons[in_allowlist] = REASON_CODES[USER_IN_ALLOWLIST[1]]
+
+    rollout = compiled.rollout_percentage
+    if compiled.rules is not None:
+        # Sin atributos ninguna regla se cumple
+        reasons[~in_allowlist] = REASON_CODES[RULE_NOT_MATCHED[1]]
+    elif rollout > 0:
+        candidates = np.flatnonzero(~in_allowlist)
+        if hashes is None:
+            in_rollout = np.ones(len(candidates), dtype=bool)
+        else:
+            in_rollout = (hashes[candidates] % np.uint64(100)) < np.uint64(rollout)
+        reasons[candidates] = np.where(
+            in_rollout,
+            REASON_CODES[IN_ROLLOUT[1]],
+            REASON_CODES[NOT_IN_ROLLOUT[1]],
+        )
+
+    enabled = in_allowlist | (reasons == REASON_CODES[IN_ROLLOUT[1]])
+    return BulkEvaluationResult(compiled.name, enabled, reasons)
+
+
+def _compile(flag: Union["Flag", CompiledFlag]) -> CompiledFlag:
+    """Devuelve el evaluador precompilado de la flag."""
+    return (
+        flag if isinstance(flag, CompiledFlag) else EvaluationService.compile_flag(flag)
+    )
+
+
+def bulk_evaluate(
+    flag: Union["Flag", CompiledFlag], user_ids: UserIdSource
+) -> BulkEvaluationResult:
+    """
+    Evalúa una flag para muchos usuarios a la vez.
+
+    Args:
+        flag: Flag (modelo, snapshot o evaluador precompilado)
+        user_ids: IDs de usuario (ver ``load_user_ids``)
+
+    Returns:
+        BulkEvaluationResult: Arreglos de habilitación y códigos de razón
+    """
+    return _evaluate_ids(_compile(flag), load_user_ids(user_ids), None)
+
+
+def bulk_evaluate_many(
+    flags: Iterable[Union["Flag", CompiledFlag]], user_ids: UserIdSource
+) -> dict[str, BulkEvaluationResult]:
+    """
+    Evalúa varias flags para el mismo conjunto de usuarios.
+
+    Los IDs se cargan y se codifican una sola vez para todas las flags.
+
+    Args:
+        flags: Flags a evaluar
+        user_ids: IDs de usuario (ver ``load_user_ids``)
+
+    Returns:
+        dict[str, BulkEvaluationResult]: Resultado por nombre de flag
+    """
+    ids = load_user_ids(user_ids)
+    compiled_flags = [_compile(flag) for flag in flags]
+    encoded = _encode(ids) if any(map(_uses_rollout_hash, compiled_flags)) else None
+    results = {}
+    for compiled in compiled_flags:
+        result = _evaluate_ids(compiled, ids, encoded)
+        results[result.flag_name] = result
+    return results
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Evalúa flags para un archivo de IDs de usuario"
+    )
+    parser.add_argument(
+        "--flag", action="append", required=True, help="Flag a evaluar (repetible)"
+    )
+    parser.add_argument("--users", required=True, help="Archivo con un ID por línea")
+    parser.add_argument(
+        "--output",
+        help="Directorio donde escribir los IDs habilitados por flag (<flag>.txt)",
+    )
+    args = parser.parse_args()
+
+    from sqlalchemy.orm import selectinload
+
+    from app.database import SessionLocal
+    from app.exceptions import FlagNotFoundException
+    from app.models.flag import Flag
+
+    db = SessionLocal()
+    try:
+        names = [name.lower() for name in args.flag]
+        flags = (
+            db.query(Flag)
+            .options(selectinload(Flag.allowed_user_rows))
+            .filter(Flag.name.in_(names))
+            .all()
+        )
+        found = {flag.name for flag in flags}
+        for name in names:
+            if name not in found:
+                raise FlagNotFoundException(name)
+        compiled = [EvaluationService.compile_flag(flag) for flag in flags]
+    finally:
+        db.close()
+
+    ids = load_user_ids(args.users)
+    for name, result in bulk_evaluate_many(compiled, ids).items():
+        enabled_count = int(result.enabled.sum())
+        print(f"{name}: {enabled_count}/{len(ids)} usuarios habilitados")
+        for reason, count in result.reason_counts().items():
+            if count:
+                print(f"  {reason:<28} {count}")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            with open(
+                os.path.join(args.output, f"{name}.txt"), "w", encoding="utf-8"
+            ) as handle:
+                handle.writelines(f"{user_id}\n" for user_id in ids[result.enabled])
+
+
+if __name__ == "__main__":
+    main()
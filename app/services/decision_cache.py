@@ -0,0 +1,151 @@
+"""Caché acotado de decisiones de evaluación por (flag, versión, usuario)."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Hashable, Mapping, Optional
+
+if TYPE_CHECKING:
+    from app.services.flag_cache import FlagSnapshot
+
+# Máximo de decisiones guardadas por proceso; 0 desactiva el caché
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "0"))
+
+Decision = tuple[bool, str]
+
+
+class DecisionCache:
+    """
+    Caché acotado de resultados ``(enabled, reason)`` de evaluación.
+
+    La clave incluye la versión de la flag: al actualizarse, las decisiones
+    anteriores dejan de consultarse sin invalidarlas explícitamente y se
+    desalojan a medida que entran las nuevas. La memoria queda acotada por
+    ``max_size`` entradas.
+
+    El desalojo sigue el algoritmo CLOCK, una aproximación de LRU: un acierto
+    solo marca la entrada como usada, sin reordenar ni tomar el lock, y al
+    desalojar las entradas marcadas reciben una segunda oportunidad. Los
+    contadores de aciertos y fallos se actualizan sin lock y son aproximados
+    con varios hilos.
+
+    Args:
+        max_size: Número máximo de decisiones; 0 desactiva el caché
+    """
+
+    def __init__(self, max_size: int = DECISION_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # Clave -> [decisión, usada desde la última pasada del reloj]
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si el caché guarda decisiones."""
+        return self.max_size > 0
+
+    def evaluate(
+        self,
+        flag_name: str,
+        version: Hashable,
+        user_id: str,
+        evaluate: Callable[[str], Optional[Decision]],
+    ) -> Optional[Decision]:
+        """
+        Devuelve la decisión guardada o la calcula y la guarda.
+
+        Args:
+            flag_name: Nombre de la flag
+            version: Versión de la flag (o de la tabla que la contiene)
+            user_id: ID del usuario
+            evaluate: Evaluador de la flag; recibe el ``user_id``
+
+        Returns:
+            Optional[Decision]: (habilitado, razón); None si ``evaluate``
+                devuelve None, que no se guarda
+        """
+        if self.max_size <= 0:
+            return evaluate(user_id)
+
+        key = (flag_name, version, user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] = True
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        decision = evaluate(user_id)
+        if decision is None:
+            return None
+
+        with self._lock:
+            entries = self._entries
+            entries[key] = [decision, False]
+            while len(entries) > self.max_size:
+                # La más antigua sale salvo que se haya usado desde la última pasada
+                oldest, candidate = entries.popitem(last=False)
+                if candidate[1]:
+                    candidate[1] = False
+                    entries[oldest] = candidate
+                else:
+                    self.evictions += 1
+        return decision
+
+    def evaluate_snapshot(
+        self,
+        flag: "FlagSnapshot",
+        user_id: str,
+        attributes: Optional[Mapping[str, str]] = None,
+    ) -> Decision:
+        """
+        Evalúa una flag del snapshot en memoria, usando el caché si conviene.
+
+        Solo las flags con rollout parcial pasan por el caché: en las demás el
+        evaluador compilado responde sin calcular el hash y es más rápido que
+        una consulta al caché. Las flags con reglas de segmentación tampoco,
+        porque su decisión depende de los atributos y no solo del usuario.
+
+        Args:
+            flag: Flag del snapshot de evaluación
+            user_id: ID del usuario
+            attributes: Atributos de la solicitud para las reglas de la flag
+
+        Returns:
+            Decision: (habilitado, razón)
+        """
+        evaluator = flag.evaluator
+        if (
+            self.max_size <= 0
+            or not evaluator.uses_rollout_hash
+            or evaluator.rules is not None
+        ):
+            return evaluator.evaluate(user_id, attributes)
+        return self.evaluate(flag.name, flag.version, user_id, evaluator.evaluate)
+
+    def clear(self) -> None:
+        """Vacía el caché y reinicia los contadores."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """Devuelve los contadores de uso del caché."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Instancia compartida por el proceso
+decision_cache = DecisionCache()
@@ -0,0 +1,257 @@
+"""
+Registro de evaluaciones de flags para análisis de experimentos.
+
+Cada evaluación servida por ``GET /api/flags/evaluate`` o por
+``POST /api/flags/evaluate/batch`` (una por usuario y flag) se anota como
+``(ts, flag, user_id, enabled, reason, variant)`` en un buffer circular en memoria; la
+solicitud no escribe en disco ni toma locks. Un hilo en segundo plano vacía el
+buffer cada ``EVALUATION_LOG_FLUSH_INTERVAL_MS`` y escribe el lote, una línea
+JSON por evaluación, en un archivo de solo anexado que rota al superar
+``EVALUATION_LOG_MAX_BYTES`` (``evaluations.ndjson`` -> ``.1`` -> ``.2``...).
+
+Bajo sobrecarga el registro pierde eventos antes que latencia:
+
+- ``EVALUATION_LOG_SAMPLE_RATE`` registra solo una fracción de evaluaciones.
+- Si el buffer está lleno (el disco no sigue el ritmo) las evaluaciones
+  nuevas se descartan y se cuentan en ``dropped``.
+
+Con varios workers de uvicorn cada proceso tiene su buffer y su hilo; usar
+``{pid}`` en ``EVALUATION_LOG_PATH`` para que cada uno escriba y rote su
+propio archivo.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Archivo de destino; vacío desactiva el registro. Admite ``{pid}``
+EVALUATION_LOG_PATH = os.getenv("EVALUATION_LOG_PATH", "")
+# Evaluaciones retenidas en memoria a la espera de escribirse
+EVALUATION_LOG_BUFFER_SIZE = int(os.getenv("EVALUATION_LOG_BUFFER_SIZE", "100000"))
+# Fracción de evaluaciones registradas (1.0 = todas)
+EVALUATION_LOG_SAMPLE_RATE = float(os.getenv("EVALUATION_LOG_SAMPLE_RATE", "1.0"))
+# Milisegundos entre escrituras del buffer al archivo
+EVALUATION_LOG_FLUSH_INTERVAL_MS = float(
+    os.getenv("EVALUATION_LOG_FLUSH_INTERVAL_MS", "1000")
+)
+# Tamaño a partir del cual se rota el archivo, y archivos rotados conservados
+EVALUATION_LOG_MAX_BYTES = int(os.getenv("EVALUATION_LOG_MAX_BYTES", str(64 << 20)))
+EVALUATION_LOG_BACKUPS = int(os.getenv("EVALUATION_LOG_BACKUPS", "5"))
+
+
+class EvaluationLog:
+    """
+    Buffer de evaluaciones con escritura asíncrona a un archivo rotativo.
+
+    ``record`` solo anexa una tupla a un ``deque`` (operación atómica con el
+    GIL); el hilo de escritura la retira con ``popleft``, por lo que
+    productores y consumidor no comparten ningún lock.
+
+    Args:
+        path: Archivo de destino; vacío desactiva el registro
+        capacity: Máximo de evaluaciones en memoria pendientes de escribir
+        sample_rate: Fracción de evaluaciones registradas
+        flush_interval: Segundos entre escrituras
+        max_bytes: Tamaño a partir del cual se rota el archivo
+        backups: Archivos rotados que se conservan
+    """
+
+    def __init__(
+        self,
+        path: str = EVALUATION_LOG_PATH,
+        capacity: int = EVALUATION_LOG_BUFFER_SIZE,
+        sample_rate: float = EVALUATION_LOG_SAMPLE_RATE,
+        flush_interval: float = EVALUATION_LOG_FLUSH_INTERVAL_MS / 1000,
+        max_bytes: int = EVALUATION_LOG_MAX_BYTES,
+        backups: int = EVALUATION_LOG_BACKUPS,
+    ):
+        self.path = path.format(pid=os.getpid()) if path else ""
+        self.capacity = max(1, capacity)
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+        self._buffer: deque[tuple] = deque()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        # Se activa con start(): sin hilo de escritura no se acumula nada
+        self.active = False
+        # Contadores informativos (aproximados con varios hilos)
+        self.recorded = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si hay un archivo de destino configurado."""
+        return bool(self.path)
+
+    def record(
+        self,
+        flag_name: str,
+        user_id: str,
+        enabled: bool,
+        reason: str,
+        variant: Optional[str] = None,
+    ) -> None:
+        """
+        Anota una evaluación en el buffer sin bloquear.
+
+        Args:
+            flag_name: Nombre de la flag evaluada
+            user_id: ID del usuario
+            enabled: Resultado de la evaluación
+            reason: Razón de la evaluación
+            variant: Variante asignada, si la flag tiene variantes
+        """
+        if not self.active:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self._buffer.append((time.time(), flag_name, user_id, enabled, reason, variant))
+        self.recorded += 1
+
+    def start(self) -> None:
+        """Abre el archivo y arranca el hilo de escritura (si está configurado)."""
+        if not self.enabled or self.active:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = self._open()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="evaluation-log", daemon=True
+        )
+        self.active = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo de escritura tras escribir lo pendiente."""
+        if not self.active:
+            return
+        self.active = False
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._flush_lock:
+            self._file.close()
+            self._file = None
+
+    def flush(self) -> int:
+        """
+        Escribe en el archivo las evaluaciones acumuladas en el buffer.
+
+        Returns:
+            int: Número de evaluaciones escritas
+        """
+        with self._flush_lock:
+            if self._file is None:
+                return 0
+            popleft = self._buffer.popleft
+            lines = []
+            # Solo lo presente al empezar: lo que llegue después va al lote siguiente
+            for _ in range(len(self._buffer)):
+                ts, flag_name, user_id, enabled, reason, variant = popleft()
+                lines.append(
+                    orjson.dumps(
+                        {
+                            "ts": ts,
+                            "flag": flag_name,
+                            "user_id": user_id,
+                            "enabled": enabled,
+                            "reason": reason,
+                            "variant": variant,
+                        }
+                    )
+                )
+            if not lines:
+                return 0
+            lines.append(b"")
+            try:
+                if self._file.closed:
+                    # Una rotación anterior no pudo reabrir el archivo
+                    self._file = self._open()
+                self._file.write(b"\n".join(lines))
+                self._file.flush()
+            except OSError:
+                logger.exception("No se pudo escribir el registro de evaluaciones")
+                self.dropped += len(lines) - 1
+                return 0
+            self.written += len(lines) - 1
+            if self.max_bytes > 0 and self._file.tell() >= self.max_bytes:
+                try:
+                    self._rotate()
+                except OSError:
+                    # El lote ya está escrito; se reintenta en el siguiente
+                    logger.exception("No se pudo rotar el registro de evaluaciones")
+            return len(lines) - 1
+
+    def stats(self) -> dict:
+        """Devuelve los contadores del registro."""
+        return {
+            "recorded": self.recorded,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "written": self.written,
+            "pending": len(self._buffer),
+            "rotations": self.rotations,
+        }
+
+    def _run(self) -> None:
+        """Bucle del hilo de escritura; un error no lo detiene."""
+        while not self._stop.wait(self.flush_interval):
+            self._flush_logged()
+        self._flush_logged()
+
+    def _flush_logged(self) -> None:
+        """Ejecuta ``flush`` registrando cualquier error en lugar de propagarlo."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Falló la escritura del registro de evaluaciones")
+
+    def _open(self):
+        """Abre el archivo en modo anexado; queda abierto hasta ``stop``."""
+        return open(self.path, "ab")
+
+    def _rotate(self) -> None:
+        """
+        Rota el archivo actual (el llamador sostiene ``_flush_lock``).
+
+        El archivo se reabre aunque la rotación falle; si tampoco puede
+        reabrirse queda cerrado y ``flush`` lo reintenta en el lote siguiente.
+        """
+        self._file.close()
+        try:
+            if self.backups > 0:
+                for index in range(self.backups - 1, 0, -1):
+                    source = f"{self.path}.{index}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        finally:
+            self._file = self._open()
+        self.rotations += 1
+
+
+# Registro compartido por el proceso
+evaluation_log = EvaluationLog()
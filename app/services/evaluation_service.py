@@ -1,30 +1,96 @@
 """Servicio de evaluación de feature flags con reglas de segmentación."""
 
-import hashlib
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, Mapping, NamedTuple, Optional
+
+from app.services.bucketing import (
+    LEGACY_HASH_ALGORITHM,
+    hash_user_flag,
+    make_user_hasher,
+    pick_variant,
+    variant_boundaries,
+)
+from app.services.targeting import compile_rules, match_rules, parse_rules
 
 if TYPE_CHECKING:
     from app.models.flag import Flag
 
+# Resultados posibles de una evaluación, compartidos para no crear tuplas nuevas
+FLAG_DISABLED = (False, "flag_disabled")
+USER_IN_ALLOWLIST = (True, "user_in_allowlist")
+IN_ROLLOUT = (True, "rollout_percentage")
+NOT_IN_ROLLOUT = (False, "not_in_rollout_percentage")
+DEFAULT_DENY = (False, "default_deny")
+RULE_NOT_MATCHED = (False, "rule_not_matched")
+
+# Razones de todos los resultados anteriores, en un orden estable
+EVALUATION_REASONS = tuple(
+    reason
+    for _, reason in (
+        FLAG_DISABLED,
+        USER_IN_ALLOWLIST,
+        IN_ROLLOUT,
+        NOT_IN_ROLLOUT,
+        DEFAULT_DENY,
+        RULE_NOT_MATCHED,
+    )
+)
+
+# Atributos de una evaluación sin atributos
+_NO_ATTRIBUTES: Mapping[str, str] = {}
+
+
+class FlagVariant(NamedTuple):
+    """Variante de una flag con su peso relativo."""
+
+    name: str
+    weight: int
+
+
+def parse_variants(variants: Optional[Iterable]) -> tuple[FlagVariant, ...]:
+    """
+    Normaliza las variantes de una flag.
+
+    Args:
+        variants: Variantes como se guardan en la columna JSON (dicts con
+            ``name`` y ``weight``), pares (nombre, peso) o None
+
+    Returns:
+        tuple[FlagVariant, ...]: Variantes en orden; vacía si la flag es booleana
+    """
+    if not variants:
+        return ()
+    return tuple(
+        (
+            FlagVariant(str(variant["name"]), int(variant["weight"]))
+            if isinstance(variant, dict)
+            else FlagVariant(str(variant[0]), int(variant[1]))
+        )
+        for variant in variants
+    )
+
 
 class EvaluationService:
     """
     Servicio para evaluar si un usuario debe recibir una feature flag.
 
-    Implementa tres estrategias de segmentación:
+    Implementa cuatro estrategias de segmentación:
     1. Por usuario específico (allowed_users)
-    2. Por porcentaje de rollout (rollout_percentage)
-    3. Por estrategia predeterminada (flag enabled/disabled)
+    2. Por atributos de la solicitud (rules)
+    3. Por porcentaje de rollout (rollout_percentage)
+    4. Por estrategia predeterminada (flag enabled/disabled)
     """
 
     @staticmethod
-    def evaluate_flag(flag: "Flag", user_id: str) -> tuple[bool, str]:
+    def evaluate_flag(
+        flag: "Flag", user_id: str, attributes: Optional[Mapping[str, str]] = None
+    ) -> tuple[bool, str]:
         """
         Evalúa si un usuario debe recibir la feature flag.
 
         Args:
             flag: Objeto Flag a evaluar
             user_id: ID del usuario
+            attributes: Atributos de la solicitud para las reglas de la flag
 
         Returns:
             tuple[bool, str]: (habilitado, razón)
@@ -38,6 +104,8 @@ class EvaluationService:
         allowed_users_list = list(flag.allowed_users) if flag.allowed_users else []  # type: ignore[arg-type,call-overload]
         rollout = int(flag.rollout_percentage) if flag.rollout_percentage is not None else 0  # type: ignore[arg-type,call-overload]
         flag_name = str(flag.name)
+        # Las flags sin algoritmo registrado conservan el hash histórico
+        algorithm = getattr(flag, "hash_algorithm", None) or LEGACY_HASH_ALGORITHM
 
         # Regla 1: Si la flag está deshabilitada, nadie la recibe
         if not enabled:
@@ -47,11 +115,16 @@ class EvaluationService:
         if user_id in allowed_users_list:
             return True, "user_in_allowlist"
 
-        # Regla 3: Evaluación por porcentaje de rollout
+        # Regla 3: Si la flag tiene reglas, el usuario debe cumplirlas todas
+        rules = parse_rules(getattr(flag, "rules", None))
+        if rules and not match_rules(rules, attributes or _NO_ATTRIBUTES):
+            return False, "rule_not_matched"
+
+        # Regla 4: Evaluación por porcentaje de rollout
         if rollout > 0:
             # Usar hash determinístico para asegurar consistencia
             # El mismo usuario siempre obtendrá el mismo resultado para la misma flag
-            user_hash = EvaluationService._hash_user_flag(user_id, flag_name)
+            user_hash = EvaluationService._hash_user_flag(user_id, flag_name, algorithm)
 
             # Convertir hash a porcentaje (0-100)
             user_percentage = user_hash % 100
@@ -61,28 +134,210 @@ class EvaluationService:
             else:
                 return False, "not_in_rollout_percentage"
 
-        # Regla 4: Si no hay rollout y el usuario no está en allowlist, denegar
+        # Regla 5: Si no hay rollout y el usuario no está en allowlist, denegar
         return False, "default_deny"
 
     @staticmethod
-    def _hash_user_flag(user_id: str, flag_name: str) -> int:
+    def assign_variant(flag: "Flag", user_id: str) -> Optional[str]:
+        """
+        Asigna la variante de un usuario según los pesos de la flag.
+
+        Solo tiene sentido para usuarios con la flag habilitada; el reparto
+        usa el mismo hash que el rollout, a una resolución de 10 000 buckets.
+
+        Args:
+            flag: Objeto Flag con ``variants``
+            user_id: ID del usuario
+
+        Returns:
+            Optional[str]: Nombre de la variante, o None si la flag no tiene
+        """
+        variants = parse_variants(getattr(flag, "variants", None))
+        if not variants:
+            return None
+        algorithm = getattr(flag, "hash_algorithm", None) or LEGACY_HASH_ALGORITHM
+        return pick_variant(
+            [variant.name for variant in variants],
+            variant_boundaries([variant.weight for variant in variants]),
+            EvaluationService._hash_user_flag(user_id, str(flag.name), algorithm),
+        )
+
+    @staticmethod
+    def compile_flag(flag: "Flag") -> "CompiledFlag":
+        """
+        Precompila una flag en un evaluador reutilizable.
+
+        Args:
+            flag: Objeto Flag (o snapshot equivalente) a compilar
+
+        Returns:
+            CompiledFlag: Evaluador con los campos ya normalizados
+        """
+        return CompiledFlag(
+            name=str(flag.name),
+            enabled=bool(flag.enabled) if flag.enabled is not None else False,
+            rollout_percentage=(
+                int(flag.rollout_percentage)
+                if flag.rollout_percentage is not None
+                else 0
+            ),
+            allowed_users=flag.allowed_users or (),
+            hash_algorithm=(
+                getattr(flag, "hash_algorithm", None) or LEGACY_HASH_ALGORITHM
+            ),
+            variants=parse_variants(getattr(flag, "variants", None)),
+            rules=parse_rules(getattr(flag, "rules", None)),
+        )
+
+    @staticmethod
+    def _hash_user_flag(
+        user_id: str, flag_name: str, algorithm: str = LEGACY_HASH_ALGORITHM
+    ) -> int:
         """
         Genera un hash determinístico basado en user_id y flag_name.
 
         Args:
             user_id: ID del usuario
             flag_name: Nombre de la flag
+            algorithm: Algoritmo de hash registrado en la flag (SHA-256 por defecto)
 
         Returns:
             int: Valor hash como entero
         """
-        # Crear una cadena única combinando user_id y flag_name
-        unique_string = f"{user_id}:{flag_name}"
+        return hash_user_flag(user_id, flag_name, algorithm)
+
+
+class CompiledFlag:
+    """
+    Evaluador precompilado de una flag.
+
+    Se construye una vez cada vez que la flag cambia y produce exactamente los
+    mismos resultados que ``EvaluationService.evaluate_flag``, pero sin volver
+    a derivar los campos en cada llamada: la allowlist es un frozenset, la
+    función hash de la flag ya tiene su parte fija codificada y el umbral de
+    rollout está resuelto de antemano. Los límites acumulados de las
+    variantes también se calculan una vez, así que asignar una variante es
+    una búsqueda binaria: O(log k) con k variantes. Las reglas de
+    segmentación se compilan en un predicado (ver ``app.services.targeting``).
+    """
+
+    __slots__ = (
+        "allowed_users",
+        "enabled",
+        "hash_algorithm",
+        "hash_user",
+        "name",
+        "rollout_percentage",
+        "rules",
+        "variant_boundaries",
+        "variant_names",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool,
+        rollout_percentage: int,
+        allowed_users: Iterable[str],
+        hash_algorithm: str = LEGACY_HASH_ALGORITHM,
+        variants: Iterable[FlagVariant] = (),
+        rules: Iterable = (),
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.rollout_percentage = rollout_percentage
+        self.allowed_users = frozenset(allowed_users)
+        self.hash_algorithm = hash_algorithm
+        self.hash_user = make_user_hasher(hash_algorithm, name)
+        variants = tuple(variants)
+        self.variant_names = tuple(variant.name for variant in variants)
+        self.variant_boundaries = (
+            variant_boundaries([variant.weight for variant in variants])
+            if variants
+            else ()
+        )
+        # Predicado de las reglas; None si la flag no segmenta por atributos
+        self.rules = compile_rules(parse_rules(rules))
+
+    def with_allowed_users(self, allowed_users: frozenset) -> "CompiledFlag":
+        """
+        Copia del evaluador con otra lista de permitidos.
+
+        Reutiliza la función hash, las variantes y las reglas ya compiladas.
+
+        Args:
+            allowed_users: Nueva lista de permitidos
+
+        Returns:
+            CompiledFlag: Evaluador equivalente salvo por la lista
+        """
+        clone = CompiledFlag.__new__(CompiledFlag)
+        for slot in CompiledFlag.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone.allowed_users = allowed_users
+        return clone
+
+    @property
+    def uses_rollout_hash(self) -> bool:
+        """Indica si evaluar puede requerir el hash del usuario (rollout parcial)."""
+        return self.enabled and 0 < self.rollout_percentage < 100
+
+    def bucket(self, user_id: str) -> int:
+        """
+        Calcula el bucket (0-99) del usuario para esta flag.
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            int: Bucket determinístico del usuario
+        """
+        return self.hash_user(user_id) % 100
+
+    def evaluate(
+        self, user_id: str, attributes: Optional[Mapping[str, str]] = None
+    ) -> tuple[bool, str]:
+        """
+        Evalúa si un usuario debe recibir la feature flag.
+
+        Args:
+            user_id: ID del usuario
+            attributes: Atributos de la solicitud para las reglas de la flag
+
+        Returns:
+            tuple[bool, str]: (habilitado, razón)
+        """
+        if not self.enabled:
+            return FLAG_DISABLED
 
-        # Generar hash SHA-256
-        hash_object = hashlib.sha256(unique_string.encode())
+        if user_id in self.allowed_users:
+            return USER_IN_ALLOWLIST
 
-        # Convertir los primeros 8 bytes del hash a un entero
-        hash_int = int.from_bytes(hash_object.digest()[:8], byteorder="big")
+        rules = self.rules
+        if rules is not None and not rules(attributes or _NO_ATTRIBUTES):
+            return RULE_NOT_MATCHED
 
-        return hash_int
+        rollout = self.rollout_percentage
+        if rollout > 0:
+            # Con rollout >= 100 todo bucket (0-99) queda dentro: no hace falta el hash
+            if rollout >= 100 or self.bucket(user_id) < rollout:
+                return IN_ROLLOUT
+            return NOT_IN_ROLLOUT
+
+        return DEFAULT_DENY
+
+    def variant(self, user_id: str) -> Optional[str]:
+        """
+        Asigna la variante de un usuario (para usuarios con la flag habilitada).
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Optional[str]: Nombre de la variante, o None si la flag no tiene
+        """
+        if not self.variant_names:
+            return None
+        return pick_variant(
+            self.variant_names, self.variant_boundaries, self.hash_user(user_id)
+        )
@@ -0,0 +1,297 @@
+"""
+Contadores de exposición por flag, razón y minuto.
+
+Los dashboards de rollout solo necesitan cuántas evaluaciones hubo por flag y
+razón en cada minuto, no cada evento. Cada evaluación incrementa un contador
+en memoria y un hilo en segundo plano suma los incrementos a la tabla
+``flag_exposures`` cada ``EXPOSURE_FLUSH_INTERVAL_SECONDS``:
+
+- Los contadores están repartidos por hilo: cada hilo incrementa su propio
+  diccionario, sin lock ni contención entre los hilos del threadpool. El
+  reparto de un hilo terminado se descarta en cuanto está escrito por
+  completo, así que la memoria no crece con la rotación de hilos.
+- El hilo de escritura copia cada diccionario y escribe la diferencia con lo
+  ya persistido; los contadores en memoria no se reinician, así que ningún
+  incremento se pierde aunque ocurra durante la escritura.
+- La evaluación no consulta el reloj: las escrituras se alinean al reloj en
+  múltiplos del intervalo (que debe dividir 60) y los incrementos de cada
+  ventana se atribuyen al minuto que la contiene.
+- La escritura es un upsert aditivo (``count = count + excluded.count``):
+  con varios workers de uvicorn cada uno suma lo suyo a las mismas filas y la
+  tabla contiene el total de todos los procesos.
+
+Las series consultadas reflejan las evaluaciones hasta la última escritura de
+cada worker.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from datetime import UTC, datetime
+from typing import Callable, Mapping, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.flag_exposure import FlagExposure
+
+logger = logging.getLogger(__name__)
+
+# Contar las evaluaciones por flag, razón y minuto
+EXPOSURE_COUNTERS_ENABLED = os.getenv("EXPOSURE_COUNTERS_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Segundos entre escrituras de los contadores a la base de datos
+EXPOSURE_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("EXPOSURE_FLUSH_INTERVAL_SECONDS", "10")
+)
+
+# Clave de un contador: (flag, razón)
+ExposureKey = tuple[str, str]
+
+
+def current_minute() -> int:
+    """Minuto actual en minutos desde la época Unix (UTC)."""
+    return int(time.time()) // 60
+
+
+def minute_to_datetime(minute: int) -> datetime:
+    """Convierte un minuto desde la época Unix en un ``datetime`` UTC."""
+    return datetime.fromtimestamp(minute * 60, tz=UTC)
+
+
+def datetime_to_minute(value: datetime) -> int:
+    """Convierte un ``datetime`` (UTC si no tiene zona) en minutos desde la época."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return int(value.timestamp()) // 60
+
+
+class _Shard:
+    """Contadores de un hilo y la parte de ellos ya escrita en la base."""
+
+    __slots__ = ("counts", "flushed", "owner")
+
+    def __init__(self):
+        # Solo el hilo dueño incrementa ``counts``
+        self.counts: dict[ExposureKey, int] = {}
+        self.flushed: dict[ExposureKey, int] = {}
+        self.owner = weakref.ref(threading.current_thread())
+
+    def is_finished(self) -> bool:
+        """Indica si el hilo dueño terminó y todo lo que contó está escrito."""
+        owner = self.owner()
+        if owner is not None and owner.is_alive():
+            return False
+        # Sin dueño ``counts`` ya no cambia
+        return self.counts == self.flushed
+
+
+class ExposureCounters:
+    """
+    Contadores de evaluaciones repartidos por hilo y persistidos por minuto.
+
+    Args:
+        enabled: Si es False, ``count`` no registra nada
+        flush_interval: Segundos entre escrituras del hilo en segundo plano
+    """
+
+    def __init__(
+        self,
+        enabled: bool = EXPOSURE_COUNTERS_ENABLED,
+        flush_interval: float = EXPOSURE_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def count(self, flag_name: str, reason: str, amount: int = 1) -> None:
+        """
+        Suma evaluaciones de una flag con una razón.
+
+        Args:
+            flag_name: Nombre de la flag
+            reason: Razón de la evaluación
+            amount: Número de evaluaciones
+        """
+        if not self.enabled:
+            return
+        try:
+            counts = self._local.counts
+        except AttributeError:
+            counts = self._register()
+        key = (flag_name, reason)
+        counts[key] = counts.get(key, 0) + amount
+
+    def count_many(self, flag_name: str, reason_counts: Mapping[str, int]) -> None:
+        """Suma de una vez las evaluaciones de una flag por razón (en lote)."""
+        for reason, amount in reason_counts.items():
+            if amount:
+                self.count(flag_name, reason, amount)
+
+    def flush(self, db: Session, minute: Optional[int] = None) -> int:
+        """
+        Suma a ``flag_exposures`` los incrementos pendientes de todos los hilos.
+
+        Si la escritura falla, los incrementos siguen pendientes y se
+        reintentan en la siguiente llamada.
+
+        Args:
+            db: Sesión de base de datos
+            minute: Minuto al que se atribuyen los incrementos; por defecto el actual
+
+        Returns:
+            int: Filas (flag, minuto, razón) escritas
+        """
+        if minute is None:
+            minute = current_minute()
+        with self._flush_lock:
+            with self._shards_lock:
+                shards = list(self._shards)
+
+            deltas: dict[ExposureKey, int] = {}
+            copies: list[tuple[_Shard, dict[ExposureKey, int]]] = []
+            for shard in shards:
+                # dict.copy es atómico con el GIL aunque el dueño siga contando
+                counts = shard.counts.copy()
+                flushed = shard.flushed
+                for key, value in counts.items():
+                    delta = value - flushed.get(key, 0)
+                    if delta:
+                        deltas[key] = deltas.get(key, 0) + delta
+                copies.append((shard, counts))
+
+            if deltas:
+                try:
+                    self._upsert(db, minute, deltas)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+
+            for shard, counts in copies:
+                shard.flushed = counts
+
+            finished = {shard for shard in shards if shard.is_finished()}
+            if finished:
+                with self._shards_lock:
+                    self._shards = [
+                        shard for shard in self._shards if shard not in finished
+                    ]
+            return len(deltas)
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """
+        Arranca el hilo que escribe los contadores periódicamente.
+
+        Args:
+            session_factory: Fábrica de sesiones para cada escritura
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(session_factory,),
+            name="exposure-counters",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo de escritura tras escribir lo pendiente."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    @staticmethod
+    def series(
+        db: Session, flag_name: str, since_minute: int, until_minute: int
+    ) -> list[tuple[int, dict[str, int]]]:
+        """
+        Obtiene las exposiciones persistidas de una flag por minuto.
+
+        Args:
+            db: Sesión de base de datos
+            flag_name: Nombre de la flag
+            since_minute: Primer minuto incluido
+            until_minute: Último minuto incluido
+
+        Returns:
+            list[tuple[int, dict[str, int]]]: (minuto, conteo por razón) de los
+                minutos con evaluaciones, en orden cronológico
+        """
+        rows = db.execute(
+            select(FlagExposure.minute, FlagExposure.reason, FlagExposure.count)
+            .where(
+                FlagExposure.flag_name == flag_name,
+                FlagExposure.minute >= since_minute,
+                FlagExposure.minute <= until_minute,
+            )
+            .order_by(FlagExposure.minute, FlagExposure.reason)
+        )
+        points: dict[int, dict[str, int]] = {}
+        for minute, reason, count in rows:
+            points.setdefault(minute, {})[reason] = count
+        return list(points.items())
+
+    def _register(self) -> dict[ExposureKey, int]:
+        """Crea el reparto de contadores del hilo actual."""
+        shard = _Shard()
+        with self._shards_lock:
+            self._shards.append(shard)
+        self._local.counts = shard.counts
+        return shard.counts
+
+    @staticmethod
+    def _upsert(db: Session, minute: int, deltas: Mapping[ExposureKey, int]) -> None:
+        """Suma los incrementos a sus filas, creándolas si no existen."""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(FlagExposure)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["flag_name", "minute", "reason"],
+                set_={"count": FlagExposure.count + stmt.excluded.count},
+            ),
+            [
+                {"flag_name": name, "reason": reason, "minute": minute, "count": delta}
+                for (name, reason), delta in deltas.items()
+            ],
+        )
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        """Bucle del hilo de escritura, alineado a múltiplos del intervalo."""
+        window_start = time.time()
+        while True:
+            stopping = self._stop.wait(
+                self.flush_interval - time.time() % self.flush_interval
+            )
+            # La ventana que se cierra empezó en el minuto de window_start
+            minute = int(window_start) // 60
+            window_start = time.time()
+            try:
+                with session_factory() as db:
+                    self.flush(db, minute)
+            except Exception:
+                logger.exception("No se pudieron escribir los contadores de exposición")
+            if stopping:
+                return
+
+
+# Contadores compartidos por el proceso
+exposure_counters = ExposureCounters()
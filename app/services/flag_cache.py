@@ -0,0 +1,546 @@
+"""Caché en memoria de flags para el camino de evaluación."""
+
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.exceptions import FlagNotFoundException
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.services.evaluation_service import (
+    CompiledFlag,
+    EvaluationService,
+    FlagVariant,
+    parse_variants,
+)
+from app.services.targeting import FlagRule, parse_rules
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Segundos tras los cuales el snapshot se recarga completo desde la base de datos.
+# Permite converger cuando otro worker modifica flags. 0 desactiva la expiración.
+FLAG_CACHE_TTL_SECONDS = float(os.getenv("FLAG_CACHE_TTL_SECONDS", "30"))
+
+
+@dataclass(frozen=True, slots=True)
+class FlagSnapshot:
+    """Copia inmutable de una flag, desacoplada de la sesión de SQLAlchemy."""
+
+    id: int
+    name: str
+    description: Optional[str]
+    enabled: bool
+    rollout_percentage: int
+    allowed_users: tuple[str, ...]
+    hash_algorithm: str
+    variants: tuple[FlagVariant, ...]
+    rules: tuple[FlagRule, ...]
+    version: int
+    created_at: datetime
+    # Evaluador precompilado; se construye una sola vez por versión de la flag
+    evaluator: CompiledFlag = field(compare=False, repr=False)
+
+    @classmethod
+    def from_model(cls, flag: Flag) -> "FlagSnapshot":
+        """Construye un snapshot a partir de un objeto Flag persistido."""
+        evaluator = EvaluationService.compile_flag(flag)
+        return cls(
+            id=flag.id,
+            name=flag.name,
+            description=flag.description,
+            enabled=bool(flag.enabled),
+            rollout_percentage=int(flag.rollout_percentage or 0),
+            allowed_users=tuple(flag.allowed_users or ()),
+            hash_algorithm=flag.hash_algorithm,
+            variants=parse_variants(flag.variants),
+            rules=parse_rules(flag.rules),
+            version=flag.version,
+            created_at=flag.created_at,
+            evaluator=evaluator,
+        )
+
+    def with_allowlist_change(
+        self, version: int, added: Sequence[str], removed: Sequence[str]
+    ) -> "FlagSnapshot":
+        """
+        Copia del snapshot con usuarios agregados o quitados de la lista.
+
+        Solo ajusta la lista (copias en C de la tupla y del frozenset) y
+        reutiliza el resto del evaluador, sin releer ni recompilar la flag.
+
+        Args:
+            version: Versión de la flag tras el cambio
+            added: Usuarios agregados (que no estaban en la lista)
+            removed: Usuarios quitados
+
+        Returns:
+            FlagSnapshot: Snapshot nuevo
+        """
+        allowed_users = self.allowed_users
+        for user_id in removed:
+            try:
+                position = allowed_users.index(user_id)
+            except ValueError:
+                continue
+            allowed_users = allowed_users[:position] + allowed_users[position + 1 :]
+        allowed_users += tuple(added)
+        evaluator = self.evaluator.with_allowed_users(
+            self.evaluator.allowed_users.union(added).difference(removed)
+        )
+        return replace(
+            self, allowed_users=allowed_users, version=version, evaluator=evaluator
+        )
+
+
+class FlagRow(NamedTuple):
+    """
+    Columnas de una flag leídas sin instanciar ``Flag``.
+
+    Construir objetos del ORM domina el tiempo de las lecturas de muchas
+    flags; la recarga del caché y el listado leen estas tuplas en su lugar.
+    """
+
+    id: int
+    name: str
+    description: Optional[str]
+    enabled: bool
+    rollout_percentage: int
+    hash_algorithm: str
+    variants: Optional[list]
+    rules: Optional[list]
+    version: int
+    created_at: datetime
+    allowed_users: tuple[str, ...] = ()
+
+
+# Columnas de ``FlagRow`` (salvo allowed_users), en el mismo orden
+FLAG_ROW_COLUMNS = (
+    Flag.id,
+    Flag.name,
+    Flag.description,
+    Flag.enabled,
+    Flag.rollout_percentage,
+    Flag.hash_algorithm,
+    Flag.variants,
+    Flag.rules,
+    Flag.version,
+    Flag.created_at,
+)
+# Usuarios permitidos (flag_id, user_id) en el orden de la relación de Flag
+ALLOWED_USERS_QUERY = select(FlagAllowedUser.flag_id, FlagAllowedUser.user_id).order_by(
+    FlagAllowedUser.id
+)
+_FLAG_ROWS_QUERY = select(*FLAG_ROW_COLUMNS)
+
+
+def build_flag_rows(flag_rows: Iterable, allowed_rows: Iterable) -> list[FlagRow]:
+    """
+    Combina las filas de ``FLAG_ROW_COLUMNS`` con sus usuarios permitidos.
+
+    Args:
+        flag_rows: Filas con las columnas de ``FLAG_ROW_COLUMNS``
+        allowed_rows: Pares (flag_id, user_id) de ``ALLOWED_USERS_QUERY``
+
+    Returns:
+        list[FlagRow]: Flags en el orden de ``flag_rows``
+    """
+    allowed: dict[int, list[str]] = defaultdict(list)
+    for flag_id, user_id in allowed_rows:
+        allowed[flag_id].append(user_id)
+    return [
+        FlagRow(*row, allowed_users=tuple(allowed.get(row[0], ()))) for row in flag_rows
+    ]
+
+
+def compute_flag_etag(flag) -> str:
+    """
+    Calcula el ETag fuerte de una flag a partir de su id y versión.
+
+    Args:
+        flag: Flag o snapshot con ``id`` y ``version``
+
+    Returns:
+        str: ETag entre comillas
+    """
+    return f'"{flag.id}-{flag.version}"'
+
+
+def compute_flag_set_etag(flags: Iterable) -> str:
+    """
+    Calcula el ETag del conjunto completo de flags.
+
+    Depende solo de los pares (id, versión), de modo que cualquier alta o
+    actualización lo cambia y todos los workers obtienen el mismo valor para
+    el mismo estado de la base de datos.
+
+    Args:
+        flags: Flags o snapshots con ``id`` y ``version``
+
+    Returns:
+        str: ETag entre comillas
+    """
+    digest = hashlib.sha1()
+    for flag_id, version in sorted((flag.id, flag.version) for flag in flags):
+        digest.update(f"{flag_id}:{version},".encode())
+    return f'"flags-{digest.hexdigest()[:20]}"'
+
+
+class FlagCache:
+    """
+    Snapshots inmutables de todas las flags indexadas por nombre.
+
+    Las lecturas por nombre no toman locks: cada entrada se reemplaza con una
+    sola asignación en el diccionario, así que un lector ve el snapshot
+    anterior o el nuevo, nunca uno intermedio. Las escrituras actualizan solo
+    sus entradas, bajo el lock; el listado completo y el ETag del conjunto se
+    calculan juntos, bajo el lock, en la primera lectura posterior a una
+    escritura, de modo que una ráfaga de escrituras no recorre todas las flags
+    en cada una.
+    """
+
+    def __init__(self, ttl_seconds: float = FLAG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._flags: dict[str, FlagSnapshot] = {}
+        # (ETag del conjunto, flags) del estado vigente; None tras una escritura
+        self._flag_set: Optional[tuple[str, list[FlagSnapshot]]] = None
+        self._loaded_at: Optional[float] = None
+        self._write_lock = threading.Lock()
+        # Se incrementa con cada publicación; permite descartar recargas que
+        # compitieron con una escritura más reciente
+        self._generation = 0
+        # Contadores informativos; se incrementan sin lock en el camino caliente
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _is_stale(self) -> bool:
+        """Indica si el snapshot debe recargarse desde la base de datos."""
+        if self._loaded_at is None:
+            return True
+        if self.ttl_seconds <= 0:
+            return False
+        return time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def get(self, db: Session, name: str) -> Optional[FlagSnapshot]:
+        """
+        Obtiene el snapshot de una flag por nombre.
+
+        Solo accede a la base de datos si el snapshot no se ha cargado, si
+        expiró, o si la flag no está en él (puede haberla creado otro worker).
+
+        Args:
+            db: Sesión de base de datos, usada solo en caso de fallo de caché
+            name: Nombre normalizado de la flag
+
+        Returns:
+            Optional[FlagSnapshot]: Snapshot de la flag o None si no existe
+        """
+        if self._is_stale():
+            self.load(db)
+
+        snapshot = self._flags.get(name)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        db_flag = (
+            db.query(Flag)
+            .options(selectinload(Flag.allowed_user_rows))
+            .filter(Flag.name == name)
+            .first()
+        )
+        if db_flag is None:
+            return None
+        return self.upsert(db_flag)
+
+    async def aget(self, db: "AsyncSession", name: str) -> Optional[FlagSnapshot]:
+        """
+        Versión asíncrona de ``get`` para el stack de ``AsyncSession``.
+
+        Args:
+            db: Sesión asíncrona, usada solo en caso de fallo de caché
+            name: Nombre normalizado de la flag
+
+        Returns:
+            Optional[FlagSnapshot]: Snapshot de la flag o None si no existe
+        """
+        if self._is_stale():
+            await self.aload(db)
+
+        snapshot = self._flags.get(name)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        result = await db.execute(
+            select(Flag)
+            .options(selectinload(Flag.allowed_user_rows))
+            .where(Flag.name == name)
+        )
+        db_flag = result.scalars().first()
+        if db_flag is None:
+            return None
+        return self.upsert(db_flag)
+
+    def flag_set_etag(self, db: Session) -> str:
+        """
+        Devuelve el ETag del conjunto de flags según el snapshot vigente.
+
+        Args:
+            db: Sesión de base de datos, usada solo si el snapshot expiró
+
+        Returns:
+            str: ETag del conjunto de flags
+        """
+        if self._is_stale():
+            self.load(db)
+        return self._current_flag_set()[0]
+
+    async def aflag_set_etag(self, db: "AsyncSession") -> str:
+        """Versión asíncrona de ``flag_set_etag``."""
+        if self._is_stale():
+            await self.aload(db)
+        return self._current_flag_set()[0]
+
+    def _current_flag_set(self) -> tuple[str, list[FlagSnapshot]]:
+        """Devuelve el ETag y las flags vigentes, calculándolos tras una escritura."""
+        flag_set = self._flag_set
+        if flag_set is None:
+            with self._write_lock:
+                flag_set = self._flag_set
+                if flag_set is None:
+                    flags = list(self._flags.values())
+                    flag_set = self._flag_set = (compute_flag_set_etag(flags), flags)
+        return flag_set
+
+    def snapshot(self, db: Session) -> tuple[str, list[FlagSnapshot]]:
+        """
+        Devuelve todas las flags del snapshot junto con su ETag.
+
+        Ambos se calculan juntos bajo el lock, así que el par siempre
+        corresponde al mismo estado.
+
+        Args:
+            db: Sesión de base de datos, usada solo si el snapshot expiró
+
+        Returns:
+            tuple[str, list[FlagSnapshot]]: (ETag del conjunto, flags)
+        """
+        if self._is_stale():
+            self.load(db)
+        etag, flags = self._current_flag_set()
+        return etag, list(flags)
+
+    def get_many(
+        self, db: Session, names: Optional[list[str]] = None
+    ) -> list[FlagSnapshot]:
+        """
+        Obtiene varias flags del snapshot, o todas si no se indican nombres.
+
+        Args:
+            db: Sesión de base de datos, usada solo en caso de fallo de caché
+            names: Nombres normalizados de las flags; None para todas
+
+        Returns:
+            list[FlagSnapshot]: Snapshots en el orden solicitado
+
+        Raises:
+            FlagNotFoundException: Si alguna de las flags no existe
+        """
+        if self._is_stale():
+            self.load(db)
+
+        if names is None:
+            flags = list(self._current_flag_set()[1])
+            self.hits += len(flags)
+            return flags
+
+        snapshots = []
+        for name in names:
+            snapshot = self.get(db, name)
+            if snapshot is None:
+                raise FlagNotFoundException(name)
+            snapshots.append(snapshot)
+        return snapshots
+
+    def load(self, db: Session) -> None:
+        """
+        Recarga el snapshot completo desde la base de datos.
+
+        Lee solo columnas, en dos consultas, sin instanciar ``Flag``: con
+        muchas flags construir los objetos del ORM domina el tiempo de carga,
+        y esta recarga ocurre al arrancar y cada vez que expira el TTL.
+
+        Args:
+            db: Sesión de base de datos
+        """
+        generation = self._generation
+        flags = build_flag_rows(
+            db.execute(_FLAG_ROWS_QUERY), db.execute(ALLOWED_USERS_QUERY)
+        )
+        self._publish_load(flags, generation)
+
+    async def aload(self, db: "AsyncSession") -> None:
+        """
+        Versión asíncrona de ``load`` para el stack de ``AsyncSession``.
+
+        Args:
+            db: Sesión asíncrona de base de datos
+        """
+        generation = self._generation
+        flag_rows = (await db.execute(_FLAG_ROWS_QUERY)).all()
+        allowed_rows = (await db.execute(ALLOWED_USERS_QUERY)).all()
+        self._publish_load(build_flag_rows(flag_rows, allowed_rows), generation)
+
+    def _publish_load(self, db_flags: Iterable, generation: int) -> None:
+        """
+        Publica un snapshot completo leído de la base de datos.
+
+        La consulta se hace fuera del lock; si mientras tanto se publicó una
+        escritura, el resultado puede ser anterior a ella y se descarta (la
+        siguiente lectura volverá a intentar la recarga).
+
+        Args:
+            db_flags: Flags leídas de la base de datos
+            generation: Generación observada antes de la consulta
+        """
+        flags = {flag.name: FlagSnapshot.from_model(flag) for flag in db_flags}
+        with self._write_lock:
+            if self._generation != generation:
+                return
+            self._flags = flags
+            self._flag_set = None
+            self._loaded_at = time.monotonic()
+            self._generation += 1
+            self.refreshes += 1
+
+    def upsert(self, flag: Flag) -> FlagSnapshot:
+        """
+        Publica una flag recién confirmada en el snapshot (write-through).
+
+        Args:
+            flag: Flag persistida tras el commit
+
+        Returns:
+            FlagSnapshot: Snapshot publicado
+        """
+        return self.upsert_many((flag,))[0]
+
+    def upsert_many(self, db_flags: Iterable[Flag]) -> list[FlagSnapshot]:
+        """
+        Publica varias flags recién confirmadas bajo una sola toma del lock.
+
+        Args:
+            db_flags: Flags persistidas tras el commit
+
+        Returns:
+            list[FlagSnapshot]: Snapshots vigentes de esas flags (uno más
+                reciente si otra escritura ya lo había publicado)
+        """
+        return self.put_many([FlagSnapshot.from_model(flag) for flag in db_flags])
+
+    def put_many(self, snapshots: Iterable[FlagSnapshot]) -> list[FlagSnapshot]:
+        """
+        Publica snapshots ya construidos bajo una sola toma del lock.
+
+        Args:
+            snapshots: Snapshots de flags confirmadas
+
+        Returns:
+            list[FlagSnapshot]: Snapshots vigentes de esas flags
+        """
+        with self._write_lock:
+            return self._store(snapshots)
+
+    def apply_allowlist_change(
+        self,
+        name: str,
+        version: int,
+        added: Sequence[str] = (),
+        removed: Sequence[str] = (),
+    ) -> Optional[FlagSnapshot]:
+        """
+        Aplica un cambio incremental de la lista de permitidos a una flag.
+
+        El delta solo es válido sobre la versión inmediatamente anterior; si
+        el snapshot está en otra (otro worker o una escritura concurrente lo
+        adelantaron), quien llama debe releer la flag.
+
+        Args:
+            name: Nombre de la flag
+            version: Versión de la flag tras el cambio
+            added: Usuarios agregados
+            removed: Usuarios quitados
+
+        Returns:
+            Optional[FlagSnapshot]: Snapshot publicado (o uno ya posterior al
+                cambio), o None si no se pudo aplicar el delta
+        """
+        with self._write_lock:
+            current = self._flags.get(name)
+            if current is not None and current.version >= version:
+                return current
+            if current is None or current.version != version - 1:
+                return None
+            snapshot = current.with_allowlist_change(version, added, removed)
+            self._store((snapshot,))
+        return snapshot
+
+    def _store(self, snapshots: Iterable[FlagSnapshot]) -> list[FlagSnapshot]:
+        """
+        Publica snapshots en el mapeo; requiere ``_write_lock``.
+
+        Un snapshot anterior al publicado (un lector lento que leyó la flag
+        antes de una actualización) se descarta y se conserva el vigente.
+
+        Args:
+            snapshots: Snapshots a publicar
+
+        Returns:
+            list[FlagSnapshot]: Snapshots vigentes de esas flags
+        """
+        stored = []
+        for snapshot in snapshots:
+            current = self._flags.get(snapshot.name)
+            if current is not None and current.version > snapshot.version:
+                snapshot = current
+            else:
+                self._flags[snapshot.name] = snapshot
+            stored.append(snapshot)
+        self._flag_set = None
+        self._generation += 1
+        self.refreshes += 1
+        return stored
+
+    def clear(self) -> None:
+        """Descarta el snapshot; la próxima lectura lo recarga completo."""
+        with self._write_lock:
+            self._flags = {}
+            self._flag_set = None
+            self._loaded_at = None
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Devuelve los contadores de uso del caché."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "size": len(self._flags),
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Instancia compartida por el proceso
+flag_cache = FlagCache()
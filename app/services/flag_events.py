@@ -0,0 +1,276 @@
+"""Difusión en proceso de los cambios de flags (SSE y long-poll)."""
+
+import asyncio
+import contextlib
+import os
+import threading
+from collections import deque
+from typing import Iterable, Sequence, Union
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.flag import Flag
+from app.schemas.flag import FlagResponse
+from app.services.flag_cache import FlagSnapshot, flag_cache
+
+# Eventos recientes conservados para que los clientes se pongan al día
+FLAG_EVENTS_HISTORY = int(os.getenv("FLAG_EVENTS_HISTORY", "1024"))
+# Usuarios permitidos que un evento puede llevar; con más, el evento los omite
+# y el cliente lee la flag. Acota la memoria del historial sin importar el
+# tamaño de las listas.
+FLAG_EVENTS_MAX_ALLOWED_USERS = int(os.getenv("FLAG_EVENTS_MAX_ALLOWED_USERS", "100"))
+
+FLAG_CREATED = "created"
+FLAG_UPDATED = "updated"
+# Cambio incremental de la lista de permitidos: el evento lleva solo el delta
+FLAG_ALLOWLIST_CHANGED = "allowlist"
+
+
+class FlagChangeBroker:
+    """
+    Registro de cambios de flags con espera asíncrona.
+
+    Cada cambio confirmado recibe una versión monótona del proceso. Los
+    suscriptores esperan en un ``asyncio.Event`` compartido por event loop,
+    por lo que miles de conexiones inactivas no consumen hilos y una
+    publicación cuesta lo mismo sin importar cuántas haya.
+
+    Las versiones son locales al proceso: tras un reinicio, o si el cursor
+    quedó fuera del historial, el cliente recibe ``reset`` y debe volver a
+    leer el listado completo.
+    """
+
+    def __init__(
+        self,
+        history: int = FLAG_EVENTS_HISTORY,
+        max_allowed_users: int = FLAG_EVENTS_MAX_ALLOWED_USERS,
+    ):
+        self._history: deque[dict] = deque(maxlen=history)
+        self._max_allowed_users = max_allowed_users
+        self._version = 0
+        self._lock = threading.Lock()
+        self._wakeups: dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+
+    @property
+    def version(self) -> int:
+        """Versión del último cambio publicado."""
+        return self._version
+
+    def publish(self, event_type: str, flag: Union[Flag, FlagSnapshot]) -> dict:
+        """
+        Registra un cambio y despierta a los suscriptores.
+
+        Puede llamarse desde el event loop o desde los hilos del threadpool.
+        Si la flag tiene más de ``max_allowed_users`` usuarios permitidos, el
+        evento lleva ``allowed_users`` en null en lugar de la lista.
+
+        Args:
+            event_type: Tipo de cambio (``created`` o ``updated``)
+            flag: Flag confirmada, como modelo o como snapshot
+
+        Returns:
+            dict: Evento publicado
+        """
+        allowed_users = flag.allowed_users
+        payload = FlagResponse.model_validate(flag).model_dump(
+            mode="json", exclude={"allowed_users"}
+        )
+        payload["allowed_users"] = (
+            list(allowed_users)
+            if len(allowed_users) <= self._max_allowed_users
+            else None
+        )
+        return self._append(event_type, "flag", payload)
+
+    def publish_allowlist_change(
+        self,
+        flag_name: str,
+        version: int,
+        added: Sequence[str],
+        removed: Sequence[str],
+    ) -> dict:
+        """
+        Registra un cambio incremental de la lista de permitidos.
+
+        El evento lleva solo los usuarios agregados y quitados, no la flag:
+        su tamaño no depende del de la lista.
+
+        Args:
+            flag_name: Nombre de la flag
+            version: Versión de la flag tras el cambio
+            added: Usuarios agregados
+            removed: Usuarios quitados
+
+        Returns:
+            dict: Evento publicado
+        """
+        delta = {
+            "flag_name": flag_name,
+            "version": version,
+            "added": list(added),
+            "removed": list(removed),
+        }
+        return self._append(FLAG_ALLOWLIST_CHANGED, "allowlist", delta)
+
+    def _append(self, event_type: str, key: str, payload: dict) -> dict:
+        """Agrega un evento al historial y despierta a los suscriptores."""
+        with self._lock:
+            self._version += 1
+            event = {"version": self._version, "type": event_type, key: payload}
+            self._history.append(event)
+            loops = list(self._wakeups)
+
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # El event loop ya se cerró
+                self._wakeups.pop(loop, None)
+        return event
+
+    def _wake(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Despierta a los suscriptores de un event loop (se ejecuta en él)."""
+        wakeup = self._wakeups.pop(loop, None)
+        if wakeup is not None:
+            wakeup.set()
+
+    def events_since(self, since: int) -> tuple[list[dict], bool]:
+        """
+        Obtiene los eventos posteriores a una versión.
+
+        Args:
+            since: Última versión que el cliente ya conoce
+
+        Returns:
+            tuple[list[dict], bool]: (eventos, reset); ``reset`` indica que el
+                cursor no es válido en este proceso y hay que releer todo
+        """
+        with self._lock:
+            if since > self._version:
+                return [], True
+            if since == self._version:
+                return [], False
+            if since < self._history[0]["version"] - 1:
+                return [], True
+            return [event for event in self._history if event["version"] > since], False
+
+    async def wait(self, since: int, timeout: float) -> tuple[list[dict], bool]:
+        """
+        Espera hasta que haya eventos posteriores a ``since`` o venza el plazo.
+
+        Args:
+            since: Última versión que el cliente ya conoce
+            timeout: Segundos máximos de espera
+
+        Returns:
+            tuple[list[dict], bool]: (eventos, reset), como ``events_since``
+        """
+        events, reset = self.events_since(since)
+        if events or reset or timeout <= 0:
+            return events, reset
+
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeups.get(loop)
+        if wakeup is None:
+            wakeup = self._wakeups[loop] = asyncio.Event()
+
+        # Volver a comprobar tras registrarse para no perder una publicación
+        events, reset = self.events_since(since)
+        if events or reset:
+            return events, reset
+
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        return self.events_since(since)
+
+
+# Instancia compartida por el proceso
+flag_change_broker = FlagChangeBroker()
+
+
+def notify_flag_committed(flag: Flag, event_type: str) -> None:
+    """
+    Propaga una flag recién confirmada a los consumidores en memoria.
+
+    Debe llamarse después del commit (y del refresh) de cada alta o
+    actualización.
+
+    Args:
+        flag: Flag persistida
+        event_type: ``FLAG_CREATED`` o ``FLAG_UPDATED``
+    """
+    flag_cache.upsert(flag)
+    flag_change_broker.publish(event_type, flag)
+
+
+def notify_flags_committed(
+    flags: Iterable[Flag], event_type: str
+) -> list[FlagSnapshot]:
+    """
+    Versión por lotes de ``notify_flag_committed``.
+
+    El snapshot de evaluación se actualiza bajo una sola toma del lock, en
+    lugar de una por flag.
+
+    Args:
+        flags: Flags persistidas
+        event_type: ``FLAG_CREATED`` o ``FLAG_UPDATED``
+
+    Returns:
+        list[FlagSnapshot]: Snapshots publicados, en el orden de ``flags``
+    """
+    flags = list(flags)
+    if not flags:
+        return []
+    snapshots = flag_cache.upsert_many(flags)
+    for flag in flags:
+        flag_change_broker.publish(event_type, flag)
+    return snapshots
+
+
+def notify_snapshots_committed(
+    snapshots: Sequence[FlagSnapshot], event_type: str
+) -> None:
+    """
+    Versión de ``notify_flags_committed`` para snapshots ya construidos.
+
+    No accede a la base de datos: sirve para publicar después del commit un
+    estado leído dentro de la transacción.
+
+    Args:
+        snapshots: Snapshots de las flags confirmadas
+        event_type: ``FLAG_CREATED`` o ``FLAG_UPDATED``
+    """
+    flag_cache.put_many(snapshots)
+    for snapshot in snapshots:
+        flag_change_broker.publish(event_type, snapshot)
+
+
+def notify_allowlist_committed(
+    db: Session,
+    flag_id: int,
+    flag_name: str,
+    version: int,
+    added: Sequence[str],
+    removed: Sequence[str],
+) -> None:
+    """
+    Propaga un cambio incremental de la lista de permitidos ya confirmado.
+
+    El snapshot de evaluación aplica el delta sin releer la flag; solo si no
+    estaba en la versión anterior se carga la flag completa. Los suscriptores
+    reciben un evento ``allowlist`` con el delta.
+
+    Args:
+        db: Sesión de base de datos, usada solo si hay que releer la flag
+        flag_id: ID de la flag
+        flag_name: Nombre de la flag
+        version: Versión de la flag tras el cambio
+        added: Usuarios agregados
+        removed: Usuarios quitados
+    """
+    if flag_cache.apply_allowlist_change(flag_name, version, added, removed) is None:
+        flag_cache.upsert(
+            db.get(Flag, flag_id, options=[selectinload(Flag.allowed_user_rows)])
+        )
+    flag_change_broker.publish_allowlist_change(flag_name, version, added, removed)
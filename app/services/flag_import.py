@@ -0,0 +1,273 @@
+"""Importación masiva de flags desde NDJSON en una sola transacción."""
+
+import json
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.exceptions import FlagException
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.schemas.flag import FlagCreate
+from app.services.bucketing import DEFAULT_HASH_ALGORITHM
+from app.services.flag_cache import ALLOWED_USERS_QUERY
+from app.services.flag_events import (
+    FLAG_CREATED,
+    FLAG_UPDATED,
+    notify_flags_committed,
+)
+from app.services.shared_flag_table import shared_flag_table
+from app.validators.flag_validator import FlagValidator
+
+# Máximo de líneas aceptadas por importación
+MAX_IMPORT_ROWS = 10000
+
+# Campos de la flag que una línea puede actualizar (además de allowed_users)
+UPDATABLE_FIELDS = (
+    "description",
+    "enabled",
+    "rollout_percentage",
+    "hash_algorithm",
+    "variants",
+    "rules",
+)
+
+_flags = Flag.__table__
+_allowed_users = FlagAllowedUser.__table__
+
+# Sentencias parametrizadas para executemany: una fila de parámetros por flag
+_UPDATE_FLAG = (
+    _flags.update()
+    .where(_flags.c.id == bindparam("b_id"))
+    .values(
+        **{field: bindparam(f"b_{field}") for field in UPDATABLE_FIELDS},
+        version=_flags.c.version + 1,
+    )
+)
+_DELETE_ALLOWED_USER = _allowed_users.delete().where(
+    _allowed_users.c.flag_id == bindparam("b_flag_id"),
+    _allowed_users.c.user_id == bindparam("b_user_id"),
+)
+
+
+class ImportRow(NamedTuple):
+    """Línea válida del archivo de importación."""
+
+    line: int
+    flag: FlagCreate
+
+
+class FlagImportService:
+    """
+    Servicio para crear o actualizar muchas flags en una sola operación.
+
+    Cada línea NDJSON describe una flag con el mismo formato que
+    ``POST /api/flags``. Si la flag no existe se crea; si existe, se
+    actualizan solo los campos presentes en la línea. Las líneas inválidas se
+    informan y el resto se aplica.
+    """
+
+    @staticmethod
+    def parse(body: bytes) -> tuple[list[ImportRow], list[dict]]:
+        """
+        Valida las líneas NDJSON sin acceder a la base de datos.
+
+        Args:
+            body: Contenido NDJSON, una flag por línea
+
+        Returns:
+            tuple[list[ImportRow], list[dict]]: (líneas válidas, errores por
+                línea con ``line``, ``name`` y ``error``)
+        """
+        rows: list[ImportRow] = []
+        errors: list[dict] = []
+        seen: dict[str, int] = {}
+
+        for line_number, raw in enumerate(body.splitlines(), start=1):
+            if not raw.strip():
+                continue
+            name = None
+            try:
+                data = json.loads(raw)
+                if isinstance(data, dict) and isinstance(data.get("name"), str):
+                    name = data["name"].lower()
+                flag = FlagCreate.model_validate(data)
+                FlagValidator.validate_name_format(flag.name)
+                FlagValidator.validate_allowed_users(flag.allowed_users)
+                if flag.hash_algorithm is not None:
+                    FlagValidator.validate_hash_algorithm(flag.hash_algorithm)
+                FlagValidator.validate_variants(flag.variants)
+                FlagValidator.validate_rules(flag.rules)
+            except json.JSONDecodeError as exc:
+                errors.append(_row_error(line_number, name, f"JSON inválido: {exc}"))
+                continue
+            except ValidationError as exc:
+                message = "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                    for error in exc.errors()
+                )
+                errors.append(_row_error(line_number, name, message))
+                continue
+            except (FlagException, ValueError) as exc:
+                errors.append(_row_error(line_number, name, str(exc)))
+                continue
+
+            if flag.name in seen:
+                errors.append(
+                    _row_error(
+                        line_number,
+                        flag.name,
+                        f"Flag repetida; ya aparece en la línea {seen[flag.name]}",
+                    )
+                )
+                continue
+            seen[flag.name] = line_number
+            rows.append(ImportRow(line_number, flag))
+
+        return rows, errors
+
+    @staticmethod
+    def import_flags(db: Session, rows: list[ImportRow]) -> dict:
+        """
+        Crea o actualiza las flags en una sola transacción.
+
+        Las flags existentes se obtienen con una sola consulta por nombre; las
+        altas, las actualizaciones y los cambios de la lista de permitidos se
+        envían como ``executemany`` y se confirman con un único commit.
+
+        Args:
+            db: Sesión de base de datos
+            rows: Líneas válidas devueltas por ``parse``
+
+        Returns:
+            dict: Conteos ``created``, ``updated`` y ``unchanged``
+        """
+        names = [row.flag.name for row in rows]
+        existing = {
+            flag.name: flag
+            for flag in db.scalars(select(Flag).where(Flag.name.in_(names)))
+        }
+        # Solo se leen las listas de permitidos que alguna línea reemplaza
+        current_users: dict[int, set[str]] = defaultdict(set)
+        replaced_ids = [
+            existing[row.flag.name].id
+            for row in rows
+            if row.flag.name in existing
+            and "allowed_users" in row.flag.model_fields_set
+        ]
+        if replaced_ids:
+            for flag_id, user_id in db.execute(
+                ALLOWED_USERS_QUERY.where(FlagAllowedUser.flag_id.in_(replaced_ids))
+            ):
+                current_users[flag_id].add(user_id)
+
+        new_flags: list[FlagCreate] = []
+        flag_updates: list[dict] = []
+        users_to_add: list[dict] = []
+        users_to_remove: list[dict] = []
+
+        for row in rows:
+            db_flag = existing.get(row.flag.name)
+            if db_flag is None:
+                new_flags.append(row.flag)
+                continue
+
+            changes = {
+                field: value
+                for field, value in row.flag.model_dump(
+                    include=set(UPDATABLE_FIELDS), exclude_unset=True
+                ).items()
+                # Solo la descripción admite null; en el resto null no cambia nada
+                if (value is not None or field == "description")
+                and getattr(db_flag, field) != value
+            }
+
+            allowlist_changed = False
+            if "allowed_users" in row.flag.model_fields_set:
+                wanted = dict.fromkeys(row.flag.allowed_users)
+                current = current_users[db_flag.id]
+                added = [user_id for user_id in wanted if user_id not in current]
+                removed = [user_id for user_id in current if user_id not in wanted]
+                users_to_add.extend(
+                    {"flag_id": db_flag.id, "user_id": user_id} for user_id in added
+                )
+                users_to_remove.extend(
+                    {"b_flag_id": db_flag.id, "b_user_id": user_id}
+                    for user_id in removed
+                )
+                allowlist_changed = bool(added or removed)
+
+            if changes or allowlist_changed:
+                values = {"b_id": db_flag.id}
+                for field in UPDATABLE_FIELDS:
+                    values[f"b_{field}"] = changes.get(field, getattr(db_flag, field))
+                flag_updates.append(values)
+
+        created_ids: list[int] = []
+        if new_flags:
+            created_ids = list(
+                db.scalars(
+                    insert(Flag).returning(Flag.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "name": flag.name,
+                            "description": flag.description,
+                            "enabled": flag.enabled,
+                            "rollout_percentage": flag.rollout_percentage,
+                            "hash_algorithm": flag.hash_algorithm
+                            or DEFAULT_HASH_ALGORITHM,
+                            "variants": [
+                                variant.model_dump() for variant in flag.variants
+                            ],
+                            "rules": [rule.model_dump() for rule in flag.rules],
+                        }
+                        for flag in new_flags
+                    ],
+                )
+            )
+            for flag_id, flag in zip(created_ids, new_flags, strict=True):
+                users_to_add.extend(
+                    {"flag_id": flag_id, "user_id": user_id}
+                    for user_id in dict.fromkeys(flag.allowed_users)
+                )
+
+        if flag_updates:
+            db.execute(_UPDATE_FLAG, flag_updates)
+        if users_to_remove:
+            db.execute(_DELETE_ALLOWED_USER, users_to_remove)
+        if users_to_add:
+            db.execute(insert(FlagAllowedUser), users_to_add)
+        db.commit()
+
+        # Publicar las flags confirmadas en el snapshot y a los suscriptores
+        updated_ids = [values["b_id"] for values in flag_updates]
+        changed = {
+            flag.id: flag
+            for flag in db.scalars(
+                select(Flag)
+                .options(selectinload(Flag.allowed_user_rows))
+                .where(Flag.id.in_(created_ids + updated_ids))
+            )
+        }
+        notify_flags_committed(
+            (changed[flag_id] for flag_id in created_ids), FLAG_CREATED
+        )
+        notify_flags_committed(
+            (changed[flag_id] for flag_id in updated_ids), FLAG_UPDATED
+        )
+        if created_ids or updated_ids:
+            shared_flag_table.publish(db)
+
+        return {
+            "created": len(created_ids),
+            "updated": len(updated_ids),
+            "unchanged": len(rows) - len(created_ids) - len(updated_ids),
+        }
+
+
+def _row_error(line: int, name: Optional[str], error: str) -> dict:
+    """Construye la entrada del informe de errores de una línea."""
+    return {"line": line, "name": name, "error": error}
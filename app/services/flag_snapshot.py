@@ -0,0 +1,250 @@
+"""
+Snapshot compacto de todas las flags para la evaluación local en clientes.
+
+Se ofrece en dos codificaciones:
+
+- JSON (``format_version`` 1): legible y sencillo de consumir.
+- Binario (``FFSN``): pensado para snapshots grandes. El cliente lo abre con
+  ``mmap`` y evalúa sin decodificarlo a objetos Python por flag.
+
+Formato binario (little-endian)::
+
+    cabecera   magic "FFSN" | u16 versión | u16 opciones | u32 tamaño del cuerpo
+    cuerpo     u32 n_flags | u32 n_strings | u32 n_users | u32 índice del ETag
+               u32[n_strings + 1]  offsets de cada string en los datos
+               registro[n_flags]   u32 nombre | u32 algoritmo | u32 versión |
+                                   u32 inicio allowlist | u32 largo allowlist |
+                                   u8 enabled | u8 rollout | 2 bytes de relleno
+               u32[n_users]        índices de string de las allowlists
+               bytes               datos UTF-8 de los strings
+
+La versión 2 agrega las variantes A/B/n. Se emite solo si alguna flag tiene
+variantes, para que los clientes que solo leen la versión 1 sigan
+funcionando mientras no se usen::
+
+    cuerpo     u32 n_flags | u32 n_strings | u32 n_users | u32 índice del ETag |
+               u32 n_variants
+               u32[n_strings + 1]  offsets de cada string en los datos
+               registro[n_flags]   registro de la versión 1 |
+                                   u32 inicio variantes | u32 número de variantes
+               u32[n_users]        índices de string de las allowlists
+               u32[2 * n_variants] pares (índice del nombre, límite acumulado)
+               bytes               datos UTF-8 de los strings
+
+Las variantes de una flag conservan su orden y cada una lleva el límite
+superior de su tramo de buckets (``app.services.bucketing.variant_boundaries``).
+
+La versión 3 agrega las reglas de segmentación y se emite solo si alguna flag
+tiene reglas. Es la versión 2 con un u32 más por registro: el índice del
+string con las reglas de la flag en JSON compacto, o ``NO_RULES`` si no
+tiene. Las flags con las mismas reglas comparten el string.
+
+La tabla de strings está deduplicada y ordenada por bytes, así que comparar
+índices equivale a comparar los strings: los registros están ordenados por el
+índice de su nombre y cada allowlist es un tramo ordenado de índices. Ambos se
+buscan con búsqueda binaria. Con la opción ``FLAG_ZLIB`` el cuerpo va
+comprimido con zlib y el tamaño de la cabecera es el del cuerpo sin comprimir.
+"""
+
+import json
+import struct
+import threading
+import zlib
+from typing import Iterable, Optional
+
+from app.services.bucketing import variant_boundaries
+from app.services.flag_cache import FlagSnapshot
+
+# Versión del formato JSON; se incrementa ante cambios incompatibles
+SNAPSHOT_FORMAT_VERSION = 1
+
+BINARY_SNAPSHOT_MAGIC = b"FFSN"
+BINARY_SNAPSHOT_VERSION = 1
+# Versión con variantes; solo se usa si alguna flag las tiene
+BINARY_SNAPSHOT_VARIANTS_VERSION = 2
+# Versión con reglas de segmentación; solo se usa si alguna flag las tiene
+BINARY_SNAPSHOT_RULES_VERSION = 3
+# Índice de reglas de las flags sin reglas
+NO_RULES = 0xFFFFFFFF
+BINARY_SNAPSHOT_MEDIA_TYPE = "application/vnd.featureflags.snapshot"
+# Opciones de la cabecera binaria
+FLAG_ZLIB = 0x1
+
+SNAPSHOT_FORMAT_JSON = "json"
+SNAPSHOT_FORMAT_BINARY = "binary"
+
+_HEADER = struct.Struct("<4sHHI")
+_COUNTS = struct.Struct("<IIII")
+_RECORD = struct.Struct("<IIIIIBBxx")
+_COUNTS_V2 = struct.Struct("<IIIII")
+_RECORD_VARIANTS = struct.Struct("<II")
+_RECORD_RULES = struct.Struct("<I")
+
+_encoded_lock = threading.Lock()
+# Snapshots serializados para el ETag vigente: (ETag, {variante: cuerpo})
+_encoded: tuple[str, dict[tuple[str, bool], bytes]] = ("", {})
+
+
+def _flag_entry(flag: FlagSnapshot) -> dict:
+    """Campos de una flag que el cliente necesita para evaluarla."""
+    entry = {
+        "name": flag.name,
+        "enabled": flag.enabled,
+        "rollout_percentage": flag.rollout_percentage,
+        "allowed_users": list(flag.allowed_users),
+        "hash_algorithm": flag.hash_algorithm,
+        "version": flag.version,
+    }
+    if flag.variants:
+        entry["variants"] = [
+            {"name": variant.name, "weight": variant.weight}
+            for variant in flag.variants
+        ]
+    if flag.rules:
+        entry["rules"] = [rule.to_dict() for rule in flag.rules]
+    return entry
+
+
+def _rules_json(flag) -> Optional[str]:
+    """Reglas de una flag en JSON compacto, o None si no tiene."""
+    if not flag.rules:
+        return None
+    return json.dumps([rule.to_dict() for rule in flag.rules], separators=(",", ":"))
+
+
+def _encode_json(etag: str, flags: list[FlagSnapshot]) -> bytes:
+    """Serializa el snapshot como JSON compacto."""
+    return json.dumps(
+        {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "etag": etag,
+            "flags": [_flag_entry(flag) for flag in flags],
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def encode_binary_snapshot(etag: str, flags: Iterable, compress: bool = False) -> bytes:
+    """
+    Serializa flags en el formato binario descrito en el módulo.
+
+    Args:
+        etag: ETag del conjunto de flags, incluido en la tabla de strings
+        flags: Objetos con ``name``, ``enabled``, ``rollout_percentage``,
+            ``allowed_users``, ``hash_algorithm``, ``version``, ``variants``
+            y ``rules``
+        compress: Comprime el cuerpo con zlib
+
+    Returns:
+        bytes: Documento con cabecera y cuerpo
+    """
+    flags = list(flags)
+    rules = {flag.name: _rules_json(flag) for flag in flags}
+    with_rules = any(rules.values())
+    with_variants = with_rules or any(flag.variants for flag in flags)
+    strings = {etag, *(flag.hash_algorithm for flag in flags)}
+    for flag in flags:
+        strings.add(flag.name)
+        strings.update(flag.allowed_users)
+        strings.update(variant.name for variant in flag.variants)
+    strings.update(text for text in rules.values() if text)
+    encoded_strings = sorted(string.encode() for string in strings)
+    index = {raw.decode(): i for i, raw in enumerate(encoded_strings)}
+
+    offsets = [0]
+    for raw in encoded_strings:
+        offsets.append(offsets[-1] + len(raw))
+
+    records = bytearray()
+    allowlists: list[int] = []
+    variants: list[int] = []
+    for flag in sorted(flags, key=lambda f: index[f.name]):
+        users = sorted({index[user_id] for user_id in flag.allowed_users})
+        records += _RECORD.pack(
+            index[flag.name],
+            index[flag.hash_algorithm],
+            flag.version,
+            len(allowlists),
+            len(users),
+            1 if flag.enabled else 0,
+            flag.rollout_percentage,
+        )
+        allowlists.extend(users)
+        if with_variants:
+            records += _RECORD_VARIANTS.pack(len(variants) // 2, len(flag.variants))
+            if flag.variants:
+                bounds = variant_boundaries(
+                    [variant.weight for variant in flag.variants]
+                )
+                for variant, bound in zip(flag.variants, bounds, strict=True):
+                    variants += (index[variant.name], bound)
+        if with_rules:
+            text = rules[flag.name]
+            records += _RECORD_RULES.pack(NO_RULES if text is None else index[text])
+
+    counts = (len(flags), len(encoded_strings), len(allowlists), index[etag])
+    body = b"".join(
+        (
+            (
+                _COUNTS_V2.pack(*counts, len(variants) // 2)
+                if with_variants
+                else _COUNTS.pack(*counts)
+            ),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            bytes(records),
+            struct.pack(f"<{len(allowlists)}I", *allowlists),
+            struct.pack(f"<{len(variants)}I", *variants),
+            *encoded_strings,
+        )
+    )
+    options = FLAG_ZLIB if compress else 0
+    if with_rules:
+        version = BINARY_SNAPSHOT_RULES_VERSION
+    elif with_variants:
+        version = BINARY_SNAPSHOT_VARIANTS_VERSION
+    else:
+        version = BINARY_SNAPSHOT_VERSION
+    header = _HEADER.pack(BINARY_SNAPSHOT_MAGIC, version, options, len(body))
+    return header + (zlib.compress(body) if compress else body)
+
+
+def encode_snapshot(
+    etag: str,
+    flags: Iterable[FlagSnapshot],
+    snapshot_format: str = SNAPSHOT_FORMAT_JSON,
+    compress: bool = False,
+) -> bytes:
+    """
+    Serializa el snapshot en la codificación pedida.
+
+    El resultado se memoriza por ETag y variante: mientras no cambien las
+    flags, todos los clientes reciben los mismos bytes sin volver a serializar.
+
+    Args:
+        etag: ETag del conjunto de flags
+        flags: Flags del snapshot
+        snapshot_format: ``json`` o ``binary``
+        compress: Comprime el cuerpo binario con zlib (ignorado en JSON)
+
+    Returns:
+        bytes: Documento serializado
+    """
+    global _encoded
+
+    variant = (snapshot_format, compress and snapshot_format == SNAPSHOT_FORMAT_BINARY)
+    cached_etag, bodies = _encoded
+    body: Optional[bytes] = bodies.get(variant) if cached_etag == etag else None
+    if body is not None:
+        return body
+
+    ordered = sorted(flags, key=lambda f: f.name)
+    if snapshot_format == SNAPSHOT_FORMAT_BINARY:
+        body = encode_binary_snapshot(etag, ordered, variant[1])
+    else:
+        body = _encode_json(etag, ordered)
+
+    with _encoded_lock:
+        if _encoded[0] != etag:
+            _encoded = (etag, {})
+        _encoded[1][variant] = body
+    return body
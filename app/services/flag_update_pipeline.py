@@ -0,0 +1,258 @@
+"""
+Actualizaciones de flags con commit en grupo.
+
+Con SQLite cada ``PUT /api/flags/{flag_name}`` compite por el único cerrojo
+de escritura: cien actualizaciones concurrentes son cien transacciones en
+fila, cada una con su consulta, su commit y su refresh. El pipeline las
+agrupa:
+
+- La primera solicitud que llega sin un commit en curso actúa de líder:
+  espera ``FLAG_UPDATE_BATCH_WINDOW_MS`` (0 por defecto) y confirma en una
+  sola transacción todas las actualizaciones pendientes, de cualquier flag.
+- Las que llegan mientras tanto esperan; cuando el lote del líder termina,
+  la primera pendiente pasa a ser líder del siguiente. Así, bajo carga los
+  lotes se forman solos mientras el commit anterior está en curso, y una
+  solicitud aislada se confirma sin esperar.
+- Las actualizaciones de una misma flag dentro del lote se aplican en orden
+  de llegada sobre la misma fila (coalescencia): un solo UPDATE y un solo
+  incremento de ``version``.
+
+Cada solicitud recibe su resultado cuando el commit de su lote termina, con
+el estado confirmado de la flag (que incluye las actualizaciones del mismo
+lote posteriores a la suya), o la excepción que le corresponda. El estado
+se lee dentro de la transacción, así que tras el commit solo queda
+publicarlo (snapshot de evaluación, suscriptores, tabla compartida): si eso
+falla se registra, y las solicitudes, ya persistidas, reciben su resultado.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.exceptions import FlagNotFoundException
+from app.models.flag import Flag
+from app.services.flag_cache import FlagSnapshot
+from app.services.flag_events import FLAG_UPDATED, notify_snapshots_committed
+from app.services.shared_flag_table import shared_flag_table
+
+logger = logging.getLogger(__name__)
+
+# Agrupar las actualizaciones concurrentes; con False cada una se confirma sola
+FLAG_UPDATE_PIPELINE_ENABLED = os.getenv(
+    "FLAG_UPDATE_PIPELINE_ENABLED", "true"
+).lower() in ("1", "true", "yes")
+# Milisegundos que el líder espera a que se sumen más actualizaciones al lote
+FLAG_UPDATE_BATCH_WINDOW_MS = float(os.getenv("FLAG_UPDATE_BATCH_WINDOW_MS", "0"))
+# Máximo de actualizaciones confirmadas por transacción
+FLAG_UPDATE_MAX_BATCH = int(os.getenv("FLAG_UPDATE_MAX_BATCH", "500"))
+
+
+class _PendingUpdate:
+    """Actualización en espera de su lote."""
+
+    __slots__ = ("changes", "done", "error", "lead", "name", "result")
+
+    def __init__(self, name: str, changes: dict):
+        self.name = name
+        self.changes = changes
+        self.done = threading.Event()
+        # Se activa cuando la solicitud debe confirmar el lote siguiente
+        self.lead = False
+        self.result: Optional[FlagSnapshot] = None
+        self.error: Optional[BaseException] = None
+
+
+class FlagUpdatePipeline:
+    """
+    Cola de actualizaciones de flags confirmadas en grupo.
+
+    No usa hilos propios: el lote lo confirma una de las solicitudes que
+    esperan, con su propia sesión de base de datos.
+
+    Args:
+        enabled: Si es False, cada actualización se confirma sola al llegar
+        window_seconds: Espera del líder antes de tomar el lote
+        max_batch: Máximo de actualizaciones por transacción
+    """
+
+    def __init__(
+        self,
+        enabled: bool = FLAG_UPDATE_PIPELINE_ENABLED,
+        window_seconds: float = FLAG_UPDATE_BATCH_WINDOW_MS / 1000,
+        max_batch: int = FLAG_UPDATE_MAX_BATCH,
+    ):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._pending: list[_PendingUpdate] = []
+        self._committing = False
+        # Contadores informativos
+        self.batches = 0
+        self.updates = 0
+        self.coalesced = 0
+
+    def update(self, db: Session, flag_name: str, changes: dict) -> FlagSnapshot:
+        """
+        Aplica una actualización ya validada y espera a que se confirme.
+
+        Args:
+            db: Sesión de base de datos; se usa si esta solicitud confirma un lote
+            flag_name: Nombre de la flag
+            changes: Campos a actualizar (``FlagUpdate`` con ``exclude_unset``)
+
+        Returns:
+            FlagSnapshot: Flag confirmada
+
+        Raises:
+            FlagNotFoundException: Si la flag no existe
+        """
+        request = _PendingUpdate(flag_name.lower(), changes)
+        if not self.enabled:
+            self._commit_batch(db, [request])
+            return self._outcome(request)
+
+        with self._lock:
+            self._pending.append(request)
+            lead = not self._committing
+            self._committing = True
+
+        if not lead:
+            request.done.wait()
+            if not request.lead:
+                return self._outcome(request)
+            request.done.clear()
+
+        self._lead(db)
+        return self._outcome(request)
+
+    def stats(self) -> dict:
+        """Devuelve los contadores del pipeline."""
+        return {
+            "batches": self.batches,
+            "updates": self.updates,
+            "coalesced": self.coalesced,
+            "avg_batch_size": self.updates / self.batches if self.batches else 0.0,
+        }
+
+    def _lead(self, db: Session) -> None:
+        """Confirma un lote y cede el turno a la primera actualización pendiente."""
+        try:
+            if self.window_seconds > 0:
+                time.sleep(self.window_seconds)
+            with self._lock:
+                batch = self._pending[: self.max_batch]
+                del self._pending[: len(batch)]
+            self._commit_batch(db, batch)
+        finally:
+            with self._lock:
+                if self._pending:
+                    successor = self._pending[0]
+                    successor.lead = True
+                    successor.done.set()
+                else:
+                    self._committing = False
+
+    def _commit_batch(self, db: Session, batch: list[_PendingUpdate]) -> None:
+        """Aplica el lote en una transacción y entrega a cada solicitud su resultado."""
+        try:
+            names = list(dict.fromkeys(request.name for request in batch))
+            flags = {
+                flag.name: flag
+                for flag in db.scalars(select(Flag).where(Flag.name.in_(names)))
+            }
+
+            applied: list[_PendingUpdate] = []
+            for request in batch:
+                db_flag = flags.get(request.name)
+                if db_flag is None:
+                    request.error = FlagNotFoundException(request.name)
+                    continue
+                # Un savepoint por solicitud: si sus cambios no se pueden
+                # escribir, solo ella falla y el resto del lote se confirma
+                try:
+                    with db.begin_nested():
+                        if "allowed_users" in request.changes:
+                            # El setter compara con las filas actuales, que no
+                            # se cargan con la flag
+                            db.refresh(db_flag, ["allowed_user_rows"])
+                        for field, value in request.changes.items():
+                            setattr(db_flag, field, value)
+                        db.flush()
+                except Exception as exc:
+                    logger.warning(
+                        "Se descarta la actualización de %s: %s", request.name, exc
+                    )
+                    request.error = exc
+                    continue
+                applied.append(request)
+
+            updated = {request.name: flags[request.name] for request in applied}
+            for db_flag in updated.values():
+                # Incrementar la versión en la propia sentencia UPDATE
+                db_flag.version = Flag.version + 1
+
+            if updated:
+                # Leer el estado resultante antes del commit: es exactamente
+                # el que se confirma, y después no queda nada que releer
+                db.flush()
+                snapshots = {
+                    flag.name: FlagSnapshot.from_model(flag)
+                    for flag in db.scalars(
+                        select(Flag)
+                        .options(selectinload(Flag.allowed_user_rows))
+                        .where(Flag.id.in_([flag.id for flag in updated.values()]))
+                    )
+                }
+                db.commit()
+                for request in applied:
+                    request.result = snapshots[request.name]
+                self._publish(db, list(snapshots.values()))
+
+            self.batches += 1
+            self.updates += len(applied)
+            self.coalesced += len(applied) - len(updated)
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Falló el commit de un lote de actualizaciones")
+            for request in batch:
+                if request.result is None and request.error is None:
+                    request.error = exc
+        finally:
+            for request in batch:
+                request.done.set()
+
+    @staticmethod
+    def _publish(db: Session, snapshots: list[FlagSnapshot]) -> None:
+        """
+        Publica un lote ya confirmado; los fallos solo se registran.
+
+        Args:
+            db: Sesión de base de datos, para la tabla compartida
+            snapshots: Snapshots de las flags confirmadas
+        """
+        try:
+            # Publicar los cambios en el snapshot de evaluación y a los suscriptores
+            notify_snapshots_committed(snapshots, FLAG_UPDATED)
+        except Exception:
+            logger.exception("No se pudo publicar un lote de actualizaciones")
+        try:
+            shared_flag_table.publish(db)
+        except Exception:
+            logger.exception("No se pudo publicar la tabla compartida de flags")
+
+    @staticmethod
+    def _outcome(request: _PendingUpdate) -> FlagSnapshot:
+        """Devuelve el resultado de una actualización o lanza su excepción."""
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+
+# Pipeline compartido por el proceso
+flag_update_pipeline = FlagUpdatePipeline()
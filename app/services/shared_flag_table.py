@@ -0,0 +1,350 @@
+"""
+Tabla de flags en memoria compartida para los workers de un mismo host.
+
+Con varios workers de uvicorn cada proceso mantiene su propio ``flag_cache``.
+Con ``SHARED_FLAG_TABLE_ENABLED`` las flags se publican además en un archivo
+de ``SHARED_FLAG_TABLE_DIR`` (por defecto en ``/dev/shm``, es decir, en RAM)
+con el formato binario de ``app.services.flag_snapshot``. Cada worker lo mapea
+con ``mmap`` de solo lectura y evalúa sobre él con
+``featureflags_client.BinarySnapshot``, así que el host guarda una sola copia
+de la tabla sin importar cuántos workers haya.
+
+El directorio contiene:
+
+- ``control``: 16 bytes mapeados por todos los workers con la generación
+  vigente (u64) y el instante de publicación (f64).
+- ``flags-<generación>.ffsn``: la tabla de cada generación.
+- ``lock``: cerrojo ``flock`` que serializa las publicaciones entre procesos.
+
+Publicar escribe la tabla nueva completa y solo después incrementa la
+generación; los lectores ven la generación anterior o la nueva, nunca una
+tabla a medio escribir. La tabla se reconstruye desde la base de datos (no
+desde el caché del worker) para no perder escrituras de otros procesos.
+"""
+
+import contextlib
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.services.bucketing import LEGACY_HASH_ALGORITHM
+from app.services.evaluation_service import FlagVariant, parse_variants
+from app.services.flag_cache import FLAG_CACHE_TTL_SECONDS, compute_flag_set_etag
+from app.services.flag_snapshot import encode_binary_snapshot
+from app.services.targeting import FlagRule, parse_rules
+
+if TYPE_CHECKING:
+    from featureflags_client.binary import BinarySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Publica y evalúa sobre la tabla compartida
+SHARED_FLAG_TABLE_ENABLED = os.getenv("SHARED_FLAG_TABLE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SHARED_FLAG_TABLE_DIR = os.getenv(
+    "SHARED_FLAG_TABLE_DIR",
+    os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        "featureflags",
+    ),
+)
+
+_CONTROL = struct.Struct("<Qd")
+_CONTROL_FILE = "control"
+_LOCK_FILE = "lock"
+
+
+class SharedFlagEntry(NamedTuple):
+    """Fila de la tabla compartida, leída de las columnas de ``Flag``."""
+
+    id: int
+    name: str
+    enabled: bool
+    rollout_percentage: int
+    allowed_users: tuple[str, ...]
+    hash_algorithm: str
+    version: int
+    variants: tuple[FlagVariant, ...] = ()
+    rules: tuple[FlagRule, ...] = ()
+
+
+class SharedFlagTable:
+    """
+    Publicación y lectura de la tabla de flags compartida.
+
+    Args:
+        directory: Directorio de la tabla; todos los workers deben usar el mismo
+        enabled: Si es False, ``publish`` y ``current`` no hacen nada
+        ttl_seconds: Antigüedad tras la cual ``refresh_if_stale`` reconstruye
+            la tabla (cubre escrituras hechas desde otros hosts). 0 la desactiva
+    """
+
+    def __init__(
+        self,
+        directory: str = SHARED_FLAG_TABLE_DIR,
+        enabled: bool = SHARED_FLAG_TABLE_ENABLED,
+        ttl_seconds: float = FLAG_CACHE_TTL_SECONDS,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._control = None
+        self._generation = 0
+        self._table: Optional[BinarySnapshot] = None
+        self._swap_lock = threading.Lock()
+
+    def current(self) -> Optional["BinarySnapshot"]:
+        """
+        Devuelve la tabla vigente, cambiando de generación si hubo una nueva.
+
+        No accede a la base de datos: solo lee la generación del bloque de
+        control y, si cambió, mapea el archivo de la nueva tabla.
+
+        Returns:
+            Optional[BinarySnapshot]: Tabla vigente, o None si está desactivada
+                o aún no se publicó ninguna
+        """
+        if not self.enabled:
+            return None
+        control = self._control or self._open_control()
+        if control is None:
+            return None
+
+        generation = _CONTROL.unpack_from(control, 0)[0]
+        if generation != self._generation:
+            with self._swap_lock:
+                if generation != self._generation:
+                    self._swap(generation)
+        return self._table
+
+    def needs_refresh(self) -> bool:
+        """Indica si la tabla está activada y falta o expiró."""
+        return self.enabled and self.is_stale()
+
+    def is_stale(self) -> bool:
+        """Indica si la tabla falta o superó ``ttl_seconds`` desde su publicación."""
+        control = self._control or self._open_control()
+        if control is None:
+            return True
+        generation, published_at = _CONTROL.unpack_from(control, 0)
+        if generation == 0:
+            return True
+        return self.ttl_seconds > 0 and time.time() - published_at > self.ttl_seconds
+
+    def publish(self, db: Session) -> int:
+        """
+        Reconstruye la tabla desde la base de datos y la publica.
+
+        Debe llamarse después del commit de cada escritura de flags.
+
+        Args:
+            db: Sesión de base de datos
+
+        Returns:
+            int: Generación publicada (0 si la tabla está desactivada)
+        """
+        if not self.enabled:
+            return 0
+        with self._publish_lock(blocking=True):
+            return self._publish(db)
+
+    def refresh_if_stale(self, db: Session) -> bool:
+        """
+        Publica la tabla si falta o expiró y ningún otro proceso lo está haciendo.
+
+        Args:
+            db: Sesión de base de datos
+
+        Returns:
+            bool: True si este proceso publicó una generación nueva
+        """
+        if not self.needs_refresh():
+            return False
+        try:
+            with self._publish_lock(blocking=False):
+                # Otro proceso pudo publicar mientras se esperaba el cerrojo
+                if not self.is_stale():
+                    return False
+                self._publish(db)
+                return True
+        except BlockingIOError:
+            return False
+
+    def _publish(self, db: Session) -> int:
+        """Escribe la tabla de la generación siguiente y la activa (con cerrojo)."""
+        entries = load_entries(db)
+        data = encode_binary_snapshot(compute_flag_set_etag(entries), entries)
+
+        control_path = os.path.join(self.directory, _CONTROL_FILE)
+        fd = os.open(control_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            raw = os.pread(fd, _CONTROL.size, 0)
+            previous = _CONTROL.unpack(raw)[0] if len(raw) == _CONTROL.size else 0
+            generation = previous + 1
+
+            table_path = self._table_path(generation)
+            tmp_path = f"{table_path}.tmp"
+            with open(tmp_path, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, table_path)
+
+            # La generación se cambia cuando la tabla ya está completa
+            os.pwrite(fd, _CONTROL.pack(generation, time.time()), 0)
+        finally:
+            os.close(fd)
+
+        # Los workers que aún mapean la anterior la conservan hasta cambiar
+        self._remove_old_tables(keep=(previous, generation))
+        logger.info(
+            "Tabla de flags compartida publicada: generación %s, %s flags",
+            generation,
+            len(entries),
+        )
+        return generation
+
+    def _publish_lock(self, blocking: bool):
+        """Cerrojo entre procesos para publicar."""
+        os.makedirs(self.directory, exist_ok=True)
+        return _FileLock(os.path.join(self.directory, _LOCK_FILE), blocking)
+
+    def _open_control(self):
+        """Mapea el bloque de control si ya existe."""
+        path = os.path.join(self.directory, _CONTROL_FILE)
+        try:
+            with open(path, "rb") as handle:
+                if os.fstat(handle.fileno()).st_size < _CONTROL.size:
+                    return None
+                self._control = mmap.mmap(
+                    handle.fileno(), _CONTROL.size, access=mmap.ACCESS_READ
+                )
+        except FileNotFoundError:
+            return None
+        return self._control
+
+    def _swap(self, generation: int) -> None:
+        """Mapea la tabla de ``generation`` y la deja como vigente."""
+        # El lector del SDK solo se importa si la tabla compartida está en uso
+        from featureflags_client.binary import BinarySnapshot, BinarySnapshotError
+
+        try:
+            table = BinarySnapshot.open(self._table_path(generation))
+        except (OSError, BinarySnapshotError) as exc:
+            # Se conserva la tabla anterior; se reintenta en la próxima lectura
+            logger.warning("No se pudo mapear la generación %s: %s", generation, exc)
+            return
+        # La tabla anterior se libera cuando ninguna evaluación la usa
+        self._table = table
+        self._generation = generation
+
+    def _table_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"flags-{generation}.ffsn")
+
+    def _remove_old_tables(self, keep: tuple[int, ...]) -> None:
+        """Borra las tablas de generaciones que ya nadie debería mapear."""
+        kept = {os.path.basename(self._table_path(generation)) for generation in keep}
+        for name in os.listdir(self.directory):
+            if (
+                name.startswith("flags-")
+                and name.endswith(".ffsn")
+                and name not in kept
+            ):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(os.path.join(self.directory, name))
+
+
+class _FileLock:
+    """Contexto que toma un ``flock`` exclusivo sobre un archivo."""
+
+    def __init__(self, path: str, blocking: bool):
+        self.path = path
+        self.blocking = blocking
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(fd, flags)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def load_entries(db: Session) -> list[SharedFlagEntry]:
+    """
+    Lee todas las flags con dos consultas de columnas, sin instanciar ``Flag``.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        list[SharedFlagEntry]: Flags con sus listas de usuarios permitidos
+    """
+    allowed: dict[int, list[str]] = defaultdict(list)
+    for flag_id, user_id in db.execute(
+        select(FlagAllowedUser.flag_id, FlagAllowedUser.user_id).order_by(
+            FlagAllowedUser.id
+        )
+    ):
+        allowed[flag_id].append(user_id)
+
+    return [
+        SharedFlagEntry(
+            id=flag_id,
+            name=name,
+            enabled=bool(enabled),
+            rollout_percentage=int(rollout or 0),
+            allowed_users=tuple(allowed.get(flag_id, ())),
+            hash_algorithm=algorithm or LEGACY_HASH_ALGORITHM,
+            version=version,
+            variants=parse_variants(variants),
+            rules=parse_rules(rules),
+        )
+        for (
+            flag_id,
+            name,
+            enabled,
+            rollout,
+            algorithm,
+            version,
+            variants,
+            rules,
+        ) in db.execute(
+            select(
+                Flag.id,
+                Flag.name,
+                Flag.enabled,
+                Flag.rollout_percentage,
+                Flag.hash_algorithm,
+                Flag.version,
+                Flag.variants,
+                Flag.rules,
+            )
+        )
+    ]
+
+
+# Tabla compartida del proceso
+shared_flag_table = SharedFlagTable()
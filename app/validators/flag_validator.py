@@ -1,14 +1,30 @@
 """Validadores para datos de flags."""
 
 import re
-from typing import List
+from typing import TYPE_CHECKING, Iterable, List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.flag import Flag
 from app.exceptions import (
     DuplicateFlagException,
     InvalidRolloutPercentageException,
     InvalidFlagNameException,
+    InvalidHashAlgorithmException,
+    InvalidVariantsException,
+    InvalidRulesException,
 )
+from app.services.bucketing import available_algorithms
+from app.services.targeting import (
+    OPERATORS,
+    RESERVED_QUERY_PARAMS,
+    SET_OPERATORS,
+    VERSION_OPERATORS,
+    attribute_str,
+    version_key,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class FlagValidator:
@@ -16,6 +32,10 @@ class FlagValidator:
 
     # Expresión regular para nombres de flags válidos
     NAME_PATTERN = re.compile(r"^[a-z0-9_-]+$")
+    # Máximo de variantes por flag
+    MAX_VARIANTS = 100
+    # Máximo de reglas de segmentación por flag
+    MAX_RULES = 500
 
     @staticmethod
     def validate_name_format(name: str) -> None:
@@ -60,6 +80,32 @@ class FlagValidator:
         if existing_flag:
             raise DuplicateFlagException(name)
 
+    @staticmethod
+    async def validate_name_unique_async(
+        db: "AsyncSession", name: str, exclude_id: Optional[int] = None
+    ) -> None:
+        """
+        Versión asíncrona de ``validate_name_unique``.
+
+        Args:
+            db: Sesión asíncrona de base de datos
+            name: Nombre de la flag a validar
+            exclude_id: ID opcional de flag a excluir de la validación (para
+                actualizaciones)
+
+        Raises:
+            DuplicateFlagException: Si ya existe una flag con ese nombre
+        """
+        query = select(Flag.id).where(Flag.name == name.lower())
+
+        if exclude_id is not None:
+            query = query.where(Flag.id != exclude_id)
+
+        existing_flag = (await db.execute(query.limit(1))).first()
+
+        if existing_flag:
+            raise DuplicateFlagException(name)
+
     @staticmethod
     def validate_rollout_percentage(percentage: int) -> None:
         """
@@ -98,6 +144,95 @@ class FlagValidator:
             if not user_id.strip():
                 raise ValueError("Los IDs de usuario no pueden estar vacíos")
 
+    @staticmethod
+    def validate_hash_algorithm(algorithm: str) -> None:
+        """
+        Valida que el algoritmo de hash esté disponible en este proceso.
+
+        Args:
+            algorithm: Nombre del algoritmo de hash
+
+        Raises:
+            InvalidHashAlgorithmException: Si el algoritmo no está registrado
+        """
+        available = available_algorithms()
+        if algorithm not in available:
+            raise InvalidHashAlgorithmException(algorithm, available)
+
+    @staticmethod
+    def validate_variants(variants: Iterable) -> None:
+        """
+        Valida las variantes A/B/n de una flag.
+
+        Args:
+            variants: Variantes con ``name`` y ``weight`` (vacía en flags booleanas)
+
+        Raises:
+            InvalidVariantsException: Si hay nombres repetidos, pesos negativos,
+                demasiadas variantes o todos los pesos son 0
+        """
+        variants = list(variants)
+        if not variants:
+            return
+        if len(variants) > FlagValidator.MAX_VARIANTS:
+            raise InvalidVariantsException(
+                f"una flag admite hasta {FlagValidator.MAX_VARIANTS} variantes"
+            )
+        names = [variant.name for variant in variants]
+        if len(set(names)) != len(names):
+            raise InvalidVariantsException("los nombres de variante deben ser únicos")
+        if any(variant.weight < 0 for variant in variants):
+            raise InvalidVariantsException("los pesos no pueden ser negativos")
+        if sum(variant.weight for variant in variants) <= 0:
+            raise InvalidVariantsException("al menos una variante debe tener peso")
+
+    @staticmethod
+    def validate_rules(rules: Iterable) -> None:
+        """
+        Valida las reglas de segmentación de una flag.
+
+        Args:
+            rules: Reglas con ``attribute``, ``operator`` y ``value``
+
+        Raises:
+            InvalidRulesException: Si un operador no existe, el valor no tiene
+                la forma que pide el operador o hay demasiadas reglas
+        """
+        rules = list(rules)
+        if len(rules) > FlagValidator.MAX_RULES:
+            raise InvalidRulesException(
+                f"una flag admite hasta {FlagValidator.MAX_RULES} reglas"
+            )
+        for position, rule in enumerate(rules, start=1):
+            if not rule.attribute:
+                raise InvalidRulesException(f"regla {position}: falta el atributo")
+            if rule.attribute in RESERVED_QUERY_PARAMS:
+                raise InvalidRulesException(
+                    f"regla {position}: '{rule.attribute}' no es un atributo"
+                )
+            if rule.operator not in OPERATORS:
+                raise InvalidRulesException(
+                    f"regla {position}: operador desconocido '{rule.operator}'"
+                )
+            is_list = isinstance(rule.value, (list, tuple))
+            if rule.operator in SET_OPERATORS:
+                if not is_list or not rule.value:
+                    raise InvalidRulesException(
+                        f"regla {position}: '{rule.operator}' requiere una lista "
+                        "de valores"
+                    )
+            elif is_list or rule.value is None:
+                raise InvalidRulesException(
+                    f"regla {position}: '{rule.operator}' requiere un único valor"
+                )
+            elif (
+                rule.operator in VERSION_OPERATORS
+                and version_key(attribute_str(rule.value)) is None
+            ):
+                raise InvalidRulesException(
+                    f"regla {position}: '{rule.value}' no es un número ni una versión"
+                )
+
     @staticmethod
     def validate_flag_data(
         db: Session,
@@ -105,6 +240,7 @@ class FlagValidator:
         rollout_percentage: int,
         allowed_users: List[str],
         exclude_id: int = None,
+        hash_algorithm: Optional[str] = None,
     ) -> None:
         """
         Valida todos los datos de una flag
@@ -115,8 +251,38 @@ class FlagValidator:
             rollout_percentage: Porcentaje de despliegue
             allowed_users: Lista de IDs de usuarios permitidos
             exclude_id: ID opcional de flag a excluir de la validación de unicidad
+            hash_algorithm: Algoritmo de hash opcional de la flag
         """
         FlagValidator.validate_name_format(name)
         FlagValidator.validate_name_unique(db, name, exclude_id)
         FlagValidator.validate_rollout_percentage(rollout_percentage)
         FlagValidator.validate_allowed_users(allowed_users)
+        if hash_algorithm is not None:
+            FlagValidator.validate_hash_algorithm(hash_algorithm)
+
+    @staticmethod
+    async def validate_flag_data_async(
+        db: "AsyncSession",
+        name: str,
+        rollout_percentage: int,
+        allowed_users: List[str],
+        exclude_id: Optional[int] = None,
+        hash_algorithm: Optional[str] = None,
+    ) -> None:
+        """
+        Versión asíncrona de ``validate_flag_data``.
+
+        Args:
+            db: Sesión asíncrona de base de datos
+            name: Nombre de la flag
+            rollout_percentage: Porcentaje de despliegue
+            allowed_users: Lista de IDs de usuarios permitidos
+            exclude_id: ID opcional de flag a excluir de la validación de unicidad
+            hash_algorithm: Algoritmo de hash opcional de la flag
+        """
+        FlagValidator.validate_name_format(name)
+        await FlagValidator.validate_name_unique_async(db, name, exclude_id)
+        FlagValidator.validate_rollout_percentage(rollout_percentage)
+        FlagValidator.validate_allowed_users(allowed_users)
+        if hash_algorithm is not None:
+            FlagValidator.validate_hash_algorithm(hash_algorithm)
@@ -0,0 +1,80 @@
+"""
+Microbenchmark de los algoritmos de hash para el bucketing de rollout.
+
+Uso:
+    python -m benchmarks.bench_bucketing [--iterations N]
+"""
+
+import argparse
+import timeit
+
+from app.services.bucketing import available_algorithms, make_user_hasher
+from app.services.evaluation_service import CompiledFlag, EvaluationService
+
+FLAG_NAME = "new-homepage-experiment"
+
+
+def bench_hashers(iterations: int) -> dict[str, float]:
+    """Mide ns por hash de cada algoritmo disponible."""
+    user_ids = [f"user-{i}" for i in range(1000)]
+    rounds = max(1, iterations // len(user_ids))
+    results = {}
+    for algorithm in available_algorithms():
+        hash_user = make_user_hasher(algorithm, FLAG_NAME)
+        elapsed = min(
+            timeit.repeat(
+                lambda hash_user=hash_user: [
+                    hash_user(user_id) for user_id in user_ids
+                ],
+                number=rounds,
+                repeat=5,
+            )
+        )
+        results[algorithm] = elapsed / (rounds * len(user_ids)) * 1e9
+    return results
+
+
+def bench_legacy_hash(iterations: int) -> float:
+    """Mide ns por llamada de ``EvaluationService._hash_user_flag`` (SHA-256)."""
+    elapsed = min(
+        timeit.repeat(
+            lambda: EvaluationService._hash_user_flag("user-123", FLAG_NAME),
+            number=iterations,
+            repeat=5,
+        )
+    )
+    return elapsed / iterations * 1e9
+
+
+def bench_evaluate(iterations: int) -> dict[str, float]:
+    """Mide ns por evaluación completa con rollout del 50% por algoritmo."""
+    results = {}
+    for algorithm in available_algorithms():
+        flag = CompiledFlag(FLAG_NAME, True, 50, [], hash_algorithm=algorithm)
+        elapsed = min(
+            timeit.repeat(
+                lambda flag=flag: flag.evaluate("user-123"),
+                number=iterations,
+                repeat=5,
+            )
+        )
+        results[algorithm] = elapsed / iterations * 1e9
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"_hash_user_flag (histórico): {bench_legacy_hash(args.iterations):8.1f} ns")
+    print("Hash por usuario:")
+    for algorithm, ns in bench_hashers(args.iterations).items():
+        print(f"  {algorithm:<10} {ns:8.1f} ns")
+    print("CompiledFlag.evaluate con rollout 50%:")
+    for algorithm, ns in bench_evaluate(args.iterations).items():
+        print(f"  {algorithm:<10} {ns:8.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
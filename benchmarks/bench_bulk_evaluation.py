@@ -0,0 +1,78 @@
+"""
+Evaluación masiva con NumPy frente al evaluador por usuario.
+
+Para cada combinación de rollout y tamaño de la lista de permitidos compara:
+
+- ``CompiledFlag.evaluate`` usuario a usuario (el camino escalar).
+- ``bulk_evaluate`` (hashes por lotes y máscaras de NumPy).
+- ``bulk_evaluate_many`` con 5 flags sobre los mismos IDs, que codifica los
+  IDs una sola vez.
+
+Uso:
+    python -m benchmarks.bench_bulk_evaluation [--users N] [--repeat N]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from app.services.bulk_evaluation import bulk_evaluate, bulk_evaluate_many
+from app.services.evaluation_service import CompiledFlag
+
+ROLLOUTS = (35, 100)
+ALLOWLIST_SIZES = (0, 100, 10_000)
+
+
+def _best(func, repeat: int) -> float:
+    """Mejor tiempo (ms) de ``repeat`` ejecuciones."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--algorithm", default="blake2b64")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ids = np.empty(args.users, dtype=object)
+    ids[:] = [f"user-{i}" for i in range(args.users)]
+    user_list = ids.tolist()
+
+    print(f"{args.users} usuarios, hash {args.algorithm}")
+    print(
+        f"{'rollout':>7} {'permitidos':>10} {'escalar (ms)':>13} "
+        f"{'bulk (ms)':>10} {'x':>5} {'5 flags (ms)':>13}"
+    )
+    for rollout in ROLLOUTS:
+        for allowlist in ALLOWLIST_SIZES:
+            allowed = [f"user-{i * 7}" for i in range(allowlist)]
+            flags = [
+                CompiledFlag(
+                    f"bench-bulk-{n}",
+                    True,
+                    rollout,
+                    allowed,
+                    hash_algorithm=args.algorithm,
+                )
+                for n in range(5)
+            ]
+            evaluate = flags[0].evaluate
+
+            scalar = _best(
+                lambda evaluate=evaluate: [evaluate(u) for u in user_list],
+                args.repeat,
+            )
+            bulk = _best(lambda flag=flags[0]: bulk_evaluate(flag, ids), args.repeat)
+            many = _best(
+                lambda flags=flags: bulk_evaluate_many(flags, ids), args.repeat
+            )
+            print(
+                f"{rollout:>6}% {allowlist:>10} {scalar:13.1f} "
+                f"{bulk:10.1f} {scalar / bulk:5.1f} {many:13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
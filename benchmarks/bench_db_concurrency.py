@@ -0,0 +1,120 @@
+"""
+Benchmark de lecturas/escrituras concurrentes sobre SQLite.
+
+Simula varios workers de uvicorn (un proceso por lector o escritor) que
+comparten el mismo archivo de base de datos y compara la configuración por
+defecto de SQLite (journal ``DELETE``) con los PRAGMAs de ``app.database``
+(WAL, ``synchronous=NORMAL``, ``mmap_size``, ``cache_size``).
+
+Uso:
+    python -m benchmarks.bench_db_concurrency [--readers 4] [--writers 1] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SQLITE_PRAGMAS, Base, create_db_engine
+from app.models.flag import Flag
+
+SEED_FLAGS = 1000
+
+# Sin PRAGMAs: equivale a la configuración previa (solo el timeout del driver)
+BASELINE_PRAGMAS = {"busy_timeout": SQLITE_PRAGMAS["busy_timeout"]}
+
+
+def _seed(url: str, pragmas: dict) -> None:
+    """Crea el esquema y las flags iniciales."""
+    db_engine = create_db_engine(url, pragmas)
+    Base.metadata.create_all(bind=db_engine)
+    session = sessionmaker(bind=db_engine)()
+    session.add_all(
+        Flag(name=f"flag-{i}", rollout_percentage=i % 100, allowed_users=[])
+        for i in range(SEED_FLAGS)
+    )
+    session.commit()
+    session.close()
+    db_engine.dispose()
+
+
+def _worker(url, pragmas, role, deadline, results):
+    """Ejecuta lecturas o escrituras hasta ``deadline`` y reporta el conteo."""
+    db_engine = create_db_engine(url, pragmas)
+    Session = sessionmaker(bind=db_engine)
+    rng = random.Random(os.getpid())
+    ops = errors = 0
+
+    while time.time() < deadline:
+        session = Session()
+        try:
+            name = f"flag-{rng.randrange(SEED_FLAGS)}"
+            flag = session.query(Flag).filter(Flag.name == name).first()
+            if role == "writer":
+                flag.rollout_percentage = rng.randrange(101)
+                session.commit()
+            ops += 1
+        except OperationalError:
+            session.rollback()
+            errors += 1
+        finally:
+            session.close()
+
+    db_engine.dispose()
+    results.put((role, ops, errors))
+
+
+def run(pragmas: dict, readers: int, writers: int, seconds: float) -> dict:
+    """Ejecuta una ronda del benchmark con los PRAGMAs indicados."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(url, pragmas)
+
+        results = multiprocessing.Queue()
+        deadline = time.time() + 1 + seconds
+        processes = [
+            multiprocessing.Process(
+                target=_worker, args=(url, pragmas, role, deadline, results)
+            )
+            for role in ["reader"] * readers + ["writer"] * writers
+        ]
+        for process in processes:
+            process.start()
+        totals = {"reader": [0, 0], "writer": [0, 0]}
+        for _ in processes:
+            role, ops, errors = results.get()
+            totals[role][0] += ops
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+
+    return {
+        "reads_per_s": totals["reader"][0] / seconds,
+        "writes_per_s": totals["writer"][0] / seconds,
+        "errors": totals["reader"][1] + totals["writer"][1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for label, pragmas in (("antes", BASELINE_PRAGMAS), ("después", SQLITE_PRAGMAS)):
+        result = run(pragmas, args.readers, args.writers, args.seconds)
+        print(
+            f"{label:<8} lecturas/s={result['reads_per_s']:9.0f} "
+            f"escrituras/s={result['writes_per_s']:7.0f} "
+            f"errores={result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark del costo del registro de evaluaciones en ``GET /api/flags/evaluate``.
+
+Mide la latencia media del endpoint (llamando directamente a la aplicación
+ASGI) con el registro desactivado y activado, con el hilo de escritura en
+marcha, y el costo aislado de ``EvaluationLog.record``. Las rondas se
+alternan para que la deriva del proceso afecte a ambas variantes por igual.
+
+Uso:
+    python -m benchmarks.bench_evaluation_log [--requests 20000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# La aplicación crea su engine al importarse: apuntarla a un archivo temporal
+# antes de cualquier import de ``app`` para no tocar ./featureflags.db
+_WORKDIR = tempfile.mkdtemp(prefix="featureflags-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/app.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.flag import Flag  # noqa: E402
+from app.routers import flags as flags_router  # noqa: E402
+from app.services.evaluation_log import EvaluationLog  # noqa: E402
+
+
+async def _call(query: str) -> int:
+    """Ejecuta ``GET /api/flags/evaluate`` sobre la aplicación ASGI."""
+    path = "/api/flags/evaluate"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _us_per_request(queries: list[str]) -> float:
+    """Latencia media en microsegundos de una secuencia de evaluaciones."""
+    if await _call(queries[0]) != 200:
+        raise RuntimeError("GET /api/flags/evaluate falló")
+    start = time.perf_counter()
+    for query in queries:
+        await _call(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def _ns_per_record(calls: int) -> float:
+    """Costo en nanosegundos de ``record`` con el buffer con espacio."""
+    log = EvaluationLog(path=os.path.join(_WORKDIR, "record.ndjson"), capacity=calls)
+    log.active = True
+    record = log.record
+    start = time.perf_counter()
+    for _ in range(calls):
+        record("flag-000", "user", True, "rollout_percentage")
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.execute(
+            insert(Flag),
+            [{"name": f"flag-{i:03d}", "rollout_percentage": 50} for i in range(10)],
+        )
+        session.commit()
+
+    queries = [f"flag=flag-{i % 10:03d}&user_id=u{i}" for i in range(args.requests)]
+    disabled = EvaluationLog(path="")
+    enabled = EvaluationLog(path=os.path.join(_WORKDIR, "evaluations.ndjson"))
+    enabled.start()
+
+    results: dict[str, list[float]] = {"sin registro": [], "con registro": []}
+    for _ in range(args.rounds):
+        for label, log in (("sin registro", disabled), ("con registro", enabled)):
+            flags_router.evaluation_log = log
+            results[label].append(asyncio.run(_us_per_request(queries)))
+    enabled.stop()
+
+    for label, samples in results.items():
+        median = sorted(samples)[len(samples) // 2]
+        print(f"{label:<13} mejor={min(samples):7.1f}µs mediana={median:7.1f}µs")
+    print(f"record()      {_ns_per_record(args.requests * 10):7.1f}ns por llamada")
+    print(f"escritas      {enabled.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark de ``PUT /api/flags/{flag_name}`` concurrente.
+
+Reproduce la automatización que ajusta ``rollout_percentage`` durante un
+incidente: ``--concurrency`` clientes envían actualizaciones a la aplicación
+ASGI en proceso (los handlers corren en el threadpool, como con uvicorn)
+sobre una base SQLite en archivo con los PRAGMAs de ``app.database``.
+
+Compara el pipeline de actualizaciones desactivado (un commit por
+solicitud) con el pipeline activado, cuando todos los clientes actualizan la
+misma flag y cuando cada uno actualiza la suya.
+
+Uso:
+    python -m benchmarks.bench_flag_updates [--updates 2000] [--concurrency 1 8 32]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# La aplicación crea su engine al importarse: apuntarla a un archivo temporal
+# antes de cualquier import de ``app`` para no tocar ./featureflags.db
+_WORKDIR = tempfile.mkdtemp(prefix="featureflags-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/app.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.flag import Flag  # noqa: E402
+from app.services.flag_update_pipeline import flag_update_pipeline  # noqa: E402
+
+SEED_FLAGS = 64
+
+
+async def _put(path: str, body: bytes) -> int:
+    """Ejecuta un PUT sobre la aplicación ASGI y devuelve su estado."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "PUT",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _drive(updates: int, concurrency: int, hot: bool) -> float:
+    """Envía ``updates`` PUT con ``concurrency`` clientes y devuelve updates/s."""
+    remaining = updates
+
+    async def client(worker: int):
+        nonlocal remaining
+        path = f"/api/flags/flag-{0 if hot else worker % SEED_FLAGS:03d}"
+        while remaining > 0:
+            remaining -= 1
+            body = json.dumps({"rollout_percentage": remaining % 101}).encode()
+            if await _put(path, body) != 200:
+                raise RuntimeError(f"PUT {path} falló")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(worker) for worker in range(concurrency)))
+    return updates / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.execute(
+            insert(Flag), [{"name": f"flag-{i:03d}"} for i in range(SEED_FLAGS)]
+        )
+        session.commit()
+
+    for hot in (True, False):
+        label = "misma flag" if hot else "flags distintas"
+        for concurrency in args.concurrency:
+            rates = {}
+            for enabled in (False, True):
+                flag_update_pipeline.enabled = enabled
+                before = flag_update_pipeline.stats()
+                rates[enabled] = asyncio.run(_drive(args.updates, concurrency, hot))
+                after = flag_update_pipeline.stats()
+            batches = after["batches"] - before["batches"]
+            batch_size = (after["updates"] - before["updates"]) / max(batches, 1)
+            print(
+                f"{label:<16} concurrencia={concurrency:<3} "
+                f"sin pipeline={rates[False]:7.0f}/s "
+                f"con pipeline={rates[True]:7.0f}/s "
+                f"({rates[True] / rates[False]:4.1f}x, lote medio {batch_size:5.1f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
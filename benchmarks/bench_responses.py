@@ -0,0 +1,166 @@
+"""
+Benchmark de la serialización de respuestas de evaluación y listado.
+
+Compara, por solicitud y del lado del servidor, los endpoints actuales
+(``OrjsonResponse`` construida a partir de objetos internos y, en el listado,
+filas de columnas en lugar de objetos ``Flag``) con una aplicación de
+referencia que reproduce la implementación anterior: modelos de Pydantic que
+FastAPI valida contra ``response_model`` y serializa con su encoder.
+
+Las solicitudes se envían llamando directamente a la aplicación ASGI, sin
+cliente HTTP, para que el tiempo medido sea solo el del servidor.
+
+Uso:
+    python -m benchmarks.bench_responses [--requests 5000] [--flags 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# La aplicación crea su engine al importarse: apuntarla a un archivo temporal
+# antes de cualquier import de ``app`` para no tocar ./featureflags.db
+_WORKDIR = tempfile.mkdtemp(prefix="featureflags-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/app.db")
+
+from fastapi import Depends, FastAPI, Query, Response  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database import Base, SessionLocal, engine, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.flag import Flag  # noqa: E402
+from app.models.flag_allowed_user import FlagAllowedUser  # noqa: E402
+from app.routers.listing import FlagListParams  # noqa: E402
+from app.schemas.flag import EvaluateResponse, FlagListResponse  # noqa: E402
+from app.services import flag_cache  # noqa: E402
+from app.services.flag_cache import compute_flag_set_etag  # noqa: E402
+
+ALLOWED_USERS_PER_FLAG = 5
+
+
+def _reference_app() -> FastAPI:
+    """Endpoints con la implementación anterior, basada en modelos de Pydantic."""
+    reference = FastAPI()
+
+    @reference.get("/api/flags/evaluate", response_model=EvaluateResponse)
+    def evaluate_flag(
+        user_id: str = Query(...), flag: str = Query(...), db: Session = Depends(get_db)
+    ):
+        cached_flag = flag_cache.get(db, flag.lower())
+        enabled, reason = cached_flag.evaluator.evaluate(user_id)
+        return EvaluateResponse(
+            flag_name=cached_flag.name, enabled=enabled, reason=reason
+        )
+
+    @reference.get("/api/flags", response_model=FlagListResponse)
+    def list_flags(
+        response: Response,
+        params: FlagListParams = Depends(),
+        db: Session = Depends(get_db),
+    ):
+        response.headers["X-Flag-Events-Version"] = "0"
+        flags, next_cursor = params.paginate(db.execute(params.query()).scalars().all())
+        if params.is_full_listing:
+            response.headers["ETag"] = compute_flag_set_etag(flags)
+        return FlagListResponse(
+            flags=flags, total=len(flags), next_cursor=next_cursor, environment="local"
+        )
+
+    return reference
+
+
+def _seed(flag_count: int) -> None:
+    """Crea el esquema e inserta las flags con su lista de permitidos."""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.execute(
+            insert(Flag),
+            [
+                {"name": f"flag-{i:06d}", "rollout_percentage": 50}
+                for i in range(flag_count)
+            ],
+        )
+        session.execute(
+            insert(FlagAllowedUser),
+            [
+                {"flag_id": flag_id, "user_id": f"user-{n}"}
+                for flag_id in range(1, flag_count + 1)
+                for n in range(ALLOWED_USERS_PER_FLAG)
+            ],
+        )
+        session.commit()
+
+
+async def _call(asgi_app, path: str, query: str) -> int:
+    """Ejecuta una solicitud GET sobre la aplicación ASGI y devuelve su estado."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi_app(scope, receive, send)
+    return status
+
+
+async def _us_per_request(asgi_app, path: str, queries: list[str]) -> float:
+    """Latencia media en microsegundos de una secuencia de solicitudes."""
+    for query in queries[:20]:
+        if await _call(asgi_app, path, query) != 200:
+            raise RuntimeError(f"GET {path}?{query} falló")
+    start = time.perf_counter()
+    for query in queries:
+        await _call(asgi_app, path, query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--flags", type=int, default=1000)
+    args = parser.parse_args()
+
+    _seed(args.flags)
+    reference = _reference_app()
+
+    evaluate = [f"flag=flag-{i % 10:06d}&user_id=u{i}" for i in range(args.requests)]
+    page = ["limit=100"] * max(args.requests // 10, 20)
+    full = ["" for _ in range(max(args.requests // 100, 20))]
+    cases = (
+        ("evaluate", "/api/flags/evaluate", evaluate),
+        ("list limit=100", "/api/flags", page),
+        (f"list {args.flags} flags", "/api/flags", full),
+    )
+
+    for label, path, queries in cases:
+        before = asyncio.run(_us_per_request(reference, path, queries))
+        after = asyncio.run(_us_per_request(app, path, queries))
+        print(
+            f"{label:<18} anterior={before:9.1f}µs actual={after:9.1f}µs "
+            f"ahorro={before - after:8.1f}µs ({before / after:4.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Tamaño y tiempo de carga del snapshot binario frente al JSON.
+
+Compara, para un conjunto sintético de flags con allowlists:
+
+- ``GET /api/flags`` (``FlagListResponse``), el listado completo en JSON.
+- ``GET /api/flags/snapshot`` en JSON y en binario, con y sin zlib.
+
+La carga mide lo que hace el SDK al recibir cada documento hasta poder
+evaluar: decodificar el JSON y compilar las ``LocalFlag``, o validar la
+cabecera del binario (y descomprimirlo, o mapearlo desde disco).
+
+Uso:
+    python -m benchmarks.bench_snapshot [--flags N] [--allowlist N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
+from datetime import UTC, datetime
+
+from app.schemas.flag import FlagListResponse, FlagResponse
+from app.services.flag_cache import FlagSnapshot
+from app.services.flag_snapshot import encode_snapshot
+from featureflags_client import BinarySnapshot, LocalFlag
+
+ETAG = '"bench-snapshot"'
+
+
+def build_flags(count: int, allowlist: int) -> list[FlagSnapshot]:
+    """Genera flags con rollouts variados y allowlists de ``allowlist`` usuarios."""
+    rng = random.Random(42)
+    created_at = datetime.now(UTC)
+    return [
+        FlagSnapshot(
+            id=i + 1,
+            name=f"bench-flag-{i:06d}",
+            description=f"Flag sintética {i}",
+            enabled=i % 10 != 0,
+            rollout_percentage=rng.choice((0, 10, 25, 50, 100)),
+            allowed_users=tuple(
+                f"user-{rng.randrange(1_000_000)}" for _ in range(allowlist)
+            ),
+            hash_algorithm="sha256",
+            variants=(),
+            rules=(),
+            version=1,
+            created_at=created_at,
+            evaluator=None,
+        )
+        for i in range(count)
+    ]
+
+
+def _best(func, repeat: int) -> float:
+    """Mejor tiempo (ms) de ``repeat`` ejecuciones."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def _load_json(body: bytes, key: str) -> dict:
+    """Carga del SDK a partir de un documento JSON."""
+    return {
+        entry["name"]: LocalFlag.from_dict(entry) for entry in json.loads(body)[key]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flags", type=int, default=10_000)
+    parser.add_argument("--allowlist", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    flags = build_flags(args.flags, args.allowlist)
+    listing = FlagListResponse(
+        flags=[FlagResponse.model_validate(flag) for flag in flags],
+        total=len(flags),
+        environment="bench",
+    ).model_dump_json()
+    documents = {
+        "json.listing": listing.encode(),
+        "json.snapshot": encode_snapshot(ETAG, flags, "json"),
+        "binary": encode_snapshot(ETAG, flags, "binary"),
+        "binary.zlib": encode_snapshot(ETAG, flags, "binary", compress=True),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "flags.ffsn")
+        with open(path, "wb") as handle:
+            handle.write(documents["binary"])
+
+        loaders = {
+            "json.listing": lambda: _load_json(documents["json.listing"], "flags"),
+            "json.snapshot": lambda: _load_json(documents["json.snapshot"], "flags"),
+            "binary": lambda: BinarySnapshot.from_bytes(documents["binary"]),
+            "binary.zlib": lambda: BinarySnapshot.from_bytes(documents["binary.zlib"]),
+            "binary.mmap": lambda: BinarySnapshot.open(path),
+        }
+
+        print(f"{args.flags} flags, {args.allowlist} usuarios por allowlist")
+        print(f"{'documento':<15} {'tamaño (KiB)':>13} {'carga (ms)':>11}")
+        for name, load in loaders.items():
+            size = documents.get(name, documents["binary"])
+            print(
+                f"{name:<15} {len(size) / 1024:13.1f} {_best(load, args.repeat):11.2f}"
+            )
+
+        local = _load_json(documents["json.snapshot"], "flags")
+        binary = BinarySnapshot.open(path)
+        sample = [(flags[i].name, f"user-{i}") for i in range(0, len(flags), 97)] or [
+            ("missing", "user-0")
+        ]
+        rounds = 20
+
+        print("Evaluación (ns por llamada):")
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for flag_name, user_id in sample:
+                local[flag_name].evaluate(user_id)
+        local_ns = (time.perf_counter() - start) / (rounds * len(sample)) * 1e9
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for flag_name, user_id in sample:
+                binary.evaluate(flag_name, user_id)
+        binary_ns = (time.perf_counter() - start) / (rounds * len(sample)) * 1e9
+        print(f"  {'LocalFlag':<15} {local_ns:9.1f}")
+        print(f"  {'BinarySnapshot':<15} {binary_ns:9.1f}")
+        binary.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark del arranque del servicio: import, lifespan y primera respuesta.
+
+Cada medición corre en un intérprete nuevo, como un pod recién creado:
+
+- ``import``: tiempo de ``import app.main`` (dependencias incluidas).
+- ``lifespan``: trabajo de arranque del hook ``lifespan`` (``init_db`` y
+  precarga del caché de flags).
+- ``listo``: desde lanzar ``uvicorn`` hasta el primer ``GET /health``
+  correcto, lo que vería el ``readinessProbe`` de Kubernetes.
+- ``1ª eval`` y ``2ª eval``: latencia de las dos primeras solicitudes a
+  ``GET /api/flags/evaluate`` sobre el servidor ya listo.
+
+Se repite con las variantes de ``DB_INIT_ON_STARTUP`` y ``FLAG_CACHE_WARMUP``
+y se compara el arranque contra el ``initialDelaySeconds`` de los manifiestos.
+
+Uso:
+    python -m benchmarks.bench_startup [--flags 10000] [--runs 3]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.flag import Flag
+
+# initialDelaySeconds del readinessProbe en k8s/deployment-*.yml
+READINESS_DELAY_SECONDS = 5.0
+
+VARIANTS = (
+    ("por defecto", {}),
+    ("sin init_db", {"DB_INIT_ON_STARTUP": "false"}),
+    ("sin precarga", {"FLAG_CACHE_WARMUP": "false"}),
+)
+
+_BREAKDOWN = """
+import asyncio, json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import": imported - start, "lifespan": ready - imported}))
+"""
+
+
+def _seed(url: str, flag_count: int) -> None:
+    """Crea el esquema e inserta ``flag_count`` flags en lote."""
+    db_engine = create_db_engine(url)
+    Base.metadata.create_all(bind=db_engine)
+    with sessionmaker(bind=db_engine)() as session:
+        session.execute(
+            insert(Flag),
+            [
+                {
+                    "name": f"flag-{i:06d}",
+                    "rollout_percentage": i % 101,
+                    "hash_algorithm": "sha256",
+                }
+                for i in range(flag_count)
+            ],
+        )
+        session.commit()
+    db_engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str) -> float:
+    """Hace un GET y devuelve su latencia en segundos."""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def measure_breakdown(env: dict) -> dict:
+    """Mide import y lifespan en un intérprete nuevo."""
+    output = subprocess.run(
+        [sys.executable, "-c", _BREAKDOWN],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_server(env: dict, timeout: float = 60.0) -> dict:
+    """Lanza uvicorn y mide el tiempo hasta estar listo y las primeras respuestas."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn terminó antes de estar listo")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("uvicorn no respondió a tiempo")
+            try:
+                _get(f"{base}/health")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        ready = time.perf_counter() - start
+
+        evaluate = f"{base}/api/flags/evaluate?flag=flag-000050&user_id=user-1"
+        return {
+            "ready": ready,
+            "first_evaluate": _get(evaluate),
+            "second_evaluate": _get(evaluate),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flags", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(url, args.flags)
+        print(f"{args.flags} flags, mediana de {args.runs} ejecuciones")
+
+        for label, overrides in VARIANTS:
+            env = {**os.environ, "DATABASE_URL": url, **overrides}
+            breakdowns = [measure_breakdown(env) for _ in range(args.runs)]
+            servers = [measure_server(env) for _ in range(args.runs)]
+
+            def median(rows, key):
+                return statistics.median(row[key] for row in rows) * 1000
+
+            ready = median(servers, "ready")
+            status = "OK" if ready < READINESS_DELAY_SECONDS * 1000 else "LENTO"
+            print(
+                f"{label:<13} import={median(breakdowns, 'import'):7.1f}ms "
+                f"lifespan={median(breakdowns, 'lifespan'):7.1f}ms "
+                f"listo={ready:7.1f}ms "
+                f"1ª eval={median(servers, 'first_evaluate'):7.1f}ms "
+                f"2ª eval={median(servers, 'second_evaluate'):5.1f}ms "
+                f"[{status} < {READINESS_DELAY_SECONDS:.0f}s]"
+            )
+
+
+if __name__ == "__main__":
+    main()
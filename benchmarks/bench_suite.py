@@ -0,0 +1,460 @@
+"""
+Suite de benchmarks del camino de evaluación con resultados en JSON.
+
+Cubre:
+- Microbenchmarks de ``EvaluationService.evaluate_flag`` (implementación de
+  referencia) y ``CompiledFlag.evaluate`` (la que usan los endpoints).
+- Tamaños de la lista de permitidos de 0 a 100k: evaluación y compilación.
+- Throughput de ``GET /api/flags/evaluate`` contra la aplicación ASGI en
+  proceso (sin red), con latencias p50/p99.
+- Escalado del listado y del alta con 10, 1k y 100k flags.
+
+Cada ejecución escribe un JSON con los metadatos del entorno y una entrada
+por medición (``benchmark``, ``params``, ``value``, ``unit``). Con
+``--baseline`` se compara contra una ejecución anterior.
+
+Uso:
+    python -m benchmarks.bench_suite --output resultados.json
+    python -m benchmarks.bench_suite --quick --baseline resultados.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import UTC, datetime
+from functools import partial
+
+# La aplicación crea su engine al importarse: apuntarla a un archivo temporal
+# antes de cualquier import de ``app`` para no tocar ./featureflags.db
+_WORKDIR = tempfile.mkdtemp(prefix="featureflags-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/app.db")
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base, create_db_engine, get_db  # noqa: E402
+from app.models.flag import Flag  # noqa: E402
+from app.models.flag_allowed_user import FlagAllowedUser  # noqa: E402
+from app.services import (  # noqa: E402
+    CompiledFlag,
+    DecisionCache,
+    EvaluationService,
+    flag_cache,
+)
+
+FLAG_NAME = "bench-flag"
+SCALES = (10, 1_000, 100_000)
+ALLOWLIST_SIZES = (0, 100, 10_000, 100_000)
+QUICK_SCALES = (10, 1_000)
+QUICK_ALLOWLIST_SIZES = (0, 1_000)
+
+
+def _ns_per_call(func, repeat: int = 3) -> float:
+    """Mide ns por llamada con ``timeit`` (mejor de ``repeat`` rondas)."""
+    timer = timeit.Timer(func)
+    # autorange elige cuántas llamadas hacen falta para al menos 0.2 s
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def _result(benchmark: str, value: float, unit: str, **params) -> dict:
+    """Construye una entrada del archivo de resultados."""
+    return {"benchmark": benchmark, "params": params, "value": value, "unit": unit}
+
+
+def _model_flag(rollout: int, allowed_users: list[str]) -> Flag:
+    """Flag transitoria (sin sesión) para los microbenchmarks."""
+    return Flag(
+        name=FLAG_NAME,
+        enabled=True,
+        rollout_percentage=rollout,
+        allowed_users=allowed_users,
+        hash_algorithm="sha256",
+    )
+
+
+def bench_evaluate() -> list[dict]:
+    """Microbenchmarks de evaluación por regla aplicada."""
+    results = []
+    cases = {
+        "rollout_0": (0, [], "user-123"),
+        "rollout_50": (50, [], "user-123"),
+        "rollout_100": (100, [], "user-123"),
+        "allowlist_hit": (0, ["user-123"], "user-123"),
+    }
+    for case, (rollout, allowed, user_id) in cases.items():
+        flag = _model_flag(rollout, allowed)
+        compiled = EvaluationService.compile_flag(flag)
+        results.append(
+            _result(
+                "evaluate.reference",
+                _ns_per_call(partial(EvaluationService.evaluate_flag, flag, user_id)),
+                "ns/op",
+                case=case,
+            )
+        )
+        results.append(
+            _result(
+                "evaluate.compiled",
+                _ns_per_call(partial(compiled.evaluate, user_id)),
+                "ns/op",
+                case=case,
+            )
+        )
+        # Acierto del caché de decisiones delante del evaluador compilado (el
+        # endpoint solo lo consulta para flags con rollout parcial)
+        cache = DecisionCache(max_size=1024)
+        cache.evaluate(flag.name, 1, user_id, compiled.evaluate)
+        results.append(
+            _result(
+                "evaluate.decision_cache_hit",
+                _ns_per_call(
+                    partial(cache.evaluate, flag.name, 1, user_id, compiled.evaluate)
+                ),
+                "ns/op",
+                case=case,
+            )
+        )
+    return results
+
+
+def bench_allowlist(sizes: tuple[int, ...]) -> list[dict]:
+    """Evaluación y compilación según el tamaño de la lista de permitidos."""
+    results = []
+    for size in sizes:
+        allowed = [f"user-{i}" for i in range(size)]
+        flag = _model_flag(50, allowed)
+        compiled = EvaluationService.compile_flag(flag)
+        # Usuario fuera de la lista: recorre la lista completa en la referencia
+        miss = "outsider"
+        results.append(
+            _result(
+                "allowlist.reference_miss",
+                _ns_per_call(partial(EvaluationService.evaluate_flag, flag, miss)),
+                "ns/op",
+                size=size,
+            )
+        )
+        results.append(
+            _result(
+                "allowlist.compiled_miss",
+                _ns_per_call(partial(compiled.evaluate, miss)),
+                "ns/op",
+                size=size,
+            )
+        )
+        results.append(
+            _result(
+                "allowlist.compile",
+                _ns_per_call(
+                    partial(CompiledFlag, FLAG_NAME, True, 50, allowed, "sha256"),
+                    repeat=3,
+                ),
+                "ns/op",
+                size=size,
+            )
+        )
+    return results
+
+
+def _seed_database(url: str, flag_count: int, allowlist_size: int = 0) -> None:
+    """Crea el esquema e inserta ``flag_count`` flags en lote."""
+    db_engine = create_db_engine(url)
+    Base.metadata.create_all(bind=db_engine)
+    with sessionmaker(bind=db_engine)() as session:
+        session.execute(
+            insert(Flag),
+            [
+                {
+                    "name": f"flag-{i:06d}",
+                    "description": "Flag de benchmark",
+                    "rollout_percentage": i % 101,
+                    "hash_algorithm": "sha256",
+                }
+                for i in range(flag_count)
+            ],
+        )
+        if allowlist_size:
+            session.execute(
+                insert(FlagAllowedUser),
+                [{"flag_id": 1, "user_id": f"user-{i}"} for i in range(allowlist_size)],
+            )
+        session.commit()
+    db_engine.dispose()
+
+
+def _use_database(app, url: str):
+    """Apunta la dependencia ``get_db`` de la aplicación a otra base de datos."""
+    db_engine = create_db_engine(url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # El snapshot de evaluación corresponde a la base anterior
+    flag_cache.clear()
+    return db_engine
+
+
+async def _drive(app, requests: list[tuple[str, str, dict]], concurrency: int):
+    """Envía solicitudes con ``concurrency`` clientes y devuelve las latencias."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    queue = list(reversed(requests))
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker():
+            while queue:
+                method, url, kwargs = queue.pop()
+                start = time.perf_counter()
+                resp = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code >= 400:
+                    raise RuntimeError(f"{method} {url} -> {resp.status_code}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_http_evaluate(
+    app, requests: int, concurrency: int, allowlist_sizes: tuple[int, ...]
+) -> list[dict]:
+    """Throughput de GET /api/flags/evaluate en proceso, por tamaño de allowlist."""
+    results = []
+    for size in allowlist_sizes:
+        url = f"sqlite:///{_WORKDIR}/evaluate-{size}.db"
+        _seed_database(url, 1, allowlist_size=size)
+        db_engine = _use_database(app, url)
+        calls = [
+            (
+                "GET",
+                "/api/flags/evaluate",
+                {"params": {"flag": "flag-000000", "user_id": f"u{i}"}},
+            )
+            for i in range(requests)
+        ]
+        # Calentar el snapshot antes de medir
+        asyncio.run(_drive(app, calls[:10], 1))
+        elapsed, latencies = asyncio.run(_drive(app, calls, concurrency))
+        params = {"allowlist_size": size, "concurrency": concurrency}
+        results.append(
+            _result("http.evaluate.throughput", requests / elapsed, "req/s", **params)
+        )
+        results.append(
+            _result(
+                "http.evaluate.p50", _percentile(latencies, 50) * 1e3, "ms", **params
+            )
+        )
+        results.append(
+            _result(
+                "http.evaluate.p99", _percentile(latencies, 99) * 1e3, "ms", **params
+            )
+        )
+        db_engine.dispose()
+    return results
+
+
+def bench_scaling(app, scales: tuple[int, ...], creates: int) -> list[dict]:
+    """Listado completo, paginado, NDJSON y alta según el número de flags."""
+    results = []
+    for flag_count in scales:
+        url = f"sqlite:///{_WORKDIR}/scale-{flag_count}.db"
+        _seed_database(url, flag_count)
+        db_engine = _use_database(app, url)
+
+        listings = {
+            "list.full": {},
+            "list.page_100": {"limit": 100, "cursor": f"flag-{flag_count // 2:06d}"},
+            "list.ndjson": {"format": "ndjson"},
+        }
+        for benchmark, params in listings.items():
+            rounds = 3 if flag_count >= 100_000 else 10
+            calls = [("GET", "/api/flags", {"params": params})] * rounds
+            _, latencies = asyncio.run(_drive(app, calls, 1))
+            results.append(
+                _result(
+                    benchmark,
+                    statistics.median(latencies) * 1e3,
+                    "ms",
+                    flags=flag_count,
+                )
+            )
+
+        # Alta con el snapshot de evaluación ya cargado (estado estable)
+        asyncio.run(
+            _drive(
+                app,
+                [
+                    (
+                        "GET",
+                        "/api/flags/evaluate",
+                        {"params": {"flag": "flag-000000", "user_id": "u"}},
+                    )
+                ],
+                1,
+            )
+        )
+        calls = [
+            (
+                "POST",
+                "/api/flags",
+                {"json": {"name": f"created-{i}", "rollout_percentage": 10}},
+            )
+            for i in range(creates)
+        ]
+        _, latencies = asyncio.run(_drive(app, calls, 1))
+        results.append(
+            _result(
+                "create", statistics.median(latencies) * 1e3, "ms", flags=flag_count
+            )
+        )
+        db_engine.dispose()
+    return results
+
+
+def _metadata(args: argparse.Namespace) -> dict:
+    """Describe el entorno de la ejecución para poder comparar resultados."""
+    import sqlalchemy
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "quick": args.quick,
+    }
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    """
+    Compara dos ejecuciones y describe la variación de cada medición.
+
+    Args:
+        baseline: Resultados anteriores
+        current: Resultados actuales
+
+    Returns:
+        list[str]: Una línea por medición presente en ambas ejecuciones
+    """
+
+    def key(entry):
+        return entry["benchmark"], json.dumps(entry["params"], sort_keys=True)
+
+    previous = {key(entry): entry for entry in baseline["results"]}
+    lines = []
+    for entry in current["results"]:
+        old = previous.get(key(entry))
+        if old is None or not old["value"]:
+            continue
+        change = (entry["value"] - old["value"]) / old["value"] * 100
+        lines.append(
+            f"{entry['benchmark']:<28} {key(entry)[1]:<48} "
+            f"{old['value']:12.2f} -> {entry['value']:12.2f} {entry['unit']:<6} "
+            f"({change:+.1f}%)"
+        )
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior")
+    parser.add_argument(
+        "--quick", action="store_true", help="Escalas reducidas (10 y 1k) para CI"
+    )
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--creates", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.main import app
+
+    scales = QUICK_SCALES if args.quick else SCALES
+    allowlist_sizes = QUICK_ALLOWLIST_SIZES if args.quick else ALLOWLIST_SIZES
+    requests = min(args.requests, 1000) if args.quick else args.requests
+
+    sections = (
+        ("Microbenchmarks de evaluación", bench_evaluate),
+        ("Tamaño de la lista de permitidos", lambda: bench_allowlist(allowlist_sizes)),
+        (
+            "GET /api/flags/evaluate en proceso",
+            lambda: bench_http_evaluate(
+                app, requests, args.concurrency, allowlist_sizes
+            ),
+        ),
+        (
+            "Escalado de listado y alta",
+            lambda: bench_scaling(app, scales, args.creates),
+        ),
+    )
+
+    results = []
+    try:
+        for title, run in sections:
+            print(title)
+            for entry in run():
+                results.append(entry)
+                params = " ".join(
+                    f"{name}={value}" for name, value in entry["params"].items()
+                )
+                print(
+                    f"  {entry['benchmark']:<28} {params:<36} "
+                    f"{entry['value']:12.2f} {entry['unit']}"
+                )
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+    report = {"metadata": _metadata(args), "results": results}
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Resultados escritos en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        print(f"Comparación con {args.baseline}:")
+        for line in compare(baseline, report):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
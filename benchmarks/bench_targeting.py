@@ -0,0 +1,130 @@
+"""
+Evaluación de reglas de segmentación: interpretadas frente a compiladas.
+
+Genera flags con 50, 100 y 200 reglas sobre atributos como ``country``,
+``plan`` o ``app_version`` (todas cumplibles por el mismo usuario) y mide:
+
+- ``match_rules``: las reglas una a una, como se evaluarían sin compilar.
+- ``compile_rules``: el predicado compilado una vez por versión de la flag.
+- ``CompiledFlag.evaluate`` con atributos y rollout del 100%.
+- El tiempo de compilar las reglas.
+
+Se evalúa un usuario que cumple todas las reglas (el peor caso para la
+versión interpretada, que las recorre todas) y uno que no cumple el atributo
+de la última regla.
+
+Uso:
+    python -m benchmarks.bench_targeting [--rules N ...] [--iterations N]
+"""
+
+import argparse
+import random
+import timeit
+
+from app.services.evaluation_service import CompiledFlag
+from app.services.targeting import FlagRule, compile_rules, match_rules
+
+SET_ATTRIBUTES = ("country", "plan", "language", "device", "region", "segment")
+VERSION_ATTRIBUTES = ("app_version", "os_version")
+POOL_SIZE = 40
+
+# Usuario que cumple todas las reglas generadas
+MATCHING = {
+    **{attribute: f"{attribute}-0" for attribute in SET_ATTRIBUTES},
+    "app_version": "3.10.2",
+    "os_version": "17.4",
+}
+
+
+def build_rules(count: int, seed: int = 42) -> list[FlagRule]:
+    """Genera ``count`` reglas que ``MATCHING`` cumple."""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        if i % 4 == 3:
+            attribute = rng.choice(VERSION_ATTRIBUTES)
+            major = int(MATCHING[attribute].split(".")[0])
+            if rng.random() < 0.5:
+                rules.append(
+                    FlagRule(attribute, rng.choice(("gt", "gte")), f"{major - 1}.{i}")
+                )
+            else:
+                rules.append(
+                    FlagRule(attribute, rng.choice(("lt", "lte")), f"{major + 1}.{i}")
+                )
+            continue
+
+        attribute = rng.choice(SET_ATTRIBUTES)
+        pool = [f"{attribute}-{n}" for n in range(1, POOL_SIZE)]
+        operator = rng.choice(("eq", "neq", "in", "not_in"))
+        if operator == "eq":
+            rules.append(FlagRule(attribute, operator, f"{attribute}-0"))
+        elif operator == "neq":
+            rules.append(FlagRule(attribute, operator, rng.choice(pool)))
+        elif operator == "in":
+            values = (f"{attribute}-0", *rng.sample(pool, 10))
+            rules.append(FlagRule(attribute, operator, values))
+        else:
+            rules.append(FlagRule(attribute, operator, tuple(rng.sample(pool, 10))))
+    return rules
+
+
+def _failing_value(rule: FlagRule) -> str:
+    """Valor del atributo de ``rule`` que no la cumple."""
+    if rule.operator in ("eq", "in"):
+        return f"{rule.attribute}-{POOL_SIZE}"
+    if rule.operator == "neq":
+        return rule.value
+    if rule.operator == "not_in":
+        return rule.value[0]
+    return "0" if rule.operator in ("gt", "gte") else "99"
+
+
+def _ns_per_call(func, iterations: int) -> float:
+    """Mejor tiempo (ns) por llamada de ``func``."""
+    elapsed = min(timeit.repeat(func, number=iterations, repeat=5))
+    return elapsed / iterations * 1e9
+
+
+def bench_rules(count: int, iterations: int) -> dict[str, float]:
+    """Mide las variantes de evaluación para una flag con ``count`` reglas."""
+    rules = build_rules(count)
+    predicate = compile_rules(rules)
+    flag = CompiledFlag("bench-targeting", True, 100, [], rules=rules)
+    missing = {**MATCHING, rules[-1].attribute: _failing_value(rules[-1])}
+    assert match_rules(rules, MATCHING) and predicate(MATCHING)
+    assert not match_rules(rules, missing) and not predicate(missing)
+
+    return {
+        "interpretadas (cumple)": _ns_per_call(
+            lambda: match_rules(rules, MATCHING), iterations
+        ),
+        "interpretadas (falla)": _ns_per_call(
+            lambda: match_rules(rules, missing), iterations
+        ),
+        "compiladas (cumple)": _ns_per_call(lambda: predicate(MATCHING), iterations),
+        "compiladas (falla)": _ns_per_call(lambda: predicate(missing), iterations),
+        "CompiledFlag.evaluate": _ns_per_call(
+            lambda: flag.evaluate("user-123", MATCHING), iterations
+        ),
+        "compilación": _ns_per_call(lambda: compile_rules(rules), 200),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for count in args.rules:
+        print(f"{count} reglas:")
+        for name, ns in bench_rules(count, args.iterations).items():
+            if ns >= 10_000:
+                print(f"  {name:<24} {ns / 1000:10.1f} µs")
+            else:
+                print(f"  {name:<24} {ns:10.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Cliente de feature flags con evaluación local.
+
+Ejemplo::
+
+    from featureflags_client import FeatureFlagsClient
+
+    with FeatureFlagsClient("http://localhost:8000") as flags:
+        if flags.is_enabled("new-checkout", user_id):
+            ...
+"""
+
+from featureflags_client.binary import BinarySnapshot, BinarySnapshotError
+from featureflags_client.client import FeatureFlagsClient, SnapshotError
+from featureflags_client.evaluation import FLAG_NOT_FOUND, LocalFlag
+
+__all__ = [
+    "FLAG_NOT_FOUND",
+    "BinarySnapshot",
+    "BinarySnapshotError",
+    "FeatureFlagsClient",
+    "LocalFlag",
+    "SnapshotError",
+]
@@ -0,0 +1,394 @@
+"""
+Lector del snapshot binario (``FFSN``) de ``/api/flags/snapshot?format=binary``.
+
+El formato está documentado en ``app.services.flag_snapshot``. El lector no
+decodifica el documento: guarda el buffer (``bytes`` o un ``mmap`` del
+archivo) y resuelve cada evaluación con búsquedas binarias sobre la tabla de
+strings ordenada, los registros de flags, las allowlists y los límites de
+las variantes. Las reglas de segmentación se compilan al evaluar la flag por
+primera vez. Cargar un snapshot
+cuesta lo mismo con diez flags que con cien mil.
+"""
+
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from typing import Mapping, Optional, Sequence, Union
+
+from featureflags_client.evaluation import (
+    DEFAULT_DENY,
+    FLAG_DISABLED,
+    HASH_UNAVAILABLE,
+    IN_ROLLOUT,
+    NOT_IN_ROLLOUT,
+    RULE_NOT_MATCHED,
+    USER_IN_ALLOWLIST,
+    UserHasher,
+    make_user_hasher,
+    variant_bucket,
+)
+from featureflags_client.targeting import RulesPredicate, compile_rules
+
+BINARY_SNAPSHOT_MAGIC = b"FFSN"
+SUPPORTED_BINARY_VERSIONS = (1, 2, 3)
+FLAG_ZLIB = 0x1
+
+_HEADER = struct.Struct("<4sHHI")
+_COUNTS = struct.Struct("<IIII")
+_RECORD = struct.Struct("<IIIIIBBxx")
+# La versión 2 agrega n_variants a los contadores y el tramo de variantes al registro
+_COUNTS_V2 = struct.Struct("<IIIII")
+_RECORD_V2 = struct.Struct("<IIIIIBBxxII")
+# La versión 3 agrega al registro el índice del string con las reglas
+_RECORD_V3 = struct.Struct("<IIIIIBBxxIII")
+NO_RULES = 0xFFFFFFFF
+_U32 = struct.Struct("<I")
+# Límite de nombres memorizados, para acotar la memoria ante nombres arbitrarios
+_MAX_CACHED_POSITIONS = 4096
+
+
+class BinarySnapshotError(ValueError):
+    """Excepción lanzada cuando un snapshot binario no es válido."""
+
+
+class BinarySnapshot:
+    """
+    Snapshot binario de solo lectura, evaluable sin objetos por flag.
+
+    Se construye con ``from_bytes`` (respuesta HTTP) o ``open`` (archivo
+    mapeado en memoria). Los únicos objetos que se crean por flag son las
+    funciones hash, al evaluar la flag por primera vez.
+    """
+
+    def __init__(self, raw: Union[bytes, mmap.mmap], base: int = 0, version: int = 1):
+        self._raw = raw
+        self._mmap = raw if isinstance(raw, mmap.mmap) else None
+        self._version = version
+        self._hashers: dict[int, Optional[UserHasher]] = {}
+        # Predicado de las reglas de cada registro ya evaluado
+        self._rules: dict[int, Optional[RulesPredicate]] = {}
+        # Posición del registro de cada flag ya consultada
+        self._positions: dict[str, int] = {}
+
+        if version >= 3:
+            counts_struct, record = _COUNTS_V2, _RECORD_V3
+        elif version == 2:
+            counts_struct, record = _COUNTS_V2, _RECORD_V2
+        else:
+            counts_struct, record = _COUNTS, _RECORD
+        if len(raw) < base + counts_struct.size:
+            raise BinarySnapshotError("Snapshot binario truncado")
+        n_flags, n_strings, n_users, etag_index, *rest = counts_struct.unpack_from(
+            raw, base
+        )
+        n_variants = rest[0] if rest else 0
+        offsets_pos = base + counts_struct.size
+        records_pos = offsets_pos + _U32.size * (n_strings + 1)
+        users_pos = records_pos + record.size * n_flags
+        variants_pos = users_pos + _U32.size * n_users
+        data_pos = variants_pos + 2 * _U32.size * n_variants
+        if len(raw) < data_pos or etag_index >= n_strings:
+            raise BinarySnapshotError("Snapshot binario truncado")
+        data_size = _U32.unpack_from(raw, records_pos - _U32.size)[0]
+        if data_pos + data_size > len(raw):
+            raise BinarySnapshotError("Snapshot binario truncado")
+
+        view = memoryview(raw)
+        self._n_flags = n_flags
+        self._offsets = _u32_array(view[offsets_pos:records_pos])
+        # Registros vistos como u32: el nombre de la flag i está en [i * stride]
+        self._records = _u32_array(view[records_pos:users_pos])
+        self._users = _u32_array(view[users_pos:variants_pos])
+        # Pares (índice del nombre, límite acumulado) de las variantes
+        self._variants = _u32_array(view[variants_pos:data_pos])
+        view.release()
+        self._base = base
+        self._record_size = record.size
+        self._record_stride = record.size // _U32.size
+        self._records_pos = records_pos
+        self._data_pos = data_pos
+        self._etag = self._string(etag_index).decode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BinarySnapshot":
+        """
+        Carga un snapshot binario recibido como bytes (comprimido o no).
+
+        Raises:
+            BinarySnapshotError: Si la cabecera o el cuerpo no son válidos
+        """
+        version, options, size = _read_header(data)
+        if options & FLAG_ZLIB:
+            try:
+                body = zlib.decompress(memoryview(data)[_HEADER.size :])
+            except zlib.error as exc:
+                raise BinarySnapshotError(f"Cuerpo zlib inválido: {exc}") from exc
+            if len(body) != size:
+                raise BinarySnapshotError(
+                    "El tamaño del cuerpo no coincide con la cabecera"
+                )
+            return cls(body, version=version)
+        if len(data) - _HEADER.size != size:
+            raise BinarySnapshotError(
+                "El tamaño del cuerpo no coincide con la cabecera"
+            )
+        return cls(bytes(data), _HEADER.size, version)
+
+    @classmethod
+    def open(cls, path: str) -> "BinarySnapshot":
+        """
+        Mapea en memoria un snapshot binario sin comprimir guardado en disco.
+
+        Las páginas se cargan bajo demanda y el sistema operativo las comparte
+        entre los procesos que mapean el mismo archivo. Un archivo comprimido
+        se descomprime en memoria.
+
+        Raises:
+            BinarySnapshotError: Si el archivo no es un snapshot válido
+        """
+        with open(path, "rb") as handle:
+            source = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            version, options, size = _read_header(source)
+            if options & FLAG_ZLIB:
+                data = source[:]
+                source.close()
+                return cls.from_bytes(data)
+            if len(source) - _HEADER.size != size:
+                raise BinarySnapshotError(
+                    "El tamaño del cuerpo no coincide con la cabecera"
+                )
+            return cls(source, _HEADER.size, version)
+        except BinarySnapshotError:
+            source.close()
+            raise
+
+    def close(self) -> None:
+        """Libera el mapeo del archivo, si lo hay."""
+        if self._mmap is not None:
+            for values in (self._offsets, self._records, self._users, self._variants):
+                if isinstance(values, memoryview):
+                    values.release()
+            self._mmap.close()
+            self._mmap = None
+
+    @property
+    def etag(self) -> str:
+        """ETag del conjunto de flags del snapshot."""
+        return self._etag
+
+    def __len__(self) -> int:
+        return self._n_flags
+
+    def __contains__(self, flag_name: str) -> bool:
+        return self._find_flag(flag_name.lower()) >= 0
+
+    def to_bytes(self) -> bytes:
+        """Documento completo sin comprimir, apto para ``open``."""
+        body = self._raw[self._base :]
+        header = _HEADER.pack(BINARY_SNAPSHOT_MAGIC, self._version, 0, len(body))
+        return header + body
+
+    def has_rules(self, flag_name: str) -> bool:
+        """Indica si la flag tiene reglas de segmentación por atributos."""
+        position = self._find_flag(flag_name.lower())
+        return position >= 0 and self._rules_predicate(position) is not None
+
+    def evaluate(
+        self,
+        flag_name: str,
+        user_id: str,
+        attributes: Optional[Mapping[str, str]] = None,
+    ) -> Optional[tuple[bool, str]]:
+        """
+        Evalúa una flag con las mismas reglas que ``LocalFlag.evaluate``.
+
+        Args:
+            flag_name: Nombre de la flag
+            user_id: ID del usuario
+            attributes: Atributos del usuario como strings, para las reglas
+
+        Returns:
+            Optional[tuple[bool, str]]: (habilitado, razón), o None si la
+                flag no está en el snapshot
+        """
+        position = self._find_flag(flag_name.lower())
+        if position < 0:
+            return None
+        name_index, algorithm_index, _, start, count, enabled, rollout = (
+            _RECORD.unpack_from(
+                self._raw, self._records_pos + self._record_size * position
+            )
+        )
+
+        if not enabled:
+            return FLAG_DISABLED
+
+        if count and self._in_allowlist(start, count, user_id):
+            return USER_IN_ALLOWLIST
+
+        if self._version >= 3:
+            rules = self._rules_predicate(position)
+            if rules is not None and not rules(attributes or {}):
+                return RULE_NOT_MATCHED
+
+        if rollout > 0:
+            if rollout >= 100:
+                return IN_ROLLOUT
+            hash_user = self._hasher(name_index, algorithm_index)
+            if hash_user is None:
+                return HASH_UNAVAILABLE
+            if hash_user(user_id) % 100 < rollout:
+                return IN_ROLLOUT
+            return NOT_IN_ROLLOUT
+
+        return DEFAULT_DENY
+
+    def variant(self, flag_name: str, user_id: str) -> Optional[str]:
+        """
+        Asigna la variante de un usuario con las reglas de ``LocalFlag.variant``.
+
+        La variante se elige con una búsqueda binaria sobre los límites
+        acumulados de la flag; solo tiene sentido si la flag está habilitada
+        para el usuario.
+
+        Args:
+            flag_name: Nombre de la flag
+            user_id: ID del usuario
+
+        Returns:
+            Optional[str]: Nombre de la variante, o None si la flag no está en
+                el snapshot o no tiene variantes
+        """
+        if self._version < 2:
+            return None
+        position = self._find_flag(flag_name.lower())
+        if position < 0:
+            return None
+        record = position * self._record_stride
+        records = self._records
+        start, count = records[record + 6], records[record + 7]
+        if not count:
+            return None
+
+        hash_user = self._hasher(records[record], records[record + 1])
+        if hash_user is None:
+            return None
+        bucket = variant_bucket(hash_user(user_id))
+        # Primer límite mayor que el bucket (bisect_right sobre pares u32)
+        variants = self._variants
+        low, high = start, start + count
+        while low < high:
+            middle = (low + high) // 2
+            if variants[2 * middle + 1] <= bucket:
+                low = middle + 1
+            else:
+                high = middle
+        return self._string(variants[2 * low]).decode()
+
+    def _rules_predicate(self, position: int) -> Optional[RulesPredicate]:
+        """Predicado de las reglas del registro, compilado al usarlo por primera vez."""
+        try:
+            return self._rules[position]
+        except KeyError:
+            pass
+        predicate = None
+        if self._version >= 3:
+            index = self._records[position * self._record_stride + 8]
+            if index != NO_RULES:
+                predicate = compile_rules(json.loads(self._string(index)))
+        self._rules[position] = predicate
+        return predicate
+
+    def _hasher(self, name_index: int, algorithm_index: int) -> Optional[UserHasher]:
+        """
+        Función hash de una flag, construida al usarla por primera vez.
+
+        Devuelve None si el algoritmo no está disponible en este proceso.
+        """
+        try:
+            return self._hashers[name_index]
+        except KeyError:
+            pass
+        try:
+            hash_user = make_user_hasher(
+                self._string(algorithm_index).decode(),
+                self._string(name_index).decode(),
+            )
+        except ValueError:
+            hash_user = None
+        self._hashers[name_index] = hash_user
+        return hash_user
+
+    def _string(self, index: int) -> bytes:
+        offsets, base = self._offsets, self._data_pos
+        return self._raw[base + offsets[index] : base + offsets[index + 1]]
+
+    def _find_flag(self, flag_name: str) -> int:
+        """Posición del registro de una flag, o -1 si no está."""
+        position = self._positions.get(flag_name)
+        if position is not None:
+            return position
+
+        # Los registros están ordenados por nombre: se compara con cada string
+        raw = flag_name.encode()
+        records, stride = self._records, self._record_stride
+        position = -1
+        low, high = 0, self._n_flags
+        while low < high:
+            middle = (low + high) // 2
+            value = self._string(records[middle * stride])
+            if value < raw:
+                low = middle + 1
+            elif value > raw:
+                high = middle
+            else:
+                position = middle
+                break
+        if len(self._positions) < _MAX_CACHED_POSITIONS:
+            self._positions[flag_name] = position
+        return position
+
+    def _in_allowlist(self, start: int, count: int, user_id: str) -> bool:
+        """Búsqueda binaria del usuario en el tramo ordenado de su allowlist."""
+        target = user_id.encode()
+        users, offsets = self._users, self._offsets
+        raw, base = self._raw, self._data_pos
+        low, high = start, start + count
+        while low < high:
+            middle = (low + high) // 2
+            index = users[middle]
+            value = raw[base + offsets[index] : base + offsets[index + 1]]
+            if value < target:
+                low = middle + 1
+            elif value > target:
+                high = middle
+            else:
+                return True
+        return False
+
+
+def _u32_array(view: memoryview) -> Sequence[int]:
+    """Vista de un tramo como arreglo de u32 little-endian, sin copiarlo."""
+    if sys.byteorder == "little":
+        return view.cast("I")
+    values = array("I", view)
+    values.byteswap()
+    return values
+
+
+def _read_header(data) -> tuple[int, int, int]:
+    """Valida la cabecera y devuelve (versión, opciones, tamaño del cuerpo)."""
+    if len(data) < _HEADER.size:
+        raise BinarySnapshotError("Snapshot binario truncado")
+    magic, version, options, size = _HEADER.unpack_from(data, 0)
+    if magic != BINARY_SNAPSHOT_MAGIC:
+        raise BinarySnapshotError("No es un snapshot binario de flags")
+    if version not in SUPPORTED_BINARY_VERSIONS:
+        raise BinarySnapshotError(
+            f"Versión de snapshot binario no soportada: {version}"
+        )
+    return version, options, size
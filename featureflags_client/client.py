@@ -0,0 +1,381 @@
+"""Cliente que sincroniza el snapshot de flags y las evalúa en proceso."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from featureflags_client.binary import BinarySnapshot, BinarySnapshotError
+from featureflags_client.evaluation import FLAG_NOT_FOUND, HASH_UNAVAILABLE, LocalFlag
+from featureflags_client.targeting import normalize_attributes
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = "/api/flags/snapshot"
+
+# Versiones del formato de snapshot que este cliente entiende
+SUPPORTED_FORMAT_VERSIONS = (1,)
+
+SNAPSHOT_FORMAT_JSON = "json"
+SNAPSHOT_FORMAT_BINARY = "binary"
+
+
+class SnapshotError(Exception):
+    """Excepción lanzada cuando no se puede obtener o interpretar un snapshot."""
+
+
+class FeatureFlagsClient:
+    """
+    Cliente de feature flags con evaluación local.
+
+    Descarga ``GET /api/flags/snapshot`` y lo mantiene al día desde un hilo en
+    segundo plano con solicitudes condicionales (If-None-Match): mientras las
+    flags no cambien, cada consulta es un 304 sin cuerpo. Las evaluaciones
+    solo leen el snapshot en memoria, por lo que no hacen E/S y siguen
+    funcionando si la API deja de responder; en ese caso se conserva el
+    último snapshot válido.
+
+    Con ``cache_path`` el último snapshot se guarda en disco y se usa al
+    arrancar si la API no está disponible.
+
+    Con ``snapshot_format="binary"`` se descarga el formato binario (``FFSN``),
+    que se evalúa directamente sobre el buffer sin construir objetos por flag;
+    conviene para snapshots con muchas flags o allowlists grandes. En ese modo
+    el archivo de ``cache_path`` se guarda sin comprimir y se abre con ``mmap``.
+
+    Args:
+        base_url: URL base del servicio (p. ej. ``http://localhost:8000``)
+        refresh_interval: Segundos entre consultas de actualización
+        timeout: Segundos máximos de cada solicitud HTTP
+        cache_path: Archivo opcional donde persistir el último snapshot
+        snapshot_format: ``json`` (por defecto) o ``binary``
+        compress: Pide el snapshot binario comprimido con zlib
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        refresh_interval: float = 30.0,
+        timeout: float = 5.0,
+        cache_path: Optional[str] = None,
+        snapshot_format: str = SNAPSHOT_FORMAT_JSON,
+        compress: bool = True,
+    ):
+        if snapshot_format not in (SNAPSHOT_FORMAT_JSON, SNAPSHOT_FORMAT_BINARY):
+            raise ValueError(f"Formato de snapshot no soportado: '{snapshot_format}'")
+        self.snapshot_format = snapshot_format
+        self.snapshot_url = base_url.rstrip("/") + SNAPSHOT_PATH
+        if snapshot_format == SNAPSHOT_FORMAT_BINARY:
+            query = {
+                "format": SNAPSHOT_FORMAT_BINARY,
+                "compress": str(compress).lower(),
+            }
+            self.snapshot_url += "?" + urllib.parse.urlencode(query)
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self._flags: Mapping[str, LocalFlag] = MappingProxyType({})
+        self._binary: Optional[BinarySnapshot] = None
+        self._etag: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "FeatureFlagsClient":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag del snapshot vigente, o None si aún no hay uno."""
+        return self._etag
+
+    @property
+    def flags(self) -> Mapping[str, LocalFlag]:
+        """Flags del snapshot JSON vigente por nombre (vacío en modo binario)."""
+        return self._flags
+
+    def start(self) -> None:
+        """
+        Obtiene el snapshot inicial e inicia el refresco en segundo plano.
+
+        Si la API no responde se intenta cargar ``cache_path``; el cliente
+        arranca igualmente y reintenta en cada intervalo.
+        """
+        try:
+            self.refresh()
+        except SnapshotError as exc:
+            logger.warning("No se pudo obtener el snapshot inicial: %s", exc)
+            if self.cache_path:
+                self._load_cache_file()
+
+        if self._thread is None and self.refresh_interval > 0:
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="featureflags-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Detiene el hilo de refresco."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def refresh(self) -> bool:
+        """
+        Consulta el snapshot y lo reemplaza si cambió.
+
+        Returns:
+            bool: True si se cargó un snapshot nuevo, False si no hubo cambios
+
+        Raises:
+            SnapshotError: Si la solicitud falla o la respuesta no es válida
+        """
+        status, etag, body = self._fetch(self._etag)
+        if status == 304:
+            return False
+        if status != 200:
+            raise SnapshotError(f"Respuesta inesperada del servicio: {status}")
+
+        if self.snapshot_format == SNAPSHOT_FORMAT_BINARY:
+            snapshot = self.load_binary_snapshot(body)
+            if self.cache_path:
+                self._write_cache_file(snapshot.to_bytes())
+        else:
+            self.load_snapshot(self._decode(body), etag)
+            if self.cache_path:
+                self._write_cache_file(body)
+        return True
+
+    def load_snapshot(self, payload: dict, etag: Optional[str] = None) -> None:
+        """
+        Publica un snapshot ya decodificado.
+
+        Las flags se compilan antes de publicarse y el reemplazo es una sola
+        asignación: las evaluaciones concurrentes ven el snapshot anterior o
+        el nuevo completo.
+
+        Args:
+            payload: Documento devuelto por ``/api/flags/snapshot``
+            etag: ETag del documento; por defecto el incluido en él
+
+        Raises:
+            SnapshotError: Si el formato no es compatible
+        """
+        if payload.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+            raise SnapshotError(
+                f"Formato de snapshot no soportado: {payload.get('format_version')}"
+            )
+        try:
+            flags = {
+                entry["name"]: LocalFlag.from_dict(entry) for entry in payload["flags"]
+            }
+        except (KeyError, TypeError, ValueError) as exc:
+            raise SnapshotError(f"Snapshot inválido: {exc}") from exc
+        for flag in flags.values():
+            if flag.hash_user is None:
+                logger.warning(
+                    "La flag %s usa el algoritmo de hash %s, no disponible en este"
+                    " proceso; sus rollouts parciales y variantes devuelven el"
+                    " valor por defecto",
+                    flag.name,
+                    flag.hash_algorithm,
+                )
+        self._flags = MappingProxyType(flags)
+        self._binary = None
+        self._etag = etag or payload.get("etag")
+
+    def load_binary_snapshot(self, data: bytes) -> BinarySnapshot:
+        """
+        Publica un snapshot en formato binario.
+
+        Args:
+            data: Documento devuelto por ``/api/flags/snapshot?format=binary``
+
+        Returns:
+            BinarySnapshot: Snapshot publicado
+
+        Raises:
+            SnapshotError: Si el documento no es válido
+        """
+        try:
+            snapshot = BinarySnapshot.from_bytes(data)
+        except BinarySnapshotError as exc:
+            raise SnapshotError(f"Snapshot inválido: {exc}") from exc
+        self._publish_binary(snapshot)
+        return snapshot
+
+    def _publish_binary(self, snapshot: BinarySnapshot) -> None:
+        """Reemplaza el snapshot vigente por uno binario."""
+        self._binary = snapshot
+        self._flags = MappingProxyType({})
+        self._etag = snapshot.etag
+
+    def evaluate(
+        self,
+        flag_name: str,
+        user_id: str,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> tuple[bool, str]:
+        """
+        Evalúa una flag para un usuario sin acceder a la red.
+
+        Args:
+            flag_name: Nombre de la flag
+            user_id: ID del usuario
+            attributes: Atributos del usuario para las reglas de segmentación
+
+        Returns:
+            tuple[bool, str]: (habilitado, razón); ``(False, "flag_not_found")``
+                si la flag no está en el snapshot y
+                ``(False, "hash_algorithm_unavailable")`` si necesita un
+                algoritmo de hash que este proceso no tiene
+        """
+        result = self._evaluate(flag_name, user_id, attributes)
+        if result is None:
+            return False, FLAG_NOT_FOUND
+        return result
+
+    def is_enabled(
+        self,
+        flag_name: str,
+        user_id: str,
+        default: bool = False,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> bool:
+        """
+        Indica si la flag está habilitada para el usuario.
+
+        Args:
+            flag_name: Nombre de la flag
+            user_id: ID del usuario
+            default: Valor si la flag no está en el snapshot o no se puede
+                evaluar porque su algoritmo de hash no está disponible
+            attributes: Atributos del usuario para las reglas de segmentación
+
+        Returns:
+            bool: Resultado de la evaluación local
+        """
+        result = self._evaluate(flag_name, user_id, attributes)
+        if result is None or result == HASH_UNAVAILABLE:
+            return default
+        return result[0]
+
+    def variant(
+        self,
+        flag_name: str,
+        user_id: str,
+        default: Optional[str] = None,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Devuelve la variante asignada al usuario en una flag A/B/n.
+
+        Args:
+            flag_name: Nombre de la flag
+            user_id: ID del usuario
+            default: Valor si la flag no está en el snapshot, no tiene
+                variantes o no está habilitada para el usuario
+            attributes: Atributos del usuario para las reglas de segmentación
+
+        Returns:
+            Optional[str]: Nombre de la variante o ``default``
+        """
+        result = self._evaluate(flag_name, user_id, attributes)
+        if result is None or not result[0]:
+            return default
+        binary = self._binary
+        if binary is not None:
+            variant = binary.variant(flag_name, user_id)
+        else:
+            flag = self._flags.get(flag_name.lower())
+            variant = flag.variant(user_id) if flag is not None else None
+        return default if variant is None else variant
+
+    def _evaluate(
+        self,
+        flag_name: str,
+        user_id: str,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[tuple[bool, str]]:
+        """Evalúa contra el snapshot vigente; None si la flag no existe."""
+        attributes = normalize_attributes(attributes)
+        binary = self._binary
+        if binary is not None:
+            return binary.evaluate(flag_name, user_id, attributes)
+        flag = self._flags.get(flag_name.lower())
+        if flag is None:
+            return None
+        return flag.evaluate(user_id, attributes)
+
+    def _refresh_loop(self) -> None:
+        """Refresca el snapshot cada ``refresh_interval`` hasta ``close``."""
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except SnapshotError as exc:
+                logger.warning("Se conserva el snapshot anterior: %s", exc)
+
+    def _fetch(self, etag: Optional[str]) -> tuple[int, Optional[str], bytes]:
+        """
+        Descarga el snapshot, condicionado al ETag actual.
+
+        Returns:
+            tuple[int, Optional[str], bytes]: (estado HTTP, ETag, cuerpo)
+
+        Raises:
+            SnapshotError: Si la solicitud falla
+        """
+        request = urllib.request.Request(self.snapshot_url)
+        if self.snapshot_format == SNAPSHOT_FORMAT_JSON:
+            request.add_header("Accept", "application/json")
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers.get("ETag"), response.read()
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304:
+                return 304, etag, b""
+            raise SnapshotError(f"HTTP {exc.code} al obtener el snapshot") from exc
+        except (urllib.error.URLError, OSError) as exc:
+            raise SnapshotError(f"No se pudo contactar el servicio: {exc}") from exc
+
+    @staticmethod
+    def _decode(body: bytes) -> dict:
+        """Decodifica el cuerpo JSON de un snapshot."""
+        try:
+            return json.loads(body)
+        except ValueError as exc:
+            raise SnapshotError(f"Snapshot con JSON inválido: {exc}") from exc
+
+    def _load_cache_file(self) -> None:
+        """Carga el último snapshot guardado en disco, si existe."""
+        try:
+            if self.snapshot_format == SNAPSHOT_FORMAT_BINARY:
+                self._publish_binary(BinarySnapshot.open(self.cache_path))
+                return
+            with open(self.cache_path, "rb") as handle:
+                self.load_snapshot(self._decode(handle.read()))
+        except (OSError, SnapshotError, BinarySnapshotError) as exc:
+            logger.warning("No se pudo cargar el snapshot en disco: %s", exc)
+
+    def _write_cache_file(self, body: bytes) -> None:
+        """Guarda el snapshot en disco de forma atómica."""
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(body)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as exc:
+            logger.warning("No se pudo guardar el snapshot en disco: %s", exc)
@@ -0,0 +1,241 @@
+"""
+Evaluación local de flags, idéntica a la del servicio.
+
+Replica ``app.services.evaluation_service.CompiledFlag`` y los hashes de
+``app.services.bucketing`` sin depender del paquete ``app``: el cliente se
+distribuye por separado. ``tests/test_client_sdk.py`` verifica que ambas
+implementaciones devuelvan lo mismo; cualquier cambio en las reglas del
+servicio debe reflejarse aquí.
+"""
+
+import hashlib
+from bisect import bisect_right
+from typing import Callable, Iterable, Mapping, Optional, Sequence
+
+from featureflags_client.targeting import compile_rules
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - dependencia opcional
+    xxhash = None
+
+# Resultados posibles de una evaluación (mismos valores que el servicio)
+FLAG_DISABLED = (False, "flag_disabled")
+USER_IN_ALLOWLIST = (True, "user_in_allowlist")
+IN_ROLLOUT = (True, "rollout_percentage")
+NOT_IN_ROLLOUT = (False, "not_in_rollout_percentage")
+DEFAULT_DENY = (False, "default_deny")
+RULE_NOT_MATCHED = (False, "rule_not_matched")
+# Exclusivos del cliente: la flag no está en el snapshot, o necesita un
+# algoritmo de hash que este proceso no tiene (p. ej. xxh3_64 sin xxhash)
+FLAG_NOT_FOUND = "flag_not_found"
+HASH_UNAVAILABLE = (False, "hash_algorithm_unavailable")
+
+SHA256 = "sha256"
+BLAKE2B64 = "blake2b64"
+XXH3_64 = "xxh3_64"
+
+UserHasher = Callable[[str], int]
+
+# Buckets del reparto de variantes (mismo valor que el servicio)
+VARIANT_BUCKETS = 10_000
+
+
+def _sha256_hasher(flag_name: str) -> UserHasher:
+    suffix = f":{flag_name}".encode()
+    sha256 = hashlib.sha256
+    from_bytes = int.from_bytes
+
+    def hash_user(user_id: str) -> int:
+        return from_bytes(sha256(user_id.encode() + suffix).digest()[:8], "big")
+
+    return hash_user
+
+
+def _blake2b64_hasher(flag_name: str) -> UserHasher:
+    prefix_state = hashlib.blake2b(f"{flag_name}:".encode(), digest_size=8)
+    from_bytes = int.from_bytes
+
+    def hash_user(user_id: str) -> int:
+        state = prefix_state.copy()
+        state.update(user_id.encode())
+        return from_bytes(state.digest(), "big")
+
+    return hash_user
+
+
+def _xxh3_64_hasher(flag_name: str) -> UserHasher:
+    if xxhash is None:
+        raise ValueError(
+            "La flag usa xxh3_64; instale el paquete xxhash para evaluarla"
+        )
+    prefix = f"{flag_name}:".encode()
+    intdigest = xxhash.xxh3_64_intdigest
+
+    def hash_user(user_id: str) -> int:
+        return intdigest(prefix + user_id.encode())
+
+    return hash_user
+
+
+_HASHER_FACTORIES = {
+    SHA256: _sha256_hasher,
+    BLAKE2B64: _blake2b64_hasher,
+    XXH3_64: _xxh3_64_hasher,
+}
+
+
+def make_user_hasher(algorithm: str, flag_name: str) -> UserHasher:
+    """
+    Construye la función hash de usuarios para una flag.
+
+    Args:
+        algorithm: Algoritmo registrado en la flag
+        flag_name: Nombre de la flag
+
+    Returns:
+        UserHasher: Función que devuelve el hash de 64 bits de un user_id
+
+    Raises:
+        ValueError: Si el algoritmo no está disponible
+    """
+    try:
+        factory = _HASHER_FACTORIES[algorithm]
+    except KeyError:
+        raise ValueError(f"Algoritmo de hash no disponible: '{algorithm}'") from None
+    return factory(flag_name)
+
+
+def variant_bucket(user_hash: int) -> int:
+    """Bucket de variante (0-9999), independiente del bucket de rollout."""
+    return user_hash // 100 % VARIANT_BUCKETS
+
+
+def variant_boundaries(weights: Sequence[int]) -> tuple[int, ...]:
+    """Límites superiores acumulados de cada variante sobre ``VARIANT_BUCKETS``."""
+    total = sum(weights)
+    cumulative = 0
+    boundaries = []
+    for weight in weights:
+        cumulative += weight
+        boundaries.append(cumulative * VARIANT_BUCKETS // total)
+    return tuple(boundaries)
+
+
+class LocalFlag:
+    """
+    Flag del snapshot lista para evaluarse sin acceder a la red.
+
+    Si su algoritmo de hash no está disponible, ``hash_user`` es None: la flag
+    se sigue evaluando en las ramas que no calculan el hash (deshabilitada,
+    allowlist, reglas, rollout 0 o 100) y en las demás devuelve
+    ``HASH_UNAVAILABLE``.
+    """
+
+    __slots__ = (
+        "allowed_users",
+        "enabled",
+        "hash_algorithm",
+        "hash_user",
+        "name",
+        "rollout_percentage",
+        "rules",
+        "variant_boundaries",
+        "variant_names",
+        "version",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool,
+        rollout_percentage: int,
+        allowed_users: Iterable[str],
+        hash_algorithm: str = SHA256,
+        version: int = 1,
+        variants: Iterable[tuple[str, int]] = (),
+        rules: Optional[Iterable[dict]] = None,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.rollout_percentage = rollout_percentage
+        self.allowed_users = frozenset(allowed_users)
+        self.hash_algorithm = hash_algorithm
+        self.version = version
+        try:
+            self.hash_user = make_user_hasher(hash_algorithm, name)
+        except ValueError:
+            self.hash_user = None
+        variants = tuple(variants)
+        self.variant_names = tuple(name for name, _ in variants)
+        self.variant_boundaries = (
+            variant_boundaries([weight for _, weight in variants]) if variants else ()
+        )
+        self.rules = compile_rules(rules)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LocalFlag":
+        """Construye la flag a partir de una entrada del snapshot."""
+        return cls(
+            name=data["name"],
+            enabled=bool(data["enabled"]),
+            rollout_percentage=int(data["rollout_percentage"]),
+            allowed_users=data.get("allowed_users") or (),
+            hash_algorithm=data.get("hash_algorithm") or SHA256,
+            version=int(data.get("version", 1)),
+            variants=[
+                (variant["name"], int(variant["weight"]))
+                for variant in data.get("variants") or ()
+            ],
+            rules=data.get("rules"),
+        )
+
+    def evaluate(
+        self, user_id: str, attributes: Optional[Mapping[str, str]] = None
+    ) -> tuple[bool, str]:
+        """
+        Evalúa si un usuario debe recibir la flag.
+
+        Args:
+            user_id: ID del usuario
+            attributes: Atributos del usuario como strings, para las reglas
+
+        Returns:
+            tuple[bool, str]: (habilitado, razón)
+        """
+        if not self.enabled:
+            return FLAG_DISABLED
+
+        if user_id in self.allowed_users:
+            return USER_IN_ALLOWLIST
+
+        if self.rules is not None and not self.rules(attributes or {}):
+            return RULE_NOT_MATCHED
+
+        rollout = self.rollout_percentage
+        if rollout > 0:
+            if rollout >= 100:
+                return IN_ROLLOUT
+            if self.hash_user is None:
+                return HASH_UNAVAILABLE
+            if self.hash_user(user_id) % 100 < rollout:
+                return IN_ROLLOUT
+            return NOT_IN_ROLLOUT
+
+        return DEFAULT_DENY
+
+    def variant(self, user_id: str) -> Optional[str]:
+        """
+        Asigna la variante de un usuario (para usuarios con la flag habilitada).
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Optional[str]: Nombre de la variante, o None si la flag no tiene
+                o su algoritmo de hash no está disponible
+        """
+        if not self.variant_names or self.hash_user is None:
+            return None
+        bucket = variant_bucket(self.hash_user(user_id))
+        return self.variant_names[bisect_right(self.variant_boundaries, bucket)]
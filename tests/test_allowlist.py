@@ -0,0 +1,167 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import selectinload
+
+from app.database import Base, migrate_allowed_users
+from app.models.flag import Flag
+from app.models.flag_allowed_user import FlagAllowedUser
+from app.services.flag_cache import flag_cache
+from app.services.flag_events import flag_change_broker
+from tests.conftest import TestingSessionLocal, engine
+
+
+def test_add_remove_and_check_allowed_users(client):
+    client.post("/api/flags", json={"name": "allowlist-flag", "allowed_users": ["a"]})
+
+    resp = client.post(
+        "/api/flags/allowlist-flag/users", json={"user_ids": ["a", "b", "c"]}
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.json() == {"flag_name": "allowlist-flag", "version": 2, "changed": 2}
+
+    assert client.get("/api/flags/allowlist-flag/users/b").json()["allowed"] is True
+    evaluation = client.get("/api/flags/evaluate?flag=allowlist-flag&user_id=b").json()
+    assert evaluation["reason"] == "user_in_allowlist"
+
+    resp = client.delete("/api/flags/allowlist-flag/users/b")
+    assert resp.json() == {"flag_name": "allowlist-flag", "version": 3, "changed": 1}
+    assert client.get("/api/flags/allowlist-flag/users/b").json()["allowed"] is False
+    assert client.get("/api/flags/allowlist-flag").json()["allowed_users"] == ["a", "c"]
+
+
+def test_allowlist_changes_are_applied_and_published_as_deltas(client):
+    users = [f"user-{i}" for i in range(50)]
+    client.post("/api/flags", json={"name": "allowlist-delta", "allowed_users": users})
+    client.get("/api/flags/evaluate?flag=allowlist-delta&user_id=x")
+    cursor = flag_change_broker.version
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client.post("/api/flags/allowlist-delta/users", json={"user_ids": ["new"]})
+        client.delete("/api/flags/allowlist-delta/users/user-3")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Ni la lista ni la flag completa se cargan al confirmar el cambio
+    assert not any("flag_allowed_users.flag_id IN" in s for s in statements)
+    assert not any("flags.rollout_percentage" in s for s in statements)
+
+    with TestingSessionLocal() as db:
+        snapshot = flag_cache.get(db, "allowlist-delta")
+    expected = [u for u in users if u != "user-3"] + ["new"]
+    assert snapshot.version == 3
+    assert list(snapshot.allowed_users) == expected
+    assert snapshot.evaluator.allowed_users == frozenset(expected)
+    evaluation = client.get("/api/flags/evaluate?flag=allowlist-delta&user_id=new")
+    assert evaluation.json()["reason"] == "user_in_allowlist"
+    assert client.get("/api/flags/allowlist-delta").json()["allowed_users"] == expected
+
+    events, _ = flag_change_broker.events_since(cursor)
+    assert [(e["type"], e["allowlist"]) for e in events] == [
+        (
+            "allowlist",
+            {
+                "flag_name": "allowlist-delta",
+                "version": 2,
+                "added": ["new"],
+                "removed": [],
+            },
+        ),
+        (
+            "allowlist",
+            {
+                "flag_name": "allowlist-delta",
+                "version": 3,
+                "added": [],
+                "removed": ["user-3"],
+            },
+        ),
+    ]
+    assert all("flag" not in e for e in events)
+
+
+def test_allowlist_noop_keeps_version(client):
+    client.post("/api/flags", json={"name": "allowlist-noop", "allowed_users": ["a"]})
+
+    resp = client.post("/api/flags/allowlist-noop/users", json={"user_ids": ["a"]})
+    assert resp.json() == {"flag_name": "allowlist-noop", "version": 1, "changed": 0}
+    resp = client.delete("/api/flags/allowlist-noop/users/missing")
+    assert resp.json()["changed"] == 0
+
+
+def test_allowlist_unknown_flag_returns_404(client):
+    assert (
+        client.get("/api/flags/no-such-flag/users/a").status_code
+        == HTTPStatus.NOT_FOUND
+    )
+
+
+def test_update_replaces_allowlist_rows(client):
+    client.post(
+        "/api/flags", json={"name": "allowlist-put", "allowed_users": ["a", "b"]}
+    )
+
+    resp = client.put(
+        "/api/flags/allowlist-put", json={"allowed_users": ["b", "c", "c"]}
+    )
+    assert resp.json()["allowed_users"] == ["b", "c"]
+
+
+def test_flag_queries_load_the_allowlist_only_on_request(client):
+    users = [f"user-{i}" for i in range(20)]
+    client.post("/api/flags", json={"name": "allowlist-lazy", "allowed_users": users})
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with TestingSessionLocal() as db:
+            db_flag = db.scalars(
+                select(Flag).where(Flag.name == "allowlist-lazy")
+            ).one()
+            assert not any("flag_allowed_users" in s for s in statements)
+            with pytest.raises(InvalidRequestError):
+                list(db_flag.allowed_users)
+
+            db_flag = db.scalars(
+                select(Flag)
+                .options(selectinload(Flag.allowed_user_rows))
+                .where(Flag.name == "allowlist-lazy")
+            ).one()
+            assert db_flag.allowed_users == users
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_migrate_allowed_users_moves_json_lists(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=db_engine)
+    flags = Flag.__table__
+    with db_engine.begin() as conn:
+        conn.execute(
+            flags.insert().values(name="legacy", allowed_users=["x", "y", "x"])
+        )
+
+    migrate_allowed_users(bind=db_engine)
+    migrate_allowed_users(bind=db_engine)
+
+    with db_engine.connect() as conn:
+        rows = conn.execute(
+            select(FlagAllowedUser.user_id).order_by(FlagAllowedUser.id)
+        ).scalars()
+        assert list(rows) == ["x", "y"]
+        assert conn.execute(select(flags.c.allowed_users)).scalar() == []
+        assert conn.execute(select(func.count(FlagAllowedUser.id))).scalar() == 2
+
+    db_engine.dispose()
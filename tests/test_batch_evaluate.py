@@ -0,0 +1,60 @@
+import json
+from http import HTTPStatus
+
+
+def _create_flag(client, payload: dict) -> None:
+    response = client.post("/api/flags", json=payload)
+    assert response.status_code == HTTPStatus.CREATED
+
+
+def _read_ndjson(resp) -> list[dict]:
+    return [json.loads(line) for line in resp.text.splitlines() if line]
+
+
+def test_batch_evaluate_matches_single_evaluations(client):
+    _create_flag(
+        client,
+        {"name": "batch-a", "rollout_percentage": 50, "allowed_users": ["u-1"]},
+    )
+    _create_flag(client, {"name": "batch-b", "enabled": False})
+    user_ids = [f"u-{i}" for i in range(25)]
+
+    resp = client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": user_ids, "flags": ["batch-a", "Batch-B"]},
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = _read_ndjson(resp)
+    assert [row["user_id"] for row in rows] == user_ids
+    for row in rows:
+        assert set(row["results"]) == {"batch-a", "batch-b"}
+        for flag_name, result in row["results"].items():
+            single = client.get(
+                "/api/flags/evaluate",
+                params={"user_id": row["user_id"], "flag": flag_name},
+            ).json()
+            assert result == {"enabled": single["enabled"], "reason": single["reason"]}
+
+
+def test_batch_evaluate_all_flags_when_flags_omitted(client):
+    _create_flag(client, {"name": "batch-all", "rollout_percentage": 100})
+
+    resp = client.post("/api/flags/evaluate/batch", json={"user_ids": ["x"]})
+    assert resp.status_code == HTTPStatus.OK
+
+    (row,) = _read_ndjson(resp)
+    assert row["results"]["batch-all"] == {
+        "enabled": True,
+        "reason": "rollout_percentage",
+    }
+
+
+def test_batch_evaluate_unknown_flag_returns_404(client):
+    resp = client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": ["x"], "flags": ["batch-missing"]},
+    )
+    assert resp.status_code == HTTPStatus.NOT_FOUND
+    assert resp.json()["flag_name"] == "batch-missing"
@@ -0,0 +1,121 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.flag_snapshot import BINARY_SNAPSHOT_MEDIA_TYPE, encode_snapshot
+from featureflags_client import BinarySnapshot, BinarySnapshotError, LocalFlag
+from featureflags_client.client import FeatureFlagsClient
+
+USER_IDS = [f"user-{i}" for i in range(300)] + ["", "ñandú", "zz-unknown"]
+
+
+def _flag(
+    name,
+    enabled,
+    rollout,
+    allowed_users,
+    algorithm="sha256",
+    version=1,
+    variants=(),
+    rules=(),
+):
+    return SimpleNamespace(
+        name=name,
+        enabled=enabled,
+        rollout_percentage=rollout,
+        allowed_users=tuple(allowed_users),
+        hash_algorithm=algorithm,
+        version=version,
+        variants=tuple(variants),
+        rules=tuple(rules),
+    )
+
+
+FLAGS = [
+    _flag("binary-off", False, 100, ["user-1"]),
+    _flag("binary-allow", True, 0, ["user-7", "user-3", "ñandú", "user-3"]),
+    _flag("binary-rollout", True, 40, [], "blake2b64"),
+    _flag("binary-full", True, 100, []),
+    _flag("binary-mixed", True, 25, [f"user-{i}" for i in range(0, 300, 7)], "xxh3_64"),
+    _flag("binary-deny", True, 0, []),
+]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_binary_snapshot_matches_local_flags(compress):
+    data = encode_snapshot(f'"binary-{compress}"', FLAGS, "binary", compress)
+    snapshot = BinarySnapshot.from_bytes(data)
+
+    assert snapshot.etag == f'"binary-{compress}"'
+    assert len(snapshot) == len(FLAGS)
+    assert snapshot.evaluate("missing", "user-1") is None
+    for flag in FLAGS:
+        local = LocalFlag(
+            flag.name,
+            flag.enabled,
+            flag.rollout_percentage,
+            flag.allowed_users,
+            flag.hash_algorithm,
+        )
+        for user_id in USER_IDS:
+            assert snapshot.evaluate(flag.name, user_id) == local.evaluate(user_id)
+
+
+def test_binary_snapshot_opens_with_mmap(tmp_path):
+    data = encode_snapshot('"binary-mmap"', FLAGS, "binary", True)
+    path = tmp_path / "flags.ffsn"
+    path.write_bytes(BinarySnapshot.from_bytes(data).to_bytes())
+
+    snapshot = BinarySnapshot.open(str(path))
+    assert "BINARY-ALLOW" in snapshot
+    assert snapshot.evaluate("binary-allow", "ñandú") == (True, "user_in_allowlist")
+    snapshot.close()
+
+
+def test_binary_snapshot_rejects_invalid_data():
+    with pytest.raises(BinarySnapshotError):
+        BinarySnapshot.from_bytes(b"JSON{}" + b"\0" * 10)
+    data = encode_snapshot('"binary-truncated"', FLAGS, "binary")
+    with pytest.raises(BinarySnapshotError):
+        BinarySnapshot.from_bytes(data[:-5])
+
+
+def test_snapshot_endpoint_serves_binary(client, monkeypatch, tmp_path):
+    client.post("/api/flags", json={"name": "binary-endpoint", "allowed_users": ["a"]})
+
+    resp = client.get("/api/flags/snapshot?format=binary&compress=true")
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["content-type"] == BINARY_SNAPSHOT_MEDIA_TYPE
+    snapshot = BinarySnapshot.from_bytes(resp.content)
+    assert snapshot.etag == resp.headers["etag"]
+    assert snapshot.evaluate("binary-endpoint", "a") == (True, "user_in_allowlist")
+
+    cached = client.get(
+        "/api/flags/snapshot?format=binary",
+        headers={"If-None-Match": resp.headers["etag"]},
+    )
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+    # El cliente en modo binario guarda el snapshot y arranca desde el mmap
+    cache_path = str(tmp_path / "flags.ffsn")
+    sdk = FeatureFlagsClient(
+        "http://testserver",
+        refresh_interval=0,
+        cache_path=cache_path,
+        snapshot_format="binary",
+    )
+    monkeypatch.setattr(
+        sdk,
+        "_fetch",
+        lambda etag: (HTTPStatus.OK, resp.headers["etag"], resp.content),
+    )
+    assert sdk.refresh() is True
+    assert sdk.is_enabled("binary-endpoint", "a") is True
+
+    cold = FeatureFlagsClient(
+        "http://testserver", cache_path=cache_path, snapshot_format="binary"
+    )
+    cold._load_cache_file()
+    assert cold.etag == resp.headers["etag"]
+    assert cold.evaluate("binary-endpoint", "a") == (True, "user_in_allowlist")
@@ -0,0 +1,64 @@
+import hashlib
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.bucketing import (
+    BLAKE2B64,
+    DEFAULT_HASH_ALGORITHM,
+    SHA256,
+    available_algorithms,
+    hash_user_flag,
+)
+from app.services.evaluation_service import EvaluationService
+
+
+def test_sha256_matches_historical_bucketing():
+    for user_id in ["user-1", "user-2", "ñandú"]:
+        digest = hashlib.sha256(f"{user_id}:legacy-flag".encode()).digest()
+        expected = int.from_bytes(digest[:8], byteorder="big")
+        assert hash_user_flag(user_id, "legacy-flag", SHA256) == expected
+        assert EvaluationService._hash_user_flag(user_id, "legacy-flag") == expected
+
+
+@pytest.mark.parametrize("algorithm", available_algorithms())
+def test_compiled_flag_matches_evaluate_flag_for_each_algorithm(algorithm):
+    flag = SimpleNamespace(
+        name="hashed-feature",
+        enabled=True,
+        rollout_percentage=35,
+        allowed_users=[],
+        hash_algorithm=algorithm,
+    )
+    compiled = EvaluationService.compile_flag(flag)
+    results = [compiled.evaluate(f"user-{i}") for i in range(1000)]
+
+    assert results == [
+        EvaluationService.evaluate_flag(flag, f"user-{i}") for i in range(1000)
+    ]
+    # Un rollout del 35% deja dentro aproximadamente a un tercio de los usuarios
+    assert 250 < sum(enabled for enabled, _ in results) < 450
+
+
+def test_new_flags_use_default_algorithm_and_can_pin_sha256(client):
+    resp = client.post("/api/flags", json={"name": "default-hash"})
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["hash_algorithm"] == DEFAULT_HASH_ALGORITHM
+
+    resp = client.post(
+        "/api/flags", json={"name": "pinned-hash", "hash_algorithm": SHA256}
+    )
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["hash_algorithm"] == SHA256
+
+    resp = client.put("/api/flags/pinned-hash", json={"hash_algorithm": BLAKE2B64})
+    assert resp.json()["hash_algorithm"] == BLAKE2B64
+
+
+def test_unknown_hash_algorithm_is_rejected(client):
+    resp = client.post("/api/flags", json={"name": "bad-hash", "hash_algorithm": "md5"})
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+    data = resp.json()
+    assert data["hash_algorithm"] == "md5"
+    assert SHA256 in data["available"]
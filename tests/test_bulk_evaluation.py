@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.bucketing import (
+    available_algorithms,
+    make_batch_hasher,
+    make_user_hasher,
+)
+from app.services.bulk_evaluation import (
+    REASONS,
+    bulk_evaluate,
+    bulk_evaluate_many,
+    load_user_ids,
+)
+from app.services.evaluation_service import EvaluationService
+
+USER_IDS = [f"user-{i}" for i in range(2000)]
+
+
+def _flag(name, **overrides):
+    fields = {
+        "name": name,
+        "enabled": True,
+        "rollout_percentage": 35,
+        "allowed_users": ["user-1", "user-7", "user-1500"],
+        "hash_algorithm": "sha256",
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {},
+        {"hash_algorithm": "blake2b64"},
+        {"allowed_users": [f"user-{i}" for i in range(0, 2000, 3)]},
+        {"rollout_percentage": 0},
+        {"rollout_percentage": 100, "allowed_users": []},
+        {"enabled": False},
+    ],
+)
+def test_bulk_evaluate_matches_per_user_evaluator(overrides):
+    flag = _flag("bulk-feature", **overrides)
+
+    result = bulk_evaluate(flag, USER_IDS)
+
+    for i, user_id in enumerate(USER_IDS):
+        enabled, reason = EvaluationService.evaluate_flag(flag, user_id)
+        assert result.enabled[i] == enabled
+        assert REASONS[result.reasons[i]] == reason
+
+
+def test_bulk_evaluate_accepts_numpy_arrays_and_files(tmp_path):
+    flag = _flag("bulk-sources")
+    path = tmp_path / "users.txt"
+    path.write_text("\n".join(USER_IDS) + "\n", encoding="utf-8")
+
+    from_list = bulk_evaluate(flag, USER_IDS)
+    from_array = bulk_evaluate(flag, np.array(USER_IDS))
+    from_file = bulk_evaluate(flag, path)
+
+    assert len(load_user_ids(path)) == len(USER_IDS)
+    assert np.array_equal(from_list.reasons, from_array.reasons)
+    assert np.array_equal(from_list.reasons, from_file.reasons)
+
+
+def test_bulk_evaluate_many_reports_reason_counts():
+    flags = [_flag("bulk-a"), _flag("bulk-b", enabled=False)]
+
+    results = bulk_evaluate_many(flags, USER_IDS)
+
+    assert set(results) == {"bulk-a", "bulk-b"}
+    assert results["bulk-b"].reason_counts()["flag_disabled"] == len(USER_IDS)
+    counts = results["bulk-a"].reason_counts()
+    assert counts["user_in_allowlist"] == 3
+    assert sum(counts.values()) == len(USER_IDS)
+
+
+@pytest.mark.parametrize("algorithm", available_algorithms())
+def test_batch_hasher_matches_per_user_hasher(algorithm):
+    hash_user = make_user_hasher(algorithm, "bulk-hash")
+    hash_batch = make_batch_hasher(algorithm, "bulk-hash")
+
+    hashes = np.frombuffer(
+        hash_batch([user_id.encode() for user_id in USER_IDS]), dtype=">u8"
+    )
+
+    assert hashes.tolist() == [hash_user(user_id) for user_id in USER_IDS]
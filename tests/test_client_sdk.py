@@ -0,0 +1,141 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+import featureflags_client.evaluation as evaluation_module
+from app.services.evaluation_service import EvaluationService
+from featureflags_client import FLAG_NOT_FOUND, FeatureFlagsClient, LocalFlag
+from featureflags_client.client import SnapshotError
+
+USER_IDS = [f"user-{i}" for i in range(500)] + ["", "ñandú", "user:with:colons"]
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b64", "xxh3_64"])
+@pytest.mark.parametrize(
+    "enabled,rollout,allowed_users",
+    [
+        (True, 0, []),
+        (True, 35, []),
+        (True, 100, []),
+        (True, 50, ["user-1", "user-42"]),
+        (False, 100, ["user-1"]),
+    ],
+)
+def test_local_flag_matches_service(algorithm, enabled, rollout, allowed_users):
+    flag = SimpleNamespace(
+        name="sdk-feature",
+        enabled=enabled,
+        rollout_percentage=rollout,
+        allowed_users=allowed_users,
+        hash_algorithm=algorithm,
+    )
+    local = LocalFlag("sdk-feature", enabled, rollout, allowed_users, algorithm)
+
+    for user_id in USER_IDS:
+        assert local.evaluate(user_id) == EvaluationService.evaluate_flag(flag, user_id)
+
+
+def test_snapshot_endpoint_supports_conditional_get(client):
+    client.post("/api/flags", json={"name": "snapshot-flag", "rollout_percentage": 30})
+
+    resp = client.get("/api/flags/snapshot")
+    assert resp.status_code == HTTPStatus.OK
+    body = resp.json()
+    assert body["format_version"] == 1
+    assert body["etag"] == resp.headers["etag"]
+    entry = next(f for f in body["flags"] if f["name"] == "snapshot-flag")
+    assert entry["rollout_percentage"] == 30
+
+    cached = client.get(
+        "/api/flags/snapshot", headers={"If-None-Match": resp.headers["etag"]}
+    )
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def _client_via(test_client, monkeypatch):
+    """Cliente SDK cuyas descargas pasan por el TestClient."""
+    sdk = FeatureFlagsClient("http://testserver", refresh_interval=0)
+
+    def fetch(etag):
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = test_client.get("/api/flags/snapshot", headers=headers)
+        return resp.status_code, resp.headers.get("etag"), resp.content
+
+    monkeypatch.setattr(sdk, "_fetch", fetch)
+    return sdk
+
+
+def test_client_refreshes_and_evaluates_locally(client, monkeypatch):
+    client.post("/api/flags", json={"name": "sdk-refresh", "allowed_users": ["ana"]})
+    sdk = _client_via(client, monkeypatch)
+
+    assert sdk.refresh() is True
+    assert sdk.evaluate("sdk-refresh", "ana") == (True, "user_in_allowlist")
+    assert sdk.evaluate("missing-flag", "ana") == (False, FLAG_NOT_FOUND)
+    assert sdk.is_enabled("missing-flag", "ana", default=True) is True
+
+    # Sin cambios el servicio responde 304 y se conserva el snapshot
+    assert sdk.refresh() is False
+
+    client.put("/api/flags/sdk-refresh", json={"enabled": False})
+    assert sdk.refresh() is True
+    assert sdk.evaluate("sdk-refresh", "ana") == (False, "flag_disabled")
+
+
+def test_client_keeps_snapshot_during_outage(client, monkeypatch, tmp_path):
+    client.post("/api/flags", json={"name": "sdk-outage", "rollout_percentage": 100})
+    cache_path = tmp_path / "snapshot.json"
+    sdk = _client_via(client, monkeypatch)
+    sdk.cache_path = str(cache_path)
+    sdk.refresh()
+
+    def unavailable(etag):
+        raise SnapshotError("servicio caído")
+
+    monkeypatch.setattr(sdk, "_fetch", unavailable)
+    with pytest.raises(SnapshotError):
+        sdk.refresh()
+    assert sdk.is_enabled("sdk-outage", "user-1") is True
+
+    # Un cliente nuevo arranca desde el snapshot en disco
+    cold = FeatureFlagsClient(
+        "http://testserver", refresh_interval=0, cache_path=str(cache_path)
+    )
+    monkeypatch.setattr(cold, "_fetch", unavailable)
+    cold.start()
+    assert cold.is_enabled("sdk-outage", "user-1") is True
+    cold.close()
+
+
+def test_flag_with_unavailable_hash_does_not_block_the_snapshot(
+    client, monkeypatch, caplog
+):
+    monkeypatch.setattr(evaluation_module, "xxhash", None)
+    client.post(
+        "/api/flags",
+        json={
+            "name": "sdk-xxh3",
+            "rollout_percentage": 50,
+            "allowed_users": ["ana"],
+            "hash_algorithm": "xxh3_64",
+            "variants": [{"name": "a", "weight": 1}, {"name": "b", "weight": 1}],
+        },
+    )
+    client.post("/api/flags", json={"name": "sdk-sha", "rollout_percentage": 100})
+    sdk = _client_via(client, monkeypatch)
+
+    assert sdk.refresh() is True
+    assert "sdk-xxh3" in caplog.text
+    assert sdk.evaluate("sdk-sha", "bob") == (True, "rollout_percentage")
+    # Lo que no necesita el hash se sigue evaluando; el resto usa el default
+    assert sdk.evaluate("sdk-xxh3", "ana") == (True, "user_in_allowlist")
+    assert sdk.evaluate("sdk-xxh3", "bob") == (False, "hash_algorithm_unavailable")
+    assert sdk.is_enabled("sdk-xxh3", "bob", default=True) is True
+    assert sdk.variant("sdk-xxh3", "ana", default="control") == "control"
+
+    data = client.get("/api/flags/snapshot?format=binary&compress=false").content
+    binary = sdk.load_binary_snapshot(data)
+    assert binary.evaluate("sdk-xxh3", "bob") == (False, "hash_algorithm_unavailable")
+    assert binary.variant("sdk-xxh3", "ana") is None
+    assert sdk.is_enabled("sdk-sha", "bob") is True
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.evaluation_service import CompiledFlag, EvaluationService
+
+USER_IDS = [f"user-{i}" for i in range(500)] + ["", "ñandú", "user:with:colons"]
+
+
+@pytest.mark.parametrize(
+    "enabled,rollout,allowed_users",
+    [
+        (True, 0, []),
+        (True, 35, []),
+        (True, 100, []),
+        (True, 50, ["user-1", "user-42"]),
+        (False, 100, ["user-1"]),
+        (None, 50, None),
+        (True, None, None),
+    ],
+)
+def test_compiled_flag_matches_evaluate_flag(enabled, rollout, allowed_users):
+    flag = SimpleNamespace(
+        name="compiled-feature",
+        enabled=enabled,
+        rollout_percentage=rollout,
+        allowed_users=allowed_users,
+    )
+    compiled = EvaluationService.compile_flag(flag)
+
+    for user_id in USER_IDS:
+        assert compiled.evaluate(user_id) == EvaluationService.evaluate_flag(
+            flag, user_id
+        )
+
+
+def test_compiled_flag_bucket_matches_legacy_hash():
+    compiled = CompiledFlag("bucket-flag", True, 50, [])
+
+    for user_id in USER_IDS:
+        expected = EvaluationService._hash_user_flag(user_id, "bucket-flag") % 100
+        assert compiled.bucket(user_id) == expected
+
+
+def test_compiled_flag_uses_slots():
+    compiled = CompiledFlag("slots-flag", True, 10, ["a"])
+
+    assert not hasattr(compiled, "__dict__")
+    assert isinstance(compiled.allowed_users, frozenset)
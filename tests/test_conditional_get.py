@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+from app.routers.conditional import etag_matches
+
+
+def test_etag_matches_handles_lists_weak_and_wildcard():
+    assert etag_matches('"1-2"', '"1-2"')
+    assert etag_matches('"0-1", W/"1-2"', '"1-2"')
+    assert etag_matches("*", '"1-2"')
+    assert not etag_matches('"1-1"', '"1-2"')
+    assert not etag_matches(None, '"1-2"')
+
+
+def test_get_flag_returns_304_until_flag_changes(client):
+    client.post("/api/flags", json={"name": "etag-flag", "rollout_percentage": 10})
+
+    resp = client.get("/api/flags/etag-flag")
+    assert resp.status_code == HTTPStatus.OK
+    etag = resp.headers["etag"]
+    assert resp.json()["version"] == 1
+
+    resp = client.get("/api/flags/etag-flag", headers={"If-None-Match": etag})
+    assert resp.status_code == HTTPStatus.NOT_MODIFIED
+    assert resp.headers["etag"] == etag
+    assert resp.content == b""
+
+    update = client.put("/api/flags/etag-flag", json={"rollout_percentage": 20})
+    assert update.json()["version"] == 2
+
+    resp = client.get("/api/flags/etag-flag", headers={"If-None-Match": etag})
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["etag"] != etag
+    assert resp.json()["rollout_percentage"] == 20
+
+
+def test_list_flags_returns_304_until_flag_set_changes(client):
+    resp = client.get("/api/flags")
+    etag = resp.headers["etag"]
+
+    resp = client.get("/api/flags", headers={"If-None-Match": etag})
+    assert resp.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.post("/api/flags", json={"name": "etag-list-flag"})
+
+    resp = client.get("/api/flags", headers={"If-None-Match": etag})
+    assert resp.status_code == HTTPStatus.OK
+    new_etag = resp.headers["etag"]
+    assert new_etag != etag
+
+    client.put("/api/flags/etag-list-flag", json={"enabled": False})
+    resp = client.get("/api/flags", headers={"If-None-Match": new_etag})
+    assert resp.status_code == HTTPStatus.OK
+
+
+def test_not_modified_responses_do_not_query_the_database(client):
+    from sqlalchemy import event
+
+    from tests.conftest import engine
+
+    client.post("/api/flags", json={"name": "etag-no-query"})
+    flag_etag = client.get("/api/flags/etag-no-query").headers["etag"]
+    list_etag = client.get("/api/flags").headers["etag"]
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        resp = client.get("/api/flags", headers={"If-None-Match": list_etag})
+        assert resp.status_code == HTTPStatus.NOT_MODIFIED
+        resp = client.get(
+            "/api/flags/etag-no-query", headers={"If-None-Match": flag_etag}
+        )
+        assert resp.status_code == HTTPStatus.NOT_MODIFIED
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert statements == []
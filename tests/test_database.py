@@ -0,0 +1,40 @@
+from sqlalchemy import text
+
+from app.database import create_db_engine, engine_options
+
+
+def test_file_sqlite_engine_gets_pool_options():
+    options = engine_options("sqlite:///./some.db")
+
+    assert options["connect_args"] == {"check_same_thread": False}
+    assert {"pool_size", "max_overflow", "pool_recycle", "pool_pre_ping"} <= set(
+        options
+    )
+
+
+def test_memory_sqlite_engine_skips_pool_options():
+    assert "pool_size" not in engine_options("sqlite://")
+    assert "pool_size" not in engine_options("sqlite:///:memory:")
+
+
+def test_sqlite_pragmas_are_applied_on_connect(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+
+    with db_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # synchronous=NORMAL equivale a 1
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -64000
+
+    db_engine.dispose()
+
+
+def test_empty_pragma_values_are_skipped(tmp_path):
+    db_engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'default.db'}", pragmas={"journal_mode": ""}
+    )
+
+    with db_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+
+    db_engine.dispose()
@@ -0,0 +1,75 @@
+import pytest
+
+import app.routers.flags as flags_router
+from app.services.decision_cache import DecisionCache
+
+
+def test_decision_cache_hits_and_version_invalidation():
+    calls = []
+
+    def evaluate(user_id):
+        calls.append(user_id)
+        return True, "rollout_percentage"
+
+    cache = DecisionCache(max_size=10)
+    assert cache.evaluate("flag", 1, "ana", evaluate) == (True, "rollout_percentage")
+    assert cache.evaluate("flag", 1, "ana", evaluate) == (True, "rollout_percentage")
+    # Una versión nueva de la flag no reutiliza la decisión anterior
+    cache.evaluate("flag", 2, "ana", evaluate)
+    assert calls == ["ana", "ana"]
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "size": 2,
+        "max_size": 10,
+        "hit_ratio": pytest.approx(1 / 3),
+    }
+
+
+def test_decision_cache_is_bounded_and_keeps_hot_entries():
+    cache = DecisionCache(max_size=3)
+
+    def decide(user_id):
+        return False, "default_deny"
+
+    cache.evaluate("flag", 1, "hot", decide)
+    for i in range(20):
+        cache.evaluate("flag", 1, "hot", decide)
+        cache.evaluate("flag", 1, f"cold-{i}", decide)
+
+    stats = cache.stats()
+    assert stats["size"] == 3
+    assert stats["evictions"] == 18
+    assert stats["hits"] == 20
+
+
+def test_disabled_cache_and_missing_flags_are_not_stored():
+    disabled = DecisionCache(max_size=0)
+    assert disabled.evaluate("flag", 1, "ana", lambda u: (True, "x")) == (True, "x")
+    assert disabled.stats()["size"] == 0
+
+    cache = DecisionCache(max_size=5)
+    assert cache.evaluate("missing", 1, "ana", lambda u: None) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_evaluate_endpoint_uses_decision_cache(client, monkeypatch):
+    cache = DecisionCache(max_size=100)
+    monkeypatch.setattr(flags_router, "decision_cache", cache)
+    client.post("/api/flags", json={"name": "decision-flag", "rollout_percentage": 50})
+    client.post("/api/flags", json={"name": "decision-allow", "allowed_users": ["ana"]})
+
+    url = "/api/flags/evaluate?flag=decision-flag&user_id=ana"
+    first = client.get(url).json()
+    assert client.get(url).json() == first
+
+    # Cambiar la flag crea una versión nueva: la decisión se recalcula
+    client.put("/api/flags/decision-flag", json={"enabled": False})
+    assert client.get(url).json()["reason"] == "flag_disabled"
+
+    # Sin rollout parcial se evalúa directamente, sin pasar por el caché
+    client.get("/api/flags/evaluate?flag=decision-allow&user_id=ana")
+
+    stats = client.get("/api/flags/cache/decisions").json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
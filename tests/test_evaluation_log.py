@@ -0,0 +1,138 @@
+import json
+
+from app.services.evaluation_log import EvaluationLog
+
+
+def _read_lines(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_are_flushed_as_ndjson(tmp_path):
+    log = EvaluationLog(path=str(tmp_path / "evaluations.ndjson"), flush_interval=60)
+    log.record("antes-de-start", "user1", True, "flag_disabled")
+    log.start()
+    log.record("new-feature", "user1", True, "user_in_allowlist")
+    log.record("new-feature", "user2", False, "not_in_rollout_percentage")
+    log.stop()
+
+    lines = _read_lines(tmp_path / "evaluations.ndjson")
+    assert [(line["flag"], line["user_id"], line["enabled"]) for line in lines] == [
+        ("new-feature", "user1", True),
+        ("new-feature", "user2", False),
+    ]
+    assert lines[1]["reason"] == "not_in_rollout_percentage"
+    assert lines[0]["ts"] <= lines[1]["ts"]
+    assert log.stats()["written"] == 2
+
+
+def test_overload_drops_and_samples_instead_of_blocking(tmp_path):
+    log = EvaluationLog(path=str(tmp_path / "full.ndjson"), capacity=3)
+    log.active = True
+    for i in range(5):
+        log.record("flag", f"user{i}", True, "rollout_percentage")
+    assert (log.recorded, log.dropped) == (3, 2)
+
+    log.sample_rate = 0.0
+    log.record("flag", "user9", True, "rollout_percentage")
+    assert log.stats()["sampled_out"] == 1
+    assert log.stats()["pending"] == 3
+
+
+def test_rotation_keeps_bounded_backups(tmp_path):
+    path = tmp_path / "rotating.ndjson"
+    log = EvaluationLog(path=str(path), flush_interval=60, max_bytes=200, backups=2)
+    log.start()
+    for batch in range(5):
+        for i in range(3):
+            log.record("flag", f"user-{batch}-{i}", True, "rollout_percentage")
+        log.flush()
+    log.stop()
+
+    assert log.rotations == 5
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "rotating.ndjson",
+        "rotating.ndjson.1",
+        "rotating.ndjson.2",
+    ]
+    assert _read_lines(tmp_path / "rotating.ndjson.1")[0]["user_id"] == "user-4-0"
+
+
+def test_evaluate_endpoint_records_evaluations(client, tmp_path, monkeypatch):
+    client.post("/api/flags", json={"name": "logged-flag", "enabled": True})
+    log = EvaluationLog(path=str(tmp_path / "{pid}.ndjson"), flush_interval=60)
+    monkeypatch.setattr("app.routers.flags.evaluation_log", log)
+    log.start()
+
+    response = client.get("/api/flags/evaluate?flag=LOGGED-FLAG&user_id=user42")
+    log.stop()
+
+    (path,) = tmp_path.iterdir()
+    (line,) = _read_lines(path)
+    assert line["flag"] == "logged-flag"
+    assert line["user_id"] == "user42"
+    assert (line["enabled"], line["reason"]) == (
+        response.json()["enabled"],
+        response.json()["reason"],
+    )
+
+
+def test_failed_rotation_keeps_the_writer_running(tmp_path, monkeypatch):
+    import app.services.evaluation_log as evaluation_log_module
+
+    path = tmp_path / "failing.ndjson"
+    log = EvaluationLog(path=str(path), flush_interval=60, max_bytes=1, backups=1)
+    log.start()
+
+    def fail(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    # Ni el archivo rotado ni el nuevo pueden crearse
+    monkeypatch.setattr(evaluation_log_module.os, "replace", fail)
+    monkeypatch.setattr(log, "_open", fail)
+    log.record("flag", "user-1", True, "rollout_percentage")
+    assert log.flush() == 1
+    log.record("flag", "user-2", True, "rollout_percentage")
+    assert log.flush() == 0
+    assert (log.rotations, log.dropped) == (0, 1)
+
+    # Un error inesperado se registra sin terminar el bucle del hilo
+    monkeypatch.setattr(log, "flush", lambda: 1 / 0)
+    log._flush_logged()
+
+    # La escritura se retoma cuando el disco se recupera
+    monkeypatch.undo()
+    log.max_bytes = 0
+    log.record("flag", "user-3", True, "rollout_percentage")
+    log.stop()
+
+    assert [line["user_id"] for line in _read_lines(path)] == ["user-1", "user-3"]
+    assert log.written == 2
+
+
+def test_batch_endpoint_records_sampled_evaluations(client, tmp_path, monkeypatch):
+    client.post(
+        "/api/flags",
+        json={"name": "logged-batch", "rollout_percentage": 100},
+    )
+    log = EvaluationLog(path=str(tmp_path / "batch.ndjson"), flush_interval=60)
+    monkeypatch.setattr("app.routers.flags.evaluation_log", log)
+    log.start()
+
+    users = ["u1", "u2", "u3"]
+    client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": users, "flags": ["logged-batch"]},
+    )
+    log.sample_rate = 0.0
+    client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": users, "flags": ["logged-batch"]},
+    )
+    log.stop()
+
+    lines = _read_lines(tmp_path / "batch.ndjson")
+    assert [(line["flag"], line["user_id"]) for line in lines] == [
+        ("logged-batch", user_id) for user_id in users
+    ]
+    assert {line["reason"] for line in lines} == {"rollout_percentage"}
+    assert log.sampled_out == 3
@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.models.flag_exposure import FlagExposure
+from app.services.exposure_counters import ExposureCounters, current_minute
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    """Fija el reloj del módulo para que la prueba no cruce un cambio de minuto."""
+    now = time.time()
+    monkeypatch.setattr(
+        "app.services.exposure_counters.time", SimpleNamespace(time=lambda: now)
+    )
+
+
+def _persisted(flag_name: str) -> dict[tuple[int, str], int]:
+    with TestingSessionLocal() as db:
+        rows = db.execute(
+            select(FlagExposure.minute, FlagExposure.reason, FlagExposure.count).where(
+                FlagExposure.flag_name == flag_name
+            )
+        )
+        return {(minute, reason): count for minute, reason, count in rows}
+
+
+def test_sharded_counts_are_merged_additively_across_flushes_and_workers():
+    worker_a, worker_b = ExposureCounters(enabled=True), ExposureCounters(enabled=True)
+
+    def evaluate(i):
+        worker_a.count(
+            "exposed-flag", "rollout_percentage" if i % 4 else "flag_disabled"
+        )
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(evaluate, range(4000)))
+    worker_b.count_many("exposed-flag", {"rollout_percentage": 7, "default_deny": 0})
+
+    with TestingSessionLocal() as db:
+        assert worker_a.flush(db) == 2
+        assert worker_b.flush(db) == 1
+        # Sin evaluaciones nuevas no se vuelve a escribir nada
+        assert worker_a.flush(db) == 0
+        worker_a.count("exposed-flag", "flag_disabled")
+        assert worker_a.flush(db) == 1
+
+    minute = current_minute()
+    counts = _persisted("exposed-flag")
+    assert counts[(minute, "rollout_percentage")] == 3000 + 7
+    assert counts[(minute, "flag_disabled")] == 1001
+    assert sum(counts.values()) == 4008
+
+
+def test_flush_attributes_window_to_its_minute():
+    counters = ExposureCounters(enabled=True)
+    for _ in range(3):
+        counters.count("window-flag", "rollout_percentage")
+
+    with TestingSessionLocal() as db:
+        counters.flush(db, minute=1000)
+        counters.count("window-flag", "rollout_percentage")
+        counters.flush(db, minute=1001)
+
+    assert _persisted("window-flag") == {
+        (1000, "rollout_percentage"): 3,
+        (1001, "rollout_percentage"): 1,
+    }
+    # La memoria depende de las flags y razones, no del tiempo transcurrido
+    assert counters._local.counts == {("window-flag", "rollout_percentage"): 4}
+
+
+def test_shards_of_finished_threads_are_dropped_once_flushed():
+    counters = ExposureCounters(enabled=True)
+    counters.count("pruned-flag", "rollout_percentage")
+    for _ in range(3):
+        with ThreadPoolExecutor(4) as executor:
+            list(
+                executor.map(
+                    lambda _: counters.count("pruned-flag", "flag_disabled"),
+                    range(100),
+                )
+            )
+    assert len(counters._shards) > 1
+
+    with TestingSessionLocal() as db:
+        counters.flush(db, minute=2000)
+    # Solo queda el reparto del hilo actual, que sigue vivo
+    assert len(counters._shards) == 1
+    assert _persisted("pruned-flag") == {
+        (2000, "rollout_percentage"): 1,
+        (2000, "flag_disabled"): 300,
+    }
+
+
+def test_exposures_endpoint_returns_time_series(client, monkeypatch):
+    client.post("/api/flags", json={"name": "series-flag", "rollout_percentage": 50})
+    counters = ExposureCounters(enabled=True)
+    monkeypatch.setattr("app.routers.flags.exposure_counters", counters)
+
+    for i in range(20):
+        client.get(f"/api/flags/evaluate?flag=series-flag&user_id=user{i}")
+    client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": ["a", "b", "c"], "flags": ["series-flag"]},
+    )
+    with TestingSessionLocal() as db:
+        counters.flush(db)
+
+    data = client.get("/api/flags/SERIES-FLAG/exposures").json()
+    assert data["flag_name"] == "series-flag"
+    (point,) = data["points"]
+    assert point["total"] == 23
+    assert set(point["reasons"]) <= {"rollout_percentage", "not_in_rollout_percentage"}
+
+    past = client.get(
+        "/api/flags/series-flag/exposures",
+        params={"since": "2020-01-01T00:00:00Z", "until": "2020-01-01T01:00:00Z"},
+    ).json()
+    assert past["points"] == []
+    assert past["since"].startswith("2020-01-01T00:00:00")
+
+    response = client.get("/api/flags/missing-flag/exposures")
+    assert response.status_code == HTTPStatus.NOT_FOUND
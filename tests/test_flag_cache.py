@@ -0,0 +1,119 @@
+from http import HTTPStatus
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.models.flag import Flag
+from app.services.flag_cache import FlagSnapshot, compute_flag_set_etag, flag_cache
+from tests.conftest import TestingSessionLocal
+
+
+def _evaluate(client, user_id: str, flag: str) -> dict:
+    resp = client.get("/api/flags/evaluate", params={"user_id": user_id, "flag": flag})
+    assert resp.status_code == HTTPStatus.OK
+    return resp.json()
+
+
+def test_evaluate_is_served_from_cache(client):
+    payload = {
+        "name": "cached-feature",
+        "enabled": True,
+        "rollout_percentage": 0,
+        "allowed_users": ["user-1"],
+    }
+    assert client.post("/api/flags", json=payload).status_code == HTTPStatus.CREATED
+
+    before = client.get("/api/flags/cache/stats").json()
+    _evaluate(client, "user-1", "cached-feature")
+    _evaluate(client, "user-2", "cached-feature")
+    after = client.get("/api/flags/cache/stats").json()
+
+    assert after["hits"] - before["hits"] == 2
+    assert after["misses"] == before["misses"]
+    assert after["size"] >= 1
+
+
+def test_update_refreshes_cached_flag(client):
+    payload = {
+        "name": "cache-write-through",
+        "enabled": True,
+        "rollout_percentage": 0,
+        "allowed_users": [],
+    }
+    client.post("/api/flags", json=payload)
+    assert _evaluate(client, "vip", "cache-write-through")["reason"] == "default_deny"
+
+    before = client.get("/api/flags/cache/stats").json()
+    client.put("/api/flags/cache-write-through", json={"allowed_users": ["vip"]})
+    after = client.get("/api/flags/cache/stats").json()
+
+    assert after["refreshes"] == before["refreshes"] + 1
+    data = _evaluate(client, "vip", "cache-write-through")
+    assert data["enabled"] is True
+    assert data["reason"] == "user_in_allowlist"
+
+
+def test_evaluate_unknown_flag_counts_miss_and_returns_404(client):
+    before = client.get("/api/flags/cache/stats").json()
+    resp = client.get(
+        "/api/flags/evaluate", params={"user_id": "u", "flag": "missing-flag"}
+    )
+    after = client.get("/api/flags/cache/stats").json()
+
+    assert resp.status_code == HTTPStatus.NOT_FOUND
+    assert after["misses"] == before["misses"] + 1
+
+
+def test_full_reload_matches_written_flag(client):
+    payload = {
+        "name": "cache-reload",
+        "enabled": True,
+        "rollout_percentage": 30,
+        "allowed_users": ["user-b", "user-a"],
+        "hash_algorithm": "blake2b64",
+    }
+    assert client.post("/api/flags", json=payload).status_code == HTTPStatus.CREATED
+    written = client.get("/api/flags/cache-reload").json()
+
+    flag_cache.clear()
+    with TestingSessionLocal() as db:
+        flag_cache.load(db)
+        snapshot = flag_cache.get(db, "cache-reload")
+
+    assert snapshot.id == written["id"]
+    assert snapshot.version == written["version"]
+    assert snapshot.allowed_users == ("user-b", "user-a")
+    assert snapshot.hash_algorithm == "blake2b64"
+    assert snapshot.evaluator.evaluate("user-a") == (True, "user_in_allowlist")
+
+
+def test_older_snapshot_never_replaces_a_newer_one(client):
+    client.post("/api/flags", json={"name": "cache-stale", "rollout_percentage": 10})
+    with TestingSessionLocal() as db:
+        stale = FlagSnapshot.from_model(
+            db.scalars(
+                select(Flag)
+                .options(selectinload(Flag.allowed_user_rows))
+                .where(Flag.name == "cache-stale")
+            ).one()
+        )
+    client.put("/api/flags/cache-stale", json={"rollout_percentage": 60})
+
+    # Un lector que leyó la flag antes del PUT la publica después
+    [current] = flag_cache.put_many([stale])
+
+    assert current.version == 2
+    with TestingSessionLocal() as db:
+        assert flag_cache.get(db, "cache-stale").rollout_percentage == 60
+
+
+def test_flag_set_etag_follows_writes(client):
+    with TestingSessionLocal() as db:
+        before, flags = flag_cache.snapshot(db)
+        client.post("/api/flags", json={"name": "cache-etag"})
+        after, updated = flag_cache.snapshot(db)
+
+        assert after != before
+        assert len(updated) == len(flags) + 1
+        assert after == compute_flag_set_etag(updated)
+        assert flag_cache.flag_set_etag(db) == after
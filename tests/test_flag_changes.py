@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from http import HTTPStatus
+from types import SimpleNamespace
+
+from app.routers.flags import _stream_flag_changes
+from app.services.flag_events import FlagChangeBroker, flag_change_broker
+
+
+def _flag(name: str, version: int = 1, allowed_users=()):
+    return SimpleNamespace(
+        id=1,
+        name=name,
+        description=None,
+        enabled=True,
+        rollout_percentage=0,
+        allowed_users=list(allowed_users),
+        hash_algorithm="sha256",
+        version=version,
+        created_at="2025-01-01T00:00:00",
+    )
+
+
+def test_long_poll_returns_changes_after_cursor(client):
+    cursor = int(client.get("/api/flags").headers["x-flag-events-version"])
+
+    client.post("/api/flags", json={"name": "changes-flag"})
+    client.put("/api/flags/changes-flag", json={"rollout_percentage": 40})
+
+    resp = client.get("/api/flags/changes", params={"since_version": cursor})
+    assert resp.status_code == HTTPStatus.OK
+    data = resp.json()
+    assert data["reset"] is False
+    assert [event["type"] for event in data["events"]] == ["created", "updated"]
+    assert data["events"][-1]["flag"]["rollout_percentage"] == 40
+    assert data["version"] == cursor + 2
+
+    resp = client.get(
+        "/api/flags/changes", params={"since_version": data["version"], "timeout": 0}
+    )
+    assert resp.json() == {"version": data["version"], "reset": False, "events": []}
+
+
+def test_long_poll_resets_unknown_cursor(client):
+    resp = client.get(
+        "/api/flags/changes",
+        params={"since_version": flag_change_broker.version + 100, "timeout": 0},
+    )
+    data = resp.json()
+    assert data["reset"] is True
+    assert data["version"] == flag_change_broker.version
+
+
+def test_broker_resets_cursor_older_than_history():
+    broker = FlagChangeBroker(history=2)
+    for version in range(1, 5):
+        broker.publish("updated", _flag("history-flag", version))
+
+    assert broker.events_since(0) == ([], True)
+    events, reset = broker.events_since(2)
+    assert not reset
+    assert [event["version"] for event in events] == [3, 4]
+
+
+def test_broker_omits_allowlists_over_the_event_limit(client):
+    broker = FlagChangeBroker(max_allowed_users=2)
+    small = broker.publish("updated", _flag("small-list", allowed_users=["a", "b"]))
+    large = broker.publish("updated", _flag("large-list", allowed_users="abc"))
+
+    assert small["flag"]["allowed_users"] == ["a", "b"]
+    assert large["flag"]["allowed_users"] is None
+    assert large["flag"]["name"] == "large-list"
+
+    users = [f"user-{i}" for i in range(150)]
+    cursor = flag_change_broker.version
+    client.post("/api/flags", json={"name": "changes-large", "allowed_users": users})
+    resp = client.get("/api/flags/changes", params={"since_version": cursor})
+    assert resp.json()["events"][0]["flag"]["allowed_users"] is None
+    assert client.get("/api/flags/changes-large").json()["allowed_users"] == users
+
+
+def test_broker_wakes_waiters_on_publish_from_another_thread():
+    broker = FlagChangeBroker()
+
+    async def scenario():
+        waiter = asyncio.create_task(broker.wait(0, timeout=5))
+        await asyncio.sleep(0.01)
+        threading.Thread(
+            target=broker.publish, args=("created", _flag("threaded-flag"))
+        ).start()
+        return await asyncio.wait_for(waiter, timeout=2)
+
+    events, reset = asyncio.run(scenario())
+    assert not reset
+    assert events[0]["flag"]["name"] == "threaded-flag"
+
+
+def test_sse_stream_formats_events():
+    flag_change_broker.publish("updated", _flag("sse-flag"))
+    since = flag_change_broker.version - 1
+    request = SimpleNamespace(is_disconnected=lambda: asyncio.sleep(0, False))
+
+    async def first_chunk():
+        stream = _stream_flag_changes(request, since)
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk
+
+    chunk = asyncio.run(first_chunk())
+    assert chunk.startswith(f"id: {since + 1}\nevent: flag.updated\ndata: ")
+    assert '"name":"sse-flag"' in chunk
+    assert chunk.endswith("\n\n")
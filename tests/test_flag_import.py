@@ -0,0 +1,86 @@
+import json
+from http import HTTPStatus
+
+from app.services import flag_import
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def _ndjson(*rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+
+def test_import_creates_updates_and_reports_errors(client):
+    client.post("/api/flags", json={"name": "import-existing", "rollout_percentage": 5})
+    client.post("/api/flags", json={"name": "import-same", "enabled": True})
+
+    body = (
+        _ndjson(
+            {
+                "name": "import-new",
+                "rollout_percentage": 30,
+                "allowed_users": ["u1", "u2"],
+            },
+            {
+                "name": "import-existing",
+                "rollout_percentage": 60,
+                "allowed_users": ["u3"],
+            },
+            {"name": "import-same", "enabled": True},
+            {"name": "import-bad", "rollout_percentage": 150},
+            {"name": "import-new"},
+        )
+        + "{not json}\n"
+    )
+
+    resp = client.post("/api/flags/import", content=body, headers=NDJSON)
+    assert resp.status_code == HTTPStatus.OK
+    data = resp.json()
+    assert (data["created"], data["updated"], data["unchanged"]) == (1, 1, 1)
+    assert [(error["line"], error["name"]) for error in data["errors"]] == [
+        (4, "import-bad"),
+        (5, "import-new"),
+        (6, None),
+    ]
+
+    new_flag = client.get("/api/flags/import-new").json()
+    assert new_flag["allowed_users"] == ["u1", "u2"]
+    assert new_flag["rollout_percentage"] == 30
+
+    existing = client.get("/api/flags/import-existing").json()
+    assert existing["rollout_percentage"] == 60
+    assert existing["allowed_users"] == ["u3"]
+    assert existing["version"] == 2
+    assert client.get("/api/flags/import-same").json()["version"] == 1
+
+    # El caché de evaluación refleja la importación
+    evaluation = client.get("/api/flags/evaluate?flag=import-existing&user_id=u3")
+    assert evaluation.json()["reason"] == "user_in_allowlist"
+
+
+def test_export_round_trips_through_import(client):
+    client.post("/api/flags", json={"name": "export-a", "allowed_users": ["x"]})
+    client.post("/api/flags", json={"name": "export-b", "rollout_percentage": 40})
+
+    resp = client.get("/api/flags/export?prefix=export-")
+    assert resp.status_code == HTTPStatus.OK
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["name"] for row in rows] == ["export-a", "export-b"]
+
+    resp = client.post("/api/flags/import", content=resp.text, headers=NDJSON)
+    assert resp.json() == {"created": 0, "updated": 0, "unchanged": 2, "errors": []}
+
+
+def test_import_rejects_oversized_body(client, monkeypatch):
+    monkeypatch.setattr("app.routers.flags.MAX_IMPORT_ROWS", 1)
+
+    body = _ndjson({"name": "too-many-a"}, {"name": "too-many-b"})
+    resp = client.post("/api/flags/import", content=body, headers=NDJSON)
+    assert resp.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert resp.json()["limit"] == 1
+
+
+def test_parse_ignores_blank_lines():
+    rows, errors = flag_import.FlagImportService.parse(b'\n{"name": "blank-ok"}\n\n')
+    assert [row.line for row in rows] == [2]
+    assert errors == []
@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.exceptions import FlagNotFoundException
+from app.services.flag_cache import flag_cache
+from app.services.flag_update_pipeline import FlagUpdatePipeline
+from tests.conftest import TestingSessionLocal
+
+
+def _run_concurrently(pipeline: FlagUpdatePipeline, updates: list[tuple[str, dict]]):
+    """Envía las actualizaciones a la vez, cada una con su propia sesión."""
+    barrier = threading.Barrier(len(updates))
+
+    def submit(update):
+        name, changes = update
+        barrier.wait()
+        with TestingSessionLocal() as db:
+            try:
+                return pipeline.update(db, name, changes)
+            except (FlagNotFoundException, IntegrityError) as exc:
+                return exc
+
+    with ThreadPoolExecutor(len(updates)) as executor:
+        return list(executor.map(submit, updates))
+
+
+def test_concurrent_updates_are_coalesced_and_group_committed(client):
+    for name in ("pipeline-a", "pipeline-b"):
+        payload = {"name": name, "rollout_percentage": 0}
+        assert client.post("/api/flags", json=payload).status_code == HTTPStatus.CREATED
+    pipeline = FlagUpdatePipeline(enabled=True, window_seconds=0.2)
+
+    updates = [("pipeline-a", {"rollout_percentage": 10 + i}) for i in range(6)]
+    updates += [("pipeline-a", {"description": "rampa"}), ("pipeline-b", {})]
+    updates += [("pipeline-missing", {"enabled": False})]
+    results = _run_concurrently(pipeline, updates)
+
+    assert pipeline.batches == 1
+    assert pipeline.updates == 8
+    assert pipeline.coalesced == 6
+    assert isinstance(results[-1], FlagNotFoundException)
+
+    # Todas las solicitudes de una flag reciben el mismo estado confirmado
+    flag_a = {id(result): result for result in results[:7]}
+    assert len(flag_a) == 1
+    confirmed = results[0]
+    assert confirmed.version == 2
+    assert confirmed.description == "rampa"
+    assert 10 <= confirmed.rollout_percentage < 16
+    assert results[7].version == 2
+
+    data = client.get("/api/flags/pipeline-a").json()
+    assert data["version"] == 2
+    assert data["rollout_percentage"] == confirmed.rollout_percentage
+    with TestingSessionLocal() as db:
+        cached = flag_cache.get(db, "pipeline-a")
+    assert cached.rollout_percentage == confirmed.rollout_percentage
+
+
+def test_disabled_pipeline_commits_each_update(client):
+    client.post("/api/flags", json={"name": "pipeline-direct"})
+    pipeline = FlagUpdatePipeline(enabled=False)
+
+    with TestingSessionLocal() as db:
+        first = pipeline.update(db, "PIPELINE-DIRECT", {"enabled": False})
+        second = pipeline.update(db, "pipeline-direct", {"rollout_percentage": 5})
+        with pytest.raises(FlagNotFoundException):
+            pipeline.update(db, "pipeline-nope", {"enabled": False})
+
+    assert (first.version, second.version) == (2, 3)
+    assert second.enabled is False
+    assert pipeline.batches == 3
+
+
+def test_publish_failure_after_commit_does_not_fail_the_update(client, monkeypatch):
+    import app.services.flag_update_pipeline as pipeline_module
+
+    client.post("/api/flags", json={"name": "pipeline-publish"})
+
+    def fail(*args):
+        raise RuntimeError("publicación caída")
+
+    monkeypatch.setattr(pipeline_module, "notify_snapshots_committed", fail)
+    monkeypatch.setattr(pipeline_module.shared_flag_table, "publish", fail)
+
+    resp = client.put("/api/flags/pipeline-publish", json={"rollout_percentage": 40})
+    assert resp.status_code == HTTPStatus.OK
+    assert (resp.json()["version"], resp.json()["rollout_percentage"]) == (2, 40)
+
+    monkeypatch.undo()
+    flag_cache.clear()
+    persisted = client.get("/api/flags/pipeline-publish").json()
+    assert (persisted["version"], persisted["rollout_percentage"]) == (2, 40)
+
+
+def test_update_of_missing_flag_returns_404_before_validation(client):
+    rules = [{"attribute": "user_id", "operator": "eq", "value": "ana"}]
+    for body in ({"hash_algorithm": "md4"}, {"rules": rules}):
+        resp = client.put("/api/flags/pipeline-nope", json=body)
+        assert resp.status_code == HTTPStatus.NOT_FOUND, body
+
+        client.post("/api/flags", json={"name": "pipeline-invalid"})
+        resp = client.put("/api/flags/pipeline-invalid", json=body)
+        assert resp.status_code == HTTPStatus.BAD_REQUEST, body
+
+
+def test_failed_update_does_not_fail_the_rest_of_its_batch(client):
+    for name in ("pipeline-bad", "pipeline-good"):
+        client.post("/api/flags", json={"name": name, "rollout_percentage": 0})
+    pipeline = FlagUpdatePipeline(enabled=True, window_seconds=0.2)
+
+    updates = [
+        ("pipeline-bad", {"enabled": None}),
+        ("pipeline-good", {"rollout_percentage": 50}),
+    ]
+    # El esquema ya rechaza el null; aquí se fuerza el fallo en la escritura
+    bad, good = _run_concurrently(pipeline, updates)
+
+    assert isinstance(bad, IntegrityError)
+    assert (good.version, good.rollout_percentage) == (2, 50)
+    assert pipeline.batches == 1
+    assert pipeline.updates == 1
+    flag_cache.clear()
+    good = client.get("/api/flags/pipeline-good").json()
+    assert (good["version"], good["rollout_percentage"]) == (2, 50)
+    bad = client.get("/api/flags/pipeline-bad").json()
+    assert (bad["version"], bad["enabled"]) == (1, True)
+
+
+def test_explicit_null_for_required_field_is_rejected(client):
+    client.post("/api/flags", json={"name": "pipeline-null"})
+    for field in ("enabled", "rollout_percentage", "allowed_users", "hash_algorithm"):
+        resp = client.put("/api/flags/pipeline-null", json={field: None})
+        assert resp.status_code == HTTPStatus.BAD_REQUEST, field
+    assert client.get("/api/flags/pipeline-null").json()["version"] == 1
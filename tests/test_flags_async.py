@@ -0,0 +1,116 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import get_async_db, get_db, to_async_url
+from app.middleware.error_handler import add_exception_handlers
+from app.routers.flags import router as flags_router
+from app.routers.flags_async import overlay_routes
+from tests.conftest import TEST_DATABASE_URL, override_get_db
+
+
+@pytest.fixture
+def async_client():
+    engine = create_async_engine(to_async_url(TEST_DATABASE_URL), poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    add_exception_handlers(app)
+    app.include_router(overlay_routes(flags_router))
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_to_async_url_selects_async_drivers():
+    assert to_async_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert to_async_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert (
+        to_async_url("postgresql+psycopg2://u:p@h/db")
+        == "postgresql+asyncpg://u:p@h/db"
+    )
+
+
+def test_overlay_routes_replaces_sync_endpoints_and_keeps_order(async_client):
+    combined = overlay_routes(flags_router)
+    paths = [(route.path, route.endpoint.__module__) for route in combined.routes]
+
+    assert ("/api/flags/evaluate", "app.routers.flags_async") in paths
+    assert ("/api/flags/cache/stats", "app.routers.flags") in paths
+    assert [path for path, _ in paths] == [route.path for route in flags_router.routes]
+
+
+def test_async_crud_and_evaluate(async_client):
+    payload = {
+        "name": "Async-Feature",
+        "enabled": True,
+        "rollout_percentage": 0,
+        "allowed_users": ["user-1"],
+    }
+    resp = async_client.post("/api/flags", json=payload)
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["name"] == "async-feature"
+
+    resp = async_client.post("/api/flags", json=payload)
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+    resp = async_client.put(
+        "/api/flags/async-feature",
+        json={"rollout_percentage": 100, "allowed_users": ["user-1", "user-3"]},
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.json()["rollout_percentage"] == 100
+
+    resp = async_client.get("/api/flags/async-feature")
+    assert resp.json()["allowed_users"] == ["user-1", "user-3"]
+
+    names = [flag["name"] for flag in async_client.get("/api/flags").json()["flags"]]
+    assert "async-feature" in names
+
+    resp = async_client.get(
+        "/api/flags/evaluate", params={"user_id": "user-2", "flag": "async-feature"}
+    )
+    assert resp.json() == {
+        "flag_name": "async-feature",
+        "enabled": True,
+        "reason": "rollout_percentage",
+        "variant": None,
+    }
+
+    resp = async_client.get("/api/flags/missing-async")
+    assert resp.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_async_list_pagination_and_ndjson(async_client):
+    for name in ("async-page-a", "async-page-b", "async-page-c"):
+        async_client.post("/api/flags", json={"name": name})
+
+    data = async_client.get("/api/flags?prefix=async-page-&limit=2").json()
+    assert [flag["name"] for flag in data["flags"]] == ["async-page-a", "async-page-b"]
+    assert data["next_cursor"] == "async-page-b"
+
+    resp = async_client.get(
+        "/api/flags",
+        params={
+            "prefix": "async-page-",
+            "cursor": data["next_cursor"],
+            "format": "ndjson",
+        },
+    )
+    assert [json.loads(line)["name"] for line in resp.text.splitlines()] == [
+        "async-page-c"
+    ]
@@ -1,5 +1,10 @@
 from http import HTTPStatus
 
+from fastapi.testclient import TestClient
+
+import app.main as main
+from tests.conftest import TestingSessionLocal
+
 
 def test_health_endpoint_returns_expected_payload(client):
     response = client.get("/health")
@@ -10,3 +15,26 @@ def test_health_endpoint_returns_expected_payload(client):
     assert data["status"] == "healthy"
     assert data["service"] == "feature-flag-hub"
     assert data["version"] == "1.0.0"
+
+
+def test_startup_runs_in_lifespan_not_on_import(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "init_db", lambda: calls.append("init_db"))
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "DB_INIT_ON_STARTUP", True)
+
+    # Importar la aplicación no inicializa nada
+    assert calls == []
+    with TestClient(main.app) as client:
+        assert calls == ["init_db"]
+        assert client.get("/health").status_code == HTTPStatus.OK
+
+
+def test_startup_skips_init_db_when_disabled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "init_db", lambda: calls.append("init_db"))
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "DB_INIT_ON_STARTUP", False)
+
+    with TestClient(main.app):
+        assert calls == []
@@ -0,0 +1,69 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def paged_flags(client):
+    names = [f"page-{i:02d}" for i in range(7)]
+    for i, name in enumerate(names):
+        payload = {"name": name, "enabled": i % 2 == 0, "rollout_percentage": i * 10}
+        client.post("/api/flags", json=payload)
+    return names
+
+
+def test_keyset_pagination_walks_all_pages(client, paged_flags):
+    seen = []
+    cursor = None
+    while True:
+        params = {"prefix": "page-", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/flags", params=params).json()
+        assert data["total"] is None
+        assert data["count"] == len(data["flags"])
+        seen.extend(flag["name"] for flag in data["flags"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == paged_flags
+
+
+def test_filters_combine(client, paged_flags):
+    resp = client.get(
+        "/api/flags",
+        params={
+            "prefix": "page-",
+            "enabled": "true",
+            "min_rollout": 20,
+            "max_rollout": 50,
+        },
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert "etag" not in resp.headers
+    assert [flag["name"] for flag in resp.json()["flags"]] == ["page-02", "page-04"]
+    assert (resp.json()["total"], resp.json()["count"]) == (2, 2)
+
+
+def test_prefix_filter_escapes_like_wildcards(client, paged_flags):
+    client.post("/api/flags", json={"name": "pagex01"})
+
+    names = [f["name"] for f in client.get("/api/flags?prefix=page_").json()["flags"]]
+    assert names == []
+
+
+def test_ndjson_streams_one_flag_per_line(client, paged_flags):
+    resp = client.get("/api/flags", params={"prefix": "page-", "format": "ndjson"})
+
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["name"] for row in rows] == paged_flags
+    assert {"id", "version", "rollout_percentage"} <= rows[0].keys()
+
+
+def test_invalid_list_parameters_are_rejected(client):
+    assert client.get("/api/flags?limit=0").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/flags?format=xml").status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from app.middleware.metrics import Histogram, MetricsRegistry, RequestStats
+from app.services.evaluation_service import EVALUATION_REASONS
+
+
+def test_metrics_endpoint_exposes_latency_db_and_evaluations(client):
+    client.post("/api/flags", json={"name": "metrics-flag", "rollout_percentage": 100})
+    client.get("/api/flags/evaluate?flag=metrics-flag&user_id=u1")
+    client.get("/api/flags/metrics-flag")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+
+    assert (
+        'featureflags_http_request_duration_seconds_count{method="GET",'
+        'route="/api/flags/evaluate",status="200"}'
+    ) in body
+    # Las rutas se etiquetan por plantilla, no por URL
+    assert 'route="/api/flags/{flag_name}"' in body
+    assert "metrics-flag" not in body
+    assert 'featureflags_evaluations_total{reason="rollout_percentage"}' in body
+
+    # La creación consulta la base de datos desde el threadpool
+    create_count = next(
+        line
+        for line in body.splitlines()
+        if line.startswith(
+            'featureflags_db_queries_per_request_sum{method="POST",route="/api/flags"}'
+        )
+    )
+    assert float(create_count.rsplit(" ", 1)[1]) > 0
+
+
+def test_histogram_buckets_are_cumulative_in_exposition():
+    registry = MetricsRegistry()
+    stats = RequestStats()
+    for seconds in (0.0005, 0.003, 20.0):
+        registry.observe_request("GET", "/x", 200, seconds, stats)
+
+    lines = registry.render().splitlines()
+    labels = '{method="GET",route="/x",status="200",le="%s"}'
+    assert (
+        f"featureflags_http_request_duration_seconds_bucket{labels % '0.001'} 1"
+        in lines
+    )
+    assert (
+        f"featureflags_http_request_duration_seconds_bucket{labels % '0.005'} 2"
+        in lines
+    )
+    assert (
+        f"featureflags_http_request_duration_seconds_bucket{labels % '+Inf'} 3" in lines
+    )
+
+
+def test_histogram_boundary_goes_into_le_bucket():
+    hist = Histogram((1, 2))
+    hist.observe(1)
+    hist.observe(2.5)
+    assert hist.counts == [1, 0, 1]
+
+
+def test_evaluation_counters_are_per_thread_and_summed_on_render():
+    registry = MetricsRegistry()
+    registry.count_evaluation("rollout_percentage")
+    for _ in range(3):
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(registry.count_evaluation, ["default_deny"] * 100))
+    registry.count_evaluations({"rule_not_matched": 5, "default_deny": 1})
+
+    assert registry.evaluation_counts() == {
+        **dict.fromkeys(EVALUATION_REASONS, 0),
+        "rollout_percentage": 1,
+        "default_deny": 301,
+        "rule_not_matched": 5,
+    }
+    # Los repartos de los hilos terminados se acumulan aparte y se descartan
+    assert len(registry._evaluation_shards) == 1
+    assert registry.evaluation_counts()["default_deny"] == 301
+
+    lines = registry.render().splitlines()
+    assert 'featureflags_evaluations_total{reason="rule_not_matched"} 5' in lines
+    assert 'featureflags_evaluations_total{reason="flag_disabled"} 0' in lines
+
+    registry.reset()
+    assert set(registry.evaluation_counts().values()) == {0}
@@ -0,0 +1,75 @@
+import json
+from http import HTTPStatus
+
+from sqlalchemy.orm import selectinload
+
+from app.models.flag import Flag
+from app.schemas.flag import EvaluateResponse, FlagListResponse, FlagResponse
+from tests.conftest import TestingSessionLocal
+
+
+def _create(client, name: str) -> None:
+    payload = {
+        "name": name,
+        "description": "Serialización",
+        "enabled": True,
+        "rollout_percentage": 40,
+        "allowed_users": ["user-2", "user-1"],
+    }
+    assert client.post("/api/flags", json=payload).status_code == HTTPStatus.CREATED
+
+
+def _db_flags(prefix: str) -> list[FlagResponse]:
+    with TestingSessionLocal() as db:
+        flags = (
+            db.query(Flag)
+            .options(selectinload(Flag.allowed_user_rows))
+            .filter(Flag.name.startswith(prefix))
+            .order_by(Flag.name)
+            .all()
+        )
+        return [FlagResponse.model_validate(flag) for flag in flags]
+
+
+def test_evaluate_body_matches_schema(client):
+    _create(client, "resp-evaluate")
+
+    resp = client.get(
+        "/api/flags/evaluate", params={"flag": "resp-evaluate", "user_id": "user-1"}
+    )
+
+    assert resp.headers["content-type"] == "application/json"
+    expected = EvaluateResponse(
+        flag_name="resp-evaluate", enabled=True, reason="user_in_allowlist"
+    )
+    assert resp.json() == expected.model_dump(mode="json")
+
+
+def test_list_body_matches_schema(client):
+    for i in range(3):
+        _create(client, f"resp-list-{i}")
+
+    resp = client.get("/api/flags", params={"prefix": "resp-list-", "limit": 2})
+
+    assert resp.status_code == HTTPStatus.OK
+    assert "X-Flag-Events-Version" in resp.headers
+    expected = FlagListResponse(
+        flags=_db_flags("resp-list-")[:2],
+        total=None,
+        count=2,
+        next_cursor="resp-list-1",
+        environment=resp.json()["environment"],
+    )
+    assert resp.json() == expected.model_dump(mode="json")
+
+
+def test_ndjson_lines_match_schema(client):
+    for i in range(2):
+        _create(client, f"resp-ndjson-{i}")
+
+    resp = client.get(
+        "/api/flags", params={"prefix": "resp-ndjson-", "format": "ndjson"}
+    )
+
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines == [flag.model_dump(mode="json") for flag in _db_flags("resp-ndjson-")]
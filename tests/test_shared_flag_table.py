@@ -0,0 +1,78 @@
+import os
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import app.routers.flags as flags_router
+import app.services.flag_import as flag_import
+import app.services.flag_update_pipeline as flag_update_pipeline
+from app.services.shared_flag_table import SharedFlagTable
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def shared_table(tmp_path, monkeypatch):
+    table = SharedFlagTable(str(tmp_path), enabled=True, ttl_seconds=0)
+    monkeypatch.setattr(flags_router, "shared_flag_table", table)
+    monkeypatch.setattr(flag_import, "shared_flag_table", table)
+    monkeypatch.setattr(flag_update_pipeline, "shared_flag_table", table)
+    return table
+
+
+def test_writes_publish_new_generations(client, shared_table, tmp_path):
+    client.post("/api/flags", json={"name": "shared-flag", "allowed_users": ["ana"]})
+    # Otro worker del mismo host mapea la misma tabla
+    other_worker = SharedFlagTable(str(tmp_path), enabled=True)
+
+    table = other_worker.current()
+    assert table.evaluate("shared-flag", "ana") == (True, "user_in_allowlist")
+    first_generation = other_worker._generation
+
+    client.put("/api/flags/shared-flag", json={"enabled": False})
+    assert other_worker.current().evaluate("shared-flag", "ana") == (
+        False,
+        "flag_disabled",
+    )
+    assert other_worker._generation == first_generation + 1
+    # Solo se conservan la generación vigente y la anterior
+    tables = [name for name in os.listdir(tmp_path) if name.endswith(".ffsn")]
+    assert len(tables) <= 2
+
+
+def test_evaluate_reads_shared_table_without_queries(client, shared_table):
+    client.post("/api/flags", json={"name": "shared-eval", "rollout_percentage": 100})
+    client.post("/api/flags/shared-eval/users", json={"user_ids": ["bob"]})
+
+    queries = []
+
+    def count_query(*args):
+        queries.append(args[2])
+
+    event.listen(Engine, "before_cursor_execute", count_query)
+    try:
+        resp = client.get("/api/flags/evaluate?flag=Shared-Eval&user_id=bob")
+        missing = client.get("/api/flags/evaluate?flag=shared-missing&user_id=bob")
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_query)
+
+    assert resp.json() == {
+        "flag_name": "shared-eval",
+        "enabled": True,
+        "reason": "user_in_allowlist",
+        "variant": None,
+    }
+    assert missing.status_code == 404
+    assert queries == []
+
+
+def test_refresh_if_stale_publishes_once(tmp_path):
+    table = SharedFlagTable(str(tmp_path), enabled=True, ttl_seconds=60)
+    assert table.needs_refresh()
+    with TestingSessionLocal() as db:
+        assert table.refresh_if_stale(db) is True
+        assert table.refresh_if_stale(db) is False
+    assert table.current() is not None
+
+    disabled = SharedFlagTable(str(tmp_path), enabled=False)
+    assert disabled.current() is None
@@ -0,0 +1,242 @@
+import json
+import random
+import struct
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import app.routers.flags as flags_router
+from app.models.flag import Flag
+from app.services.evaluation_service import EvaluationService
+from app.services.flag_snapshot import encode_binary_snapshot
+from app.services.shared_flag_table import SharedFlagTable
+from app.services.targeting import (
+    OPERATORS,
+    SET_OPERATORS,
+    VERSION_OPERATORS,
+    FlagRule,
+    compile_rules,
+    match_rules,
+    parse_rules,
+)
+from featureflags_client import BinarySnapshot, LocalFlag
+from featureflags_client.targeting import compile_rules as sdk_compile_rules
+
+RULES = [
+    {"attribute": "country", "operator": "in", "value": ["ES", "MX", "AR"]},
+    {"attribute": "plan", "operator": "eq", "value": "pro"},
+    {"attribute": "app_version", "operator": "gte", "value": "3.2"},
+]
+VALUES = {
+    "country": ["ES", "MX", "AR", "US", "CL"],
+    "plan": ["pro", "free", "team"],
+    "app_version": ["2.9", "3.2", "3.2.0", "3.10", "4", "beta"],
+    "beta": ["true", "false"],
+}
+
+
+def _random_rule(rng: random.Random) -> FlagRule:
+    attribute = rng.choice(list(VALUES))
+    operator = rng.choice(OPERATORS)
+    if operator in VERSION_OPERATORS:
+        return FlagRule(attribute, operator, rng.choice(["3", "3.2", "3.10", "4.0"]))
+    if operator in SET_OPERATORS:
+        return FlagRule(attribute, operator, tuple(rng.sample(VALUES[attribute], 2)))
+    return FlagRule(attribute, operator, rng.choice(VALUES[attribute]))
+
+
+def _format_version(data: bytes) -> int:
+    return struct.unpack_from("<H", data, 4)[0]
+
+
+def test_compiled_rules_match_interpreted_rules():
+    rng = random.Random(7)
+    for _ in range(300):
+        rules = [_random_rule(rng) for _ in range(rng.randint(1, 8))]
+        predicate = compile_rules(rules)
+        sdk_predicate = sdk_compile_rules([rule.to_dict() for rule in rules])
+        for _ in range(30):
+            attributes = {
+                attribute: rng.choice(values)
+                for attribute, values in VALUES.items()
+                if rng.random() < 0.9
+            }
+            expected = match_rules(rules, attributes)
+            assert predicate(attributes) == expected, (rules, attributes)
+            assert sdk_predicate(attributes) == expected, (rules, attributes)
+
+    assert compile_rules(()) is None
+
+
+def test_rules_compare_versions_and_fold_contradictions():
+    rules = parse_rules(RULES)
+    predicate = compile_rules(rules)
+    base = {"country": "ES", "plan": "pro"}
+    assert predicate({**base, "app_version": "3.10"})
+    assert predicate({**base, "app_version": "3.2.0"})
+    assert not predicate({**base, "app_version": "3.1.9"})
+    assert not predicate({**base, "app_version": "beta"})
+    assert not predicate({"plan": "pro", "app_version": "4"})
+
+    contradiction = parse_rules(
+        [
+            {"attribute": "plan", "operator": "eq", "value": "pro"},
+            {"attribute": "plan", "operator": "not_in", "value": ["pro", "team"]},
+        ]
+    )
+    assert not compile_rules(contradiction)({"plan": "pro"})
+    # Las reglas vuelven a su forma JSON sin perder las listas
+    assert [rule.to_dict() for rule in rules] == RULES
+
+
+def test_compiled_flag_checks_rules_after_allowlist():
+    flag = Flag(
+        name="targeted",
+        enabled=True,
+        rollout_percentage=100,
+        hash_algorithm="sha256",
+        rules=RULES,
+    )
+    flag.allowed_users = ["ana"]
+    compiled = EvaluationService.compile_flag(flag)
+    attributes = {"country": "MX", "plan": "pro", "app_version": "3.4"}
+
+    assert compiled.evaluate("bob", attributes) == (True, "rollout_percentage")
+    assert compiled.evaluate("bob", {**attributes, "plan": "free"}) == (
+        False,
+        "rule_not_matched",
+    )
+    assert compiled.evaluate("bob") == (False, "rule_not_matched")
+    assert compiled.evaluate("ana") == (True, "user_in_allowlist")
+    for user_id in ("ana", "bob"):
+        assert EvaluationService.evaluate_flag(flag, user_id, attributes) == (
+            compiled.evaluate(user_id, attributes)
+        )
+
+
+def test_sdk_evaluates_rules_like_the_server():
+    local = LocalFlag.from_dict(
+        {
+            "name": "targeted",
+            "enabled": True,
+            "rollout_percentage": 100,
+            "hash_algorithm": "sha256",
+            "rules": RULES,
+        }
+    )
+    entries = [
+        SimpleNamespace(
+            name="targeted",
+            enabled=True,
+            rollout_percentage=100,
+            allowed_users=("ana",),
+            hash_algorithm="sha256",
+            version=1,
+            variants=(),
+            rules=parse_rules(RULES),
+        ),
+        SimpleNamespace(
+            name="plain-flag",
+            enabled=True,
+            rollout_percentage=100,
+            allowed_users=(),
+            hash_algorithm="sha256",
+            version=1,
+            variants=(),
+            rules=(),
+        ),
+    ]
+    data = encode_binary_snapshot('"v"', entries)
+    snapshot = BinarySnapshot.from_bytes(data)
+
+    matching = {"country": "AR", "plan": "pro", "app_version": "3.2"}
+    assert local.evaluate("bob", matching) == (True, "rollout_percentage")
+    assert local.evaluate("bob", {"plan": "pro"}) == (False, "rule_not_matched")
+    assert snapshot.evaluate("targeted", "bob", matching) == (
+        True,
+        "rollout_percentage",
+    )
+    assert snapshot.evaluate("targeted", "bob") == (False, "rule_not_matched")
+    assert snapshot.evaluate("targeted", "ana") == (True, "user_in_allowlist")
+    assert snapshot.has_rules("targeted")
+    assert not snapshot.has_rules("plain-flag")
+    assert snapshot.evaluate("plain-flag", "bob") == (True, "rollout_percentage")
+
+    # Las reglas solo suben el formato a la versión 3 cuando existen
+    assert _format_version(data) == 3
+    assert _format_version(encode_binary_snapshot('"v"', entries[1:])) == 1
+
+
+def test_evaluate_endpoint_reads_attributes_from_query(client):
+    resp = client.post(
+        "/api/flags",
+        json={
+            "name": "api-rules",
+            "rollout_percentage": 100,
+            "allowed_users": ["ana"],
+            "rules": RULES,
+        },
+    )
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["rules"] == RULES
+
+    url = "/api/flags/evaluate?flag=api-rules&user_id=bob"
+    matched = client.get(f"{url}&country=ES&plan=pro&app_version=3.10").json()
+    assert (matched["enabled"], matched["reason"]) == (True, "rollout_percentage")
+    missed = client.get(f"{url}&country=US&plan=pro&app_version=3.10").json()
+    assert (missed["enabled"], missed["reason"]) == (False, "rule_not_matched")
+    allowlisted = client.get("/api/flags/evaluate?flag=api-rules&user_id=ana").json()
+    assert allowlisted["reason"] == "user_in_allowlist"
+
+    batch = client.post(
+        "/api/flags/evaluate/batch",
+        json={
+            "user_ids": ["bob", "eve"],
+            "flags": ["api-rules"],
+            "attributes": {"bob": {"country": "MX", "plan": "pro", "app_version": "4"}},
+        },
+    )
+    lines = [json.loads(line) for line in batch.text.splitlines()]
+    assert lines[0]["results"]["api-rules"]["reason"] == "rollout_percentage"
+    assert lines[1]["results"]["api-rules"]["reason"] == "rule_not_matched"
+
+    # Sin reglas la flag vuelve a evaluarse solo por rollout
+    client.put("/api/flags/api-rules", json={"rules": []})
+    assert client.get(url).json()["reason"] == "rollout_percentage"
+
+
+def test_shared_table_evaluates_rules_with_query_attributes(
+    client, tmp_path, monkeypatch
+):
+    table = SharedFlagTable(str(tmp_path), enabled=True, ttl_seconds=0)
+    monkeypatch.setattr(flags_router, "shared_flag_table", table)
+    client.post(
+        "/api/flags",
+        json={"name": "shared-rules", "rollout_percentage": 100, "rules": RULES},
+    )
+
+    url = "/api/flags/evaluate?flag=shared-rules&user_id=bob"
+    assert client.get(url).json()["reason"] == "rule_not_matched"
+    matched = client.get(f"{url}&country=ES&plan=pro&app_version=3.2").json()
+    assert matched["reason"] == "rollout_percentage"
+
+
+def test_invalid_rules_are_rejected(client):
+    invalid = [
+        [{"attribute": "plan", "operator": "like", "value": "pro"}],
+        [{"attribute": "country", "operator": "in", "value": []}],
+        [{"attribute": "plan", "operator": "eq", "value": ["pro"]}],
+        [{"attribute": "app_version", "operator": "gte", "value": "latest"}],
+        [{"attribute": "user_id", "operator": "eq", "value": "ana"}],
+    ]
+    for rules in invalid:
+        resp = client.post("/api/flags", json={"name": "bad-rules", "rules": rules})
+        assert resp.status_code == HTTPStatus.BAD_REQUEST, rules
+        assert resp.json()["error"] == "Reglas no válidas"
+
+    rules = [{"attribute": "", "operator": "eq", "value": "pro"}]
+    resp = client.post("/api/flags", json={"name": "bad-rules", "rules": rules})
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+    client.post("/api/flags", json={"name": "bad-rules"})
+    resp = client.put("/api/flags/bad-rules", json={"rules": invalid[0]})
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
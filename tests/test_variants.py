@@ -0,0 +1,158 @@
+import json
+import struct
+from collections import Counter
+from http import HTTPStatus
+from types import SimpleNamespace
+
+from app.models.flag import Flag
+from app.services.evaluation_service import EvaluationService, FlagVariant
+from app.services.flag_snapshot import encode_binary_snapshot
+from featureflags_client import BinarySnapshot, LocalFlag
+
+USER_IDS = [f"user-{i}" for i in range(20000)]
+WEIGHTS = [
+    {"name": "control", "weight": 50},
+    {"name": "blue", "weight": 30},
+    {"name": "green", "weight": 20},
+    {"name": "ghost", "weight": 0},
+]
+
+
+def _flag(**overrides) -> Flag:
+    fields = {
+        "name": "checkout-test",
+        "enabled": True,
+        "rollout_percentage": 100,
+        "hash_algorithm": "blake2b64",
+        "variants": WEIGHTS,
+    }
+    fields.update(overrides)
+    return Flag(**fields)
+
+
+def _format_version(data: bytes) -> int:
+    return struct.unpack_from("<H", data, 4)[0]
+
+
+def test_variant_split_follows_weights_and_is_deterministic():
+    flag = _flag()
+    compiled = EvaluationService.compile_flag(flag)
+
+    counts = Counter(compiled.variant(user_id) for user_id in USER_IDS)
+    assert counts["ghost"] == 0
+    for variant in WEIGHTS[:3]:
+        share = counts[variant["name"]] / len(USER_IDS)
+        assert abs(share - variant["weight"] / 100) < 0.015
+
+    for user_id in USER_IDS[:500]:
+        assert compiled.variant(user_id) == EvaluationService.assign_variant(
+            flag, user_id
+        )
+    # Sin variantes la flag sigue siendo booleana
+    assert EvaluationService.compile_flag(_flag(variants=None)).variant("a") is None
+
+
+def test_sdk_assigns_the_same_variants_as_the_server():
+    flag = _flag(hash_algorithm="sha256")
+    compiled = EvaluationService.compile_flag(flag)
+    local = LocalFlag.from_dict(
+        {
+            "name": flag.name,
+            "enabled": True,
+            "rollout_percentage": 100,
+            "hash_algorithm": "sha256",
+            "variants": WEIGHTS,
+        }
+    )
+    entries = [
+        SimpleNamespace(
+            name=flag.name,
+            enabled=True,
+            rollout_percentage=100,
+            allowed_users=(),
+            hash_algorithm="sha256",
+            version=1,
+            variants=tuple(FlagVariant(v["name"], v["weight"]) for v in WEIGHTS),
+            rules=(),
+        ),
+        SimpleNamespace(
+            name="plain-flag",
+            enabled=True,
+            rollout_percentage=50,
+            allowed_users=("ana",),
+            hash_algorithm="sha256",
+            version=1,
+            variants=(),
+            rules=(),
+        ),
+    ]
+    snapshot = BinarySnapshot.from_bytes(encode_binary_snapshot('"v"', entries))
+
+    for user_id in USER_IDS[:2000]:
+        expected = compiled.variant(user_id)
+        assert local.variant(user_id) == expected
+        assert snapshot.variant(flag.name, user_id) == expected
+    assert snapshot.variant("plain-flag", "ana") is None
+    assert snapshot.evaluate("plain-flag", "ana") == (True, "user_in_allowlist")
+
+    # Sin variantes se sigue emitiendo la versión 1 del formato
+    assert _format_version(encode_binary_snapshot('"v"', entries)) == 2
+    assert _format_version(encode_binary_snapshot('"v"', entries[1:])) == 1
+
+
+def test_evaluate_returns_variant(client):
+    resp = client.post(
+        "/api/flags",
+        json={"name": "api-variants", "rollout_percentage": 50, "variants": WEIGHTS},
+    )
+    assert resp.status_code == HTTPStatus.CREATED
+    assert resp.json()["variants"] == WEIGHTS
+
+    results = [
+        client.get(f"/api/flags/evaluate?flag=api-variants&user_id=u{i}").json()
+        for i in range(60)
+    ]
+    for result in results:
+        if result["enabled"]:
+            assert result["variant"] in {"control", "blue", "green"}
+        else:
+            assert result["variant"] is None
+    assert any(result["enabled"] for result in results)
+
+    batch = client.post(
+        "/api/flags/evaluate/batch",
+        json={"user_ids": ["u0", "u1", "u2"], "flags": ["api-variants"]},
+    )
+    for line, expected in zip(batch.text.splitlines(), results[:3], strict=True):
+        assert json.loads(line)["results"]["api-variants"].get("variant") == (
+            expected["variant"]
+        )
+
+    # Una lista vacía devuelve la flag a booleana
+    resp = client.put("/api/flags/api-variants", json={"variants": []})
+    assert resp.json()["variants"] == []
+    assert (
+        client.get("/api/flags/evaluate?flag=api-variants&user_id=u0").json()["variant"]
+        is None
+    )
+
+
+def test_invalid_variants_are_rejected(client):
+    duplicated = [{"name": "a", "weight": 1}, {"name": "a", "weight": 1}]
+    resp = client.post(
+        "/api/flags", json={"name": "bad-variants", "variants": duplicated}
+    )
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+    assert resp.json()["error"] == "Variantes no válidas"
+
+    resp = client.post(
+        "/api/flags",
+        json={"name": "bad-variants", "variants": [{"name": "a", "weight": 0}]},
+    )
+    assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+    client.post("/api/flags", json={"name": "bad-variants"})
+    resp = client.put(
+        "/api/flags/bad-variants", json={"variants": [{"name": "a", "weight": -1}]}
+    )
+    assert resp.status_code == HTTPStatus.BAD_REQUEST